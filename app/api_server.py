@@ -3,7 +3,10 @@
 
 import os
 import sys
-import json
+import hmac
+import atexit
+import hashlib
+import threading
 from datetime import datetime
 from flask import Flask, request, jsonify
 
@@ -12,125 +15,374 @@ current_dir = os.path.dirname(os.path.abspath(__file__))
 parent_dir = os.path.dirname(current_dir)
 sys.path.append(parent_dir)
 from telecom_class import Telecom
+from token_refresher import TokenRefresher
+from response_cache import ResponseCache
+from single_flight import SingleFlight
+from client_registry import ClientRegistry
+from login_store import LoginStore
+from metrics import ApiMetrics
 
-telecom = Telecom()
+
+
+def env_int(name, default):
+    """读取整数环境变量，格式无效时使用默认值"""
+    value = os.environ.get(name)
+    try:
+        return int(value) if value else default
+    except ValueError:
+        print(f"环境变量 {name}={value} 格式无效（需为整数），使用默认值 {default}")
+        return default
+
+
+def env_float(name, default):
+    """读取浮点数环境变量，格式无效时使用默认值"""
+    value = os.environ.get(name)
+    try:
+        return float(value) if value else default
+    except ValueError:
+        print(f"环境变量 {name}={value} 格式无效（需为数字），使用默认值 {default}")
+        return default
+
+
+metrics = ApiMetrics(
+    account_labels=os.environ.get("METRICS_ACCOUNT_LABELS", "none").lower(),
+    max_accounts=env_int("METRICS_MAX_ACCOUNTS", 100),
+)
+# 设置后 /metrics 需携带 Authorization: Bearer <METRICS_TOKEN>
+METRICS_TOKEN = os.environ.get("METRICS_TOKEN", "")
+
+# 每个号码一个独立客户端，避免多线程下串用其他账号的 token
+clients = ClientRegistry(
+    metrics.instrument(Telecom),
+    max_size=env_int("CLIENT_REGISTRY_SIZE", 256),
+)
 
 app = Flask(__name__)
 app.json.ensure_ascii = False
 app.json.sort_keys = False
 
+
+@app.before_request
+def count_in_flight():
+    metrics.http_in_flight.inc()
+
+
+@app.after_request
+def count_request(response):
+    path = request.url_rule.rule if request.url_rule else "unmatched"
+    metrics.http_requests.inc((path, str(response.status_code)))
+    return response
+
+
+@app.teardown_request
+def release_in_flight(error=None):
+    metrics.http_in_flight.dec()
+
 # 登录信息存储文件
 LOGIN_INFO_FILE = os.environ.get("CONFIG_PATH", "./config/login_info.json")
+login_store = LoginStore(
+    LOGIN_INFO_FILE, debounce=env_float("LOGIN_STORE_DEBOUNCE", 1.0)
+)
+# 退出前写入尚未落盘的登录信息
+atexit.register(login_store.flush)
 
 
-def load_login_info():
-    """加载本地登录信息"""
-    try:
-        with open(LOGIN_INFO_FILE, "r", encoding="utf-8") as f:
-            return json.load(f)
-    except FileNotFoundError:
-        return {}
+def do_login_and_save(phonenum, password):
+    """登录并保存登录信息，返回登录接口的原始响应"""
+    data = clients.get(phonenum).do_login(phonenum, password)
+    if (data.get("responseData") or {}).get("resultCode") == "0000":
+        new_login_info = data["responseData"]["data"]["loginSuccessResult"]
+        new_login_info["phonenum"] = phonenum
+        new_login_info["password"] = password
+        new_login_info["createTime"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        login_store.set(phonenum, new_login_info)
+    return data
 
 
-def save_login_info(login_info):
-    """保存登录信息到本地"""
-    os.makedirs(os.path.dirname(LOGIN_INFO_FILE), exist_ok=True)
-    with open(LOGIN_INFO_FILE, "w", encoding="utf-8") as f:
-        json.dump(login_info, f, ensure_ascii=False, indent=2)
+# 合并并发的相同上游请求与重新登录
+single_flight = SingleFlight()
+
+
+def password_digest(password):
+    return hashlib.sha256(str(password).encode()).hexdigest()
+
+
+def coalesced_login(phonenum, password):
+    """并发的同号码重新登录只执行一次"""
+    key = ("login", phonenum, password_digest(password))
+    return single_flight.do(key, do_login_and_save, phonenum, password)
+
+
+token_refresher = TokenRefresher(
+    login_store.all,
+    coalesced_login,
+    lifetime=env_int("TOKEN_LIFETIME", 0),
+    interval=env_int("TOKEN_REFRESH_INTERVAL", 60),
+    jitter=env_int("TOKEN_REFRESH_JITTER", 300),
+    min_lifetime=env_int("TOKEN_MIN_LIFETIME", 600),
+)
+
+
+response_cache = ResponseCache(
+    ttl=env_int("CACHE_TTL", 60),
+    stale_ttl=env_int("CACHE_STALE_TTL", 300),
+    stale_if_error=env_int("CACHE_STALE_IF_ERROR", 3600),
+    max_size=env_int("CACHE_MAX_SIZE", 1024),
+)
+
+# 抓取 /metrics 时读取各组件已有的统计
+metrics.add_callback(
+    "telecom_cache_lookups_total",
+    "counter",
+    "响应缓存查询次数，按结果",
+    ("result",),
+    lambda: {
+        (name,): value
+        for name, value in response_cache.get_stats().items()
+        if name in ("hits", "stale_hits", "misses", "stale_if_error")
+    },
+)
+metrics.add_callback(
+    "telecom_cache_hit_ratio",
+    "gauge",
+    "响应缓存命中率（含过期后先返回旧数据）",
+    (),
+    lambda: {(): response_cache.get_stats()["hit_ratio"]},
+)
+metrics.add_callback(
+    "telecom_cache_entries",
+    "gauge",
+    "响应缓存条数",
+    (),
+    lambda: {(): response_cache.get_stats()["size"]},
+)
+metrics.add_callback(
+    "telecom_coalesced_requests_total",
+    "counter",
+    "合并请求次数，executed 为实际执行、shared 为共享其他请求的结果",
+    ("result",),
+    lambda: {
+        (name,): value
+        for name, value in single_flight.get_stats().items()
+        if name in ("executed", "shared")
+    },
+)
+metrics.add_callback(
+    "telecom_token_refresh_total",
+    "counter",
+    "后台 token 续期次数",
+    ("result",),
+    lambda: {
+        (name,): value
+        for name, value in token_refresher.get_stats().items()
+        if name in ("refreshed", "failed")
+    },
+)
+
+
+def get_request_data():
+    if request.method == "POST":
+        return request.get_json() or {}
+    return request.args
+
+
+def check_login_params(phonenum, password):
+    """校验登录参数，不通过时返回错误信息"""
+    if not phonenum or not password:
+        return "手机号和密码不能为空"
+    elif whitelist_num := os.environ.get("WHITELIST_NUM"):
+        if not phonenum in whitelist_num:
+            return "手机号不在白名单"
 
 
 @app.route("/login", methods=["POST", "GET"])
 def login():
     """登录接口"""
-    data = request.get_json() if request.method == "POST" else request.args
+    data = get_request_data()
     phonenum, password = data.get("phonenum"), data.get("password")
-    if not phonenum or not password:
-        return jsonify({"message": "手机号和密码不能为空"}), 400
-    elif whitelist_num := os.environ.get("WHITELIST_NUM"):
-        if not phonenum in whitelist_num:
-            return jsonify({"message": "手机号不在白名单"}), 400
-
-    login_info = load_login_info()
-    data = telecom.do_login(phonenum, password)
-    if data.get("responseData").get("resultCode") == "0000":
-        login_info[phonenum] = data["responseData"]["data"]["loginSuccessResult"]
-        login_info[phonenum]["phonenum"] = phonenum
-        login_info[phonenum]["password"] = password
-        login_info[phonenum]["createTime"] = datetime.now().strftime(
-            "%Y-%m-%d %H:%M:%S"
-        )
-        save_login_info(login_info)
+    if message := check_login_params(phonenum, password):
+        return jsonify({"message": message}), 400
+
+    data = do_login_and_save(phonenum, password)
+    if (data.get("responseData") or {}).get("resultCode") == "0000":
         return jsonify(data), 200
     else:
         return jsonify(data), 400
 
 
-def query_data(query_func, **kwargs):
+def fetch_data(phonenum, password, query_name, **kwargs):
     """
-    查询数据，如果本地没有登录信息或密码不匹配，则尝试登录后再查询
+    查询数据，如果本地没有登录信息或密码不匹配，则尝试登录后再查询，返回 (data, status_code)
     """
-    data = request.get_json() if request.method == "POST" else request.args
-    phonenum, password = data.get("phonenum"), data.get("password")
     # 检查登录信息，避免重复登录
-    login_info = load_login_info()
+    login_info = login_store.get(phonenum)
+    relogin_reason = "no_session"
     if (
-        phonenum in login_info
-        and login_info[phonenum].get("phonenum") == phonenum
-        and login_info[phonenum].get("password") == password
+        login_info
+        and login_info.get("phonenum") == phonenum
+        and login_info.get("password") == password
     ):
-        telecom.set_login_info(login_info[phonenum])
-        data = query_func(**kwargs)
+        client = clients.get(phonenum, login_info)
+        data = getattr(client, query_name)(**kwargs)
         if data.get("responseData"):
-            return jsonify(data), 200
+            return data, 200
         elif data.get("headerInfos", {}).get("code") != "X201":
             # X201 = token 过期
-            return jsonify(data), 400
+            return data, 400
+        token_refresher.observe_expiry(login_info)
+        relogin_reason = "expired"
     # 重新登录
-    login_data, status_code = login()
-    login_data = json.loads(login_data.data)
-    if status_code == 200:
-        telecom.set_login_info(login_data["responseData"]["data"]["loginSuccessResult"])
-        data = query_func(**kwargs)
+    if message := check_login_params(phonenum, password):
+        return {"message": message}, 400
+    metrics.relogins.inc((relogin_reason,))
+    login_data = coalesced_login(phonenum, password)
+    if (login_data.get("responseData") or {}).get("resultCode") == "0000":
+        client = clients.get(
+            phonenum, login_data["responseData"]["data"]["loginSuccessResult"]
+        )
+        data = getattr(client, query_name)(**kwargs)
         if data.get("responseData"):
-            return jsonify(data), 200
+            return data, 200
         else:
-            return jsonify(data), 400
+            return data, 400
     else:
-        return jsonify(login_data), 400
+        return login_data, 400
+
+
+def coalesced_fetch(phonenum, password, query_name, **kwargs):
+    """并发的相同查询（号码、接口、账期）只请求一次上游，结果共享；查询成功的号码由后台续期 token"""
+    key = (
+        "query",
+        phonenum,
+        password_digest(password),
+        query_name,
+        kwargs.get("billing_cycle"),
+        kwargs.get("flatten"),
+    )
+    data, status_code = single_flight.do(
+        key, fetch_data, phonenum, password, query_name, **kwargs
+    )
+    if status_code == 200:
+        token_refresher.touch(phonenum)
+    return data, status_code
+
+
+def cache_headers(state, age=0):
+    return {"X-Cache": state, "Age": str(int(age or 0))}
+
+
+def refresh_cache(key, phonenum, password, query_name):
+    """
+    后台刷新缓存（stale-while-revalidate）。
+    刷新在独立线程中执行，经 fetch_data 从 clients 取该号码自己的客户端，不会改动其他号码的登录状态
+    """
+    try:
+        data, status_code = coalesced_fetch(phonenum, password, query_name)
+        if status_code == 200:
+            response_cache.set(key, data)
+    except Exception as e:
+        print(f"后台刷新缓存失败：{phonenum} {query_name} - {e}")
+    finally:
+        response_cache.end_refresh(key)
+
+
+def cached_fetch(endpoint, query_name):
+    """带缓存的查询，返回 (data, status_code, headers)"""
+    data = get_request_data()
+    phonenum, password = data.get("phonenum"), data.get("password")
+    if not response_cache.enabled:
+        return (*coalesced_fetch(phonenum, password, query_name), {})
+    # 密码参与缓存键，密码不符时不会命中他人的缓存
+    key = (phonenum, password_digest(password), endpoint)
+    cached, age = response_cache.get(key)
+    if response_cache.is_fresh(age):
+        response_cache.record("hits")
+        return cached, 200, cache_headers("HIT", age)
+    if response_cache.is_revalidatable(age):
+        response_cache.record("stale_hits")
+        if response_cache.begin_refresh(key):
+            threading.Thread(
+                target=refresh_cache,
+                args=(key, phonenum, password, query_name),
+                daemon=True,
+            ).start()
+        return cached, 200, cache_headers("STALE", age)
+    response_cache.record("misses")
+    try:
+        data, status_code = coalesced_fetch(phonenum, password, query_name)
+    except Exception:
+        if cached is None:
+            raise
+        data, status_code = None, 502
+    if status_code == 200:
+        response_cache.set(key, data)
+        return data, 200, cache_headers("MISS")
+    if cached is not None:
+        # 上游失败时返回旧数据兜底（stale-if-error）
+        response_cache.record("stale_if_error")
+        return cached, 200, cache_headers("STALE-IF-ERROR", age)
+    return data, status_code, cache_headers("MISS")
 
 
 @app.route("/qryImportantData", methods=["POST", "GET"])
 def qry_important_data():
     """查询基本数据接口"""
-    return query_data(telecom.qry_important_data)
+    data, status_code, headers = cached_fetch("qryImportantData", "qry_important_data")
+    return jsonify(data), status_code, headers
 
 
 @app.route("/userFluxPackage", methods=["POST", "GET"])
 def user_flux_package():
     """查询流量包接口"""
-    return query_data(telecom.user_flux_package)
+    data, status_code, headers = cached_fetch("userFluxPackage", "user_flux_package")
+    return jsonify(data), status_code, headers
 
 
 @app.route("/qryShareUsage", methods=["POST", "GET"])
 def qry_share_usage():
-    """查询共享用量接口"""
-    if request.method == "POST":
-        data = request.get_json() or {}
-    else:
-        data = request.args
-    return query_data(telecom.qry_share_usage, billing_cycle=data.get("billing_cycle"))
+    """查询共享用量接口，flatten=true 时附带按成员展开的用量表 shareUsageTable"""
+    data = get_request_data()
+    data, status_code = coalesced_fetch(
+        data.get("phonenum"),
+        data.get("password"),
+        "qry_share_usage",
+        billing_cycle=data.get("billing_cycle"),
+        flatten=str(data.get("flatten", "")).lower() == "true",
+    )
+    return jsonify(data), status_code
 
 
 @app.route("/summary", methods=["POST", "GET"])
 def summary():
     """查询基本数据简化接口"""
-    important_data, status_code = query_data(telecom.qry_important_data)
+    important_data, status_code, headers = cached_fetch(
+        "qryImportantData", "qry_important_data"
+    )
     if status_code == 200:
-        data = telecom.to_summary(
-            json.loads(important_data.data)["responseData"]["data"]
+        phonenum = get_request_data().get("phonenum")
+        data = clients.get(phonenum).to_summary(
+            important_data["responseData"]["data"], phonenum
         )
-        return jsonify(data), 200
+        metrics.observe_summary(data)
+        return jsonify(data), 200, headers
+    return jsonify(important_data), status_code, headers
+
+
+@app.route("/metrics", methods=["GET"])
+def prometheus_metrics():
+    """Prometheus 指标"""
+    if METRICS_TOKEN and not hmac.compare_digest(
+        request.headers.get("Authorization", "").encode(), f"Bearer {METRICS_TOKEN}".encode()
+    ):
+        return "Unauthorized\n", 401, {"WWW-Authenticate": "Bearer"}
+    return metrics.render(), 200, {"Content-Type": "text/plain; version=0.0.4; charset=utf-8"}
 
 
 if __name__ == "__main__":
-    app.run(debug=os.environ.get("DEBUG", False), host="0.0.0.0", port=10000)
+    debug = os.environ.get("DEBUG", False)
+    # debug 模式下仅在 reloader 子进程中启动，避免重复续期
+    if os.environ.get("TOKEN_REFRESH", "true").lower() != "false" and (
+        not debug or os.environ.get("WERKZEUG_RUN_MAIN") == "true"
+    ):
+        token_refresher.start()
+    app.run(debug=debug, host="0.0.0.0", port=10000, threaded=True)
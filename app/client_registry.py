@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+# _*_ coding:utf-8 _*_
+
+import threading
+from collections import OrderedDict
+
+
+class ClientRegistry:
+    """
+    按号码维护独立的客户端实例，各自保存 token 等登录状态，互不干扰；
+    客户端共用 telecom_class 中进程内共享的连接池，超出 max_size 时按最近最少使用淘汰。
+    """
+
+    def __init__(self, factory, max_size=256):
+        self.factory = factory
+        self.max_size = max_size
+        self.clients = OrderedDict()
+        self.lock = threading.Lock()
+        self.stats = {"created": 0, "evictions": 0}
+
+    def get(self, phonenum, login_info=None):
+        """获取号码对应的客户端，传入 login_info 时同步登录状态"""
+        with self.lock:
+            client = self.clients.get(phonenum)
+            if client is None:
+                client = self.clients[phonenum] = self.factory()
+                self.stats["created"] += 1
+                while len(self.clients) > self.max_size:
+                    self.clients.popitem(last=False)
+                    self.stats["evictions"] += 1
+            else:
+                self.clients.move_to_end(phonenum)
+            if login_info is not None and (
+                client.token != login_info.get("token")
+                or client.login_info is not login_info
+            ):
+                client.set_login_info(login_info)
+        return client
+
+    def get_stats(self):
+        with self.lock:
+            stats = dict(self.stats)
+            stats["size"] = len(self.clients)
+        return stats
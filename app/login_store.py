@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+# _*_ coding:utf-8 _*_
+
+import os
+import json
+import time
+import tempfile
+import threading
+
+
+class LoginStore:
+    """
+    登录信息的内存存储：
+    - 读取走内存，仅在文件 mtime/size 变化时重新加载（最多每 check_interval 秒检查一次）
+    - 写入先更新内存，debounce 秒内的多次写入合并为一次落盘（write-behind）
+    - 落盘写入临时文件后 rename，避免写一半导致文件损坏
+    """
+
+    def __init__(self, path, debounce=1.0, check_interval=1.0):
+        self.path = path
+        self.debounce = debounce
+        self.check_interval = check_interval
+        self.data = {}
+        self.dirty = set()
+        self.signature = None
+        self.checked_at = 0
+        self.timer = None
+        self.lock = threading.RLock()
+        self.stats = {"reads": 0, "reloads": 0, "sets": 0, "writes": 0}
+        self._reload_if_changed(force=True)
+
+    def _file_signature(self):
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def _reload_if_changed(self, force=False):
+        now = time.monotonic()
+        if not force and now - self.checked_at < self.check_interval:
+            return
+        self.checked_at = now
+        signature = self._file_signature()
+        if signature == self.signature:
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            data = {}
+        except ValueError:
+            # 文件被外部写到一半时保留内存数据，下次检查再加载
+            return
+        # 尚未落盘的修改以内存为准
+        for phonenum in self.dirty:
+            data[phonenum] = self.data[phonenum]
+        self.data = data
+        self.signature = signature
+        self.stats["reloads"] += 1
+
+    def get(self, phonenum):
+        with self.lock:
+            self._reload_if_changed()
+            self.stats["reads"] += 1
+            return self.data.get(phonenum)
+
+    def all(self):
+        with self.lock:
+            self._reload_if_changed()
+            self.stats["reads"] += 1
+            return dict(self.data)
+
+    def set(self, phonenum, login_info):
+        with self.lock:
+            self._reload_if_changed()
+            self.data[phonenum] = login_info
+            self.dirty.add(phonenum)
+            self.stats["sets"] += 1
+            if self.debounce <= 0:
+                self.flush()
+            elif self.timer is None:
+                self.timer = threading.Timer(self.debounce, self.flush)
+                self.timer.daemon = True
+                self.timer.start()
+
+    def flush(self):
+        with self.lock:
+            if self.timer is not None:
+                self.timer.cancel()
+                self.timer = None
+            if not self.dirty:
+                return
+            directory = os.path.dirname(os.path.abspath(self.path))
+            os.makedirs(directory, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+            try:
+                with os.fdopen(fd, "w", encoding="utf-8") as f:
+                    json.dump(self.data, f, ensure_ascii=False, indent=2)
+                os.replace(tmp_path, self.path)
+            except BaseException:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                raise
+            self.dirty.clear()
+            self.signature = self._file_signature()
+            self.stats["writes"] += 1
+
+    def get_stats(self):
+        with self.lock:
+            stats = dict(self.stats)
+            stats["size"] = len(self.data)
+            stats["pending"] = len(self.dirty)
+        return stats
@@ -0,0 +1,264 @@
+#!/usr/bin/env python3
+# _*_ coding:utf-8 _*_
+
+import bisect
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+# 上游接口耗时直方图的分桶（秒）
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=""):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name, help, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.values = {}  # 标签值元组 -> 值
+        self.lock = threading.Lock()
+
+    def remove(self, labels=()):
+        with self.lock:
+            self.values.pop(tuple(labels), None)
+
+    def samples(self):
+        """[(后缀, 标签值, 额外标签, 值)]"""
+        with self.lock:
+            return [("", labels, "", value) for labels, value in self.values.items()]
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        for suffix, labels, extra, value in self.samples():
+            lines.append(
+                f"{self.name}{suffix}{_format_labels(self.labelnames, labels, extra)} "
+                f"{_format_value(value)}"
+            )
+        return lines
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, labels=(), amount=1):
+        labels = tuple(labels)
+        with self.lock:
+            self.values[labels] = self.values.get(labels, 0) + amount
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def set(self, labels=(), value=0):
+        with self.lock:
+            self.values[tuple(labels)] = value
+
+    def inc(self, labels=(), amount=1):
+        labels = tuple(labels)
+        with self.lock:
+            self.values[labels] = self.values.get(labels, 0) + amount
+
+    def dec(self, labels=(), amount=1):
+        self.inc(labels, -amount)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, labels=(), value=0.0):
+        labels = tuple(labels)
+        # 每个桶只记录落入本桶的次数，输出时再累加
+        index = bisect.bisect_left(self.buckets, value)
+        with self.lock:
+            entry = self.values.get(labels)
+            if entry is None:
+                entry = self.values[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            entry[0][index] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    def samples(self):
+        with self.lock:
+            values = [
+                (labels, list(counts), total, count)
+                for labels, (counts, total, count) in self.values.items()
+            ]
+        samples = []
+        for labels, counts, total, count in values:
+            cumulative = 0
+            for bound, bucket_count in zip((*self.buckets, float("inf")), counts):
+                cumulative += bucket_count
+                samples.append(("_bucket", labels, f'le="{_format_value(bound)}"', cumulative))
+            samples.append(("_sum", labels, "", total))
+            samples.append(("_count", labels, "", count))
+        return samples
+
+
+class CallbackMetric(_Metric):
+    """抓取时调用 func 取值，func 返回 {标签值元组: 值}，用于导出其他组件已有的统计"""
+
+    def __init__(self, name, kind, help, labelnames, func):
+        super().__init__(name, help, labelnames)
+        self.kind = kind
+        self.func = func
+
+    def samples(self):
+        return [("", tuple(labels), "", value) for labels, value in self.func().items()]
+
+
+# 按号码指标的标签模式
+ACCOUNT_LABEL_MODES = ("none", "masked", "hashed", "full")
+
+
+def mask_phonenum(phonenum):
+    phonenum = str(phonenum)
+    return f"{phonenum[:3]}****{phonenum[-4:]}" if len(phonenum) >= 11 else "****"
+
+
+def upstream_code(data):
+    """上游响应的结果码：headerInfos.code 非 0000（如 X201）时取它，否则取 responseData.resultCode"""
+    if not isinstance(data, dict):
+        return "invalid"
+    header_code = (data.get("headerInfos") or {}).get("code")
+    result_code = (data.get("responseData") or {}).get("resultCode")
+    if header_code and header_code != "0000":
+        return str(header_code)[:16]
+    return str(result_code or header_code or "unknown")[:16]
+
+
+class ApiMetrics:
+    """
+    API 服务的 Prometheus 指标：上游接口耗时与结果码、HTTP 请求数、重新登录次数、
+    进行中的请求数，以及按号码的余额/通用流量（最近一次 to_summary）。
+
+    号码标签的基数由 account_labels 与 max_accounts 控制：
+    none（默认，不导出按号码的指标）、masked（138****0001）、hashed（号码哈希前 12 位）、full（完整号码）；
+    超过 max_accounts 个号码时淘汰最久未更新的号码。
+    """
+
+    def __init__(self, account_labels="none", max_accounts=100):
+        if account_labels not in ACCOUNT_LABEL_MODES:
+            print(f"未知的号码标签模式 {account_labels}，不导出按号码的指标")
+            account_labels = "none"
+        self.account_labels = account_labels
+        self.max_accounts = max_accounts
+        self.accounts = OrderedDict()  # 标签 -> None，按最近更新排序
+        self.lock = threading.Lock()
+        self.metrics = []
+        self.upstream_latency = self.add(
+            Histogram("telecom_upstream_request_duration_seconds", "上游接口请求耗时（秒）", ("endpoint",))
+        )
+        self.upstream_requests = self.add(
+            Counter("telecom_upstream_requests_total", "上游接口请求数，按结果码", ("endpoint", "code"))
+        )
+        self.upstream_in_flight = self.add(
+            Gauge("telecom_upstream_requests_in_flight", "进行中的上游请求数", ("endpoint",))
+        )
+        self.http_requests = self.add(
+            Counter("telecom_http_requests_total", "API 请求数，按路由与状态码", ("path", "status"))
+        )
+        self.http_in_flight = self.add(
+            Gauge("telecom_http_requests_in_flight", "进行中的 API 请求数")
+        )
+        self.relogins = self.add(
+            Counter("telecom_relogins_total", "查询时重新登录次数，expired 为 token 过期（X201）", ("reason",))
+        )
+        self.account_balance = self.add(
+            Gauge("telecom_account_balance_yuan", "账户余额（元）", ("account",))
+        )
+        self.account_common_used = self.add(
+            Gauge("telecom_account_common_used_bytes", "通用流量已用（字节）", ("account",))
+        )
+        self.account_common_total = self.add(
+            Gauge("telecom_account_common_total_bytes", "通用流量总量（字节）", ("account",))
+        )
+
+    def add(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def add_callback(self, name, kind, help, labelnames, func):
+        return self.add(CallbackMetric(name, kind, help, labelnames, func))
+
+    def render(self):
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+    def observe_upstream(self, url, func, *args, **kwargs):
+        """调用 func 发出上游请求并记录耗时与结果码"""
+        endpoint = url.rsplit("/", 1)[-1]
+        self.upstream_in_flight.inc((endpoint,))
+        start = time.perf_counter()
+        code = "exception"
+        try:
+            data = func(*args, **kwargs)
+            code = upstream_code(data)
+            return data
+        finally:
+            self.upstream_latency.observe((endpoint,), time.perf_counter() - start)
+            self.upstream_requests.inc((endpoint, code))
+            self.upstream_in_flight.dec((endpoint,))
+
+    def instrument(self, client_class):
+        """返回 client_class 的子类，所有上游请求都经过 observe_upstream"""
+        metrics = self
+
+        class InstrumentedClient(client_class):
+            def _post(self, url, body):
+                return metrics.observe_upstream(url, super()._post, url, body)
+
+        InstrumentedClient.__name__ = client_class.__name__
+        InstrumentedClient.__qualname__ = client_class.__qualname__
+        return InstrumentedClient
+
+    def account_label(self, phonenum):
+        if self.account_labels == "full":
+            return str(phonenum)
+        if self.account_labels == "hashed":
+            return hashlib.sha256(str(phonenum).encode()).hexdigest()[:12]
+        return mask_phonenum(phonenum)
+
+    def observe_summary(self, summary):
+        """记录 to_summary 结果中的余额与通用流量"""
+        if self.account_labels == "none" or self.max_accounts <= 0:
+            return
+        label = (self.account_label(summary.get("phonenum", "")),)
+        gauges = (self.account_balance, self.account_common_used, self.account_common_total)
+        with self.lock:
+            self.accounts[label] = None
+            self.accounts.move_to_end(label)
+            while len(self.accounts) > self.max_accounts:
+                old, _ = self.accounts.popitem(last=False)
+                for gauge in gauges:
+                    gauge.remove(old)
+            self.account_balance.set(label, summary.get("balance", 0) / 100)
+            self.account_common_used.set(label, summary.get("commonUse", 0) * 1024)
+            self.account_common_total.set(label, summary.get("commonTotal", 0) * 1024)
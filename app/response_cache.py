@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+# _*_ coding:utf-8 _*_
+
+import threading
+import time
+from collections import OrderedDict
+
+
+class ResponseCache:
+    """
+    按 (号码, 接口) 缓存上游响应，支持 TTL、stale-while-revalidate、stale-if-error 与 LRU 淘汰。
+
+    - age < ttl：直接命中
+    - ttl <= age < ttl + stale_ttl：返回旧数据，并由调用方在后台刷新
+    - 上游失败且 age < stale_if_error：返回旧数据兜底
+    """
+
+    def __init__(self, ttl=60, stale_ttl=300, stale_if_error=3600, max_size=1024):
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.stale_if_error = max(stale_if_error, ttl + stale_ttl)
+        self.max_size = max_size
+        self.entries = OrderedDict()
+        self.refreshing = set()
+        self.lock = threading.Lock()
+        self.stats = {
+            "hits": 0,
+            "stale_hits": 0,
+            "misses": 0,
+            "stale_if_error": 0,
+            "evictions": 0,
+        }
+
+    @property
+    def enabled(self):
+        return self.ttl > 0 and self.max_size > 0
+
+    def get(self, key):
+        """返回 (value, age)，未缓存或已超过兜底时长时返回 (None, None)"""
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None, None
+            value, stored_at = entry
+            age = time.monotonic() - stored_at
+            if age >= self.stale_if_error:
+                del self.entries[key]
+                return None, None
+            self.entries.move_to_end(key)
+            return value, age
+
+    def set(self, key, value):
+        with self.lock:
+            self.entries[key] = (value, time.monotonic())
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+                self.stats["evictions"] += 1
+
+    def is_fresh(self, age):
+        return age is not None and age < self.ttl
+
+    def is_revalidatable(self, age):
+        return age is not None and age < self.ttl + self.stale_ttl
+
+    def begin_refresh(self, key):
+        """同一个 key 同时只允许一个后台刷新，返回是否获得刷新权"""
+        with self.lock:
+            if key in self.refreshing:
+                return False
+            self.refreshing.add(key)
+            return True
+
+    def end_refresh(self, key):
+        with self.lock:
+            self.refreshing.discard(key)
+
+    def record(self, stat):
+        with self.lock:
+            self.stats[stat] += 1
+
+    def get_stats(self):
+        with self.lock:
+            stats = dict(self.stats)
+            stats["size"] = len(self.entries)
+        lookups = stats["hits"] + stats["stale_hits"] + stats["misses"]
+        stats["hit_ratio"] = (
+            round((stats["hits"] + stats["stale_hits"]) / lookups, 4) if lookups else 0
+        )
+        return stats
@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+# _*_ coding:utf-8 _*_
+
+import random
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+
+class TokenRefresher:
+    """
+    后台 token 续期：根据 createTime 计算 token 年龄，在过期前续期，避免请求时才发现 X201。
+
+    token 有效期通过 observe_expiry 学习：每次遇到 X201 记录该 token 的年龄，
+    取最近若干次观测的低分位数（默认 25%）作为有效期（X201 发现时 token 已过期一段时间，取偏低值更保守）。
+    短于 min_lifetime 的观测视为异常值丢弃（如在其他设备登录导致 token 提前失效），
+    避免一次提前失效把有效期拉到几秒、导致每个周期所有账号都重新登录；
+    年龄小于 min_refresh_age 的 token 不续期。
+    尚未学到有效期且未配置 lifetime 时不做提前续期。
+
+    只续期最近一个有效期内通过 touch 记录过查询的号码，长期无人查询的号码不再续期，
+    避免空闲的服务也按周期为所有已保存的账号登录。
+    """
+
+    def __init__(
+        self,
+        load_func,
+        login_func,
+        lifetime=0,
+        interval=60,
+        margin=0.1,
+        jitter=300,
+        min_lifetime=600,
+        min_refresh_age=300,
+        quantile=0.25,
+    ):
+        self.load_func = load_func  # 返回 {phonenum: login_info}
+        self.login_func = login_func  # login_func(phonenum, password) 登录并保存
+        self.default_lifetime = lifetime
+        self.interval = interval
+        self.margin = margin
+        self.jitter = jitter
+        self.min_lifetime = min_lifetime
+        self.min_refresh_age = min_refresh_age
+        self.quantile = quantile
+        self.observations = deque(maxlen=20)
+        self.offsets = {}
+        self.retry_after = {}
+        self.last_access = {}  # 号码 -> 最近一次查询的 time.monotonic()
+        self.lock = threading.Lock()
+        self.stop_event = threading.Event()
+        self.thread = None
+        self.stats = {
+            "refreshed": 0,
+            "failed": 0,
+            "expired_observed": 0,
+            "expired_outliers": 0,
+            "idle_dropped": 0,
+        }
+
+    @staticmethod
+    def token_age(login_info, now=None):
+        """token 年龄（秒），无法解析 createTime 时返回 None"""
+        try:
+            created = datetime.strptime(login_info["createTime"], "%Y-%m-%d %H:%M:%S")
+        except (KeyError, TypeError, ValueError):
+            return None
+        return ((now or datetime.now()) - created).total_seconds()
+
+    def touch(self, phonenum, now=None):
+        """记录号码被查询，之后一个有效期内由后台续期"""
+        with self.lock:
+            self.last_access[phonenum] = now or time.monotonic()
+
+    def active_phonenums(self, now=None):
+        """最近一个有效期内查询过的号码，超过的移出续期集合"""
+        lifetime = self.lifetime()
+        now = now or time.monotonic()
+        with self.lock:
+            idle = [p for p, t in self.last_access.items() if now - t > lifetime]
+            for phonenum in idle:
+                del self.last_access[phonenum]
+                self.retry_after.pop(phonenum, None)
+            self.stats["idle_dropped"] += len(idle)
+            return set(self.last_access)
+
+    def observe_expiry(self, login_info):
+        """记录一次 X201，用过期时的 token 年龄学习有效期"""
+        age = self.token_age(login_info)
+        if age is None or age <= 0:
+            return
+        with self.lock:
+            self.stats["expired_observed"] += 1
+            if age < self.min_lifetime:
+                self.stats["expired_outliers"] += 1
+                return
+            self.observations.append(age)
+
+    def lifetime(self):
+        with self.lock:
+            observations = sorted(self.observations)
+        if not observations:
+            return self.default_lifetime
+        index = min(len(observations) - 1, int(len(observations) * self.quantile))
+        return observations[index]
+
+    def _offset(self, phonenum, create_time):
+        # 每个 token 固定一个随机提前量，避免所有账号在同一秒续期
+        key = (phonenum, create_time)
+        with self.lock:
+            if key not in self.offsets:
+                self.offsets = {k: v for k, v in self.offsets.items() if k[0] != phonenum}
+                self.offsets[key] = random.uniform(0, self.jitter)
+            return self.offsets[key]
+
+    def is_due(self, phonenum, login_info, now=None):
+        lifetime = self.lifetime()
+        age = self.token_age(login_info, now)
+        if not lifetime or age is None:
+            return False
+        refresh_at = lifetime * (1 - self.margin) - self._offset(
+            phonenum, login_info.get("createTime")
+        )
+        return age >= max(refresh_at, self.min_refresh_age)
+
+    def run_once(self):
+        now = datetime.now()
+        active = self.active_phonenums()
+        for phonenum, login_info in list(self.load_func().items()):
+            if phonenum not in active or not login_info.get("password"):
+                continue
+            if self.retry_after.get(phonenum, 0) > time.monotonic():
+                continue
+            if not self.is_due(phonenum, login_info, now):
+                continue
+            try:
+                data = self.login_func(phonenum, login_info["password"])
+                success = (data.get("responseData") or {}).get("resultCode") == "0000"
+            except Exception as e:
+                print(f"token 续期异常：{phonenum} - {e}")
+                success = False
+            with self.lock:
+                self.stats["refreshed" if success else "failed"] += 1
+            if success:
+                self.retry_after.pop(phonenum, None)
+                print(f"token 已提前续期：{phonenum}")
+            else:
+                # 续期失败时退避，避免频繁登录触发风控
+                self.retry_after[phonenum] = time.monotonic() + self.interval * 10
+
+    def _run(self):
+        while not self.stop_event.wait(self.interval):
+            try:
+                self.run_once()
+            except Exception as e:
+                print(f"token 续期任务出错：{e}")
+
+    def start(self):
+        if self.thread is None:
+            self.thread = threading.Thread(
+                target=self._run, name="token-refresher", daemon=True
+            )
+            self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+
+    def get_stats(self):
+        with self.lock:
+            stats = dict(self.stats)
+            stats["active"] = len(self.last_access)
+        stats["lifetime"] = self.lifetime()
+        return stats
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+# _*_ coding:utf-8 _*_
+# 请求体构造基准：对比原每次重建 headerInfos/content 并重新解析 RSA 公钥的实现
+# 与按账号缓存模板、共享 RSA 加密器的实现，输出每次请求的耗时和内存分配
+# 用法：python benchmarks/bench_envelope.py [次数]
+
+import os
+import sys
+import base64
+import random
+import timeit
+import tracemalloc
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from Crypto.PublicKey import RSA
+from Crypto.Cipher import PKCS1_v1_5
+from telecom_class import Telecom, TELECOM_PUBLIC_KEY_PEM
+
+
+def legacy_trans_number(phonenum, encode=True):
+    result = ""
+    caesar_size = 2 if encode else -2
+    for char in phonenum:
+        result += chr(ord(char) + caesar_size & 65535)
+    return result
+
+
+def legacy_encrypt(str):
+    public_key = RSA.import_key(TELECOM_PUBLIC_KEY_PEM.encode())
+    cipher = PKCS1_v1_5.new(public_key)
+    return base64.b64encode(cipher.encrypt(str.encode())).decode()
+
+
+def legacy_login_body(self, phonenum, password):
+    uuid = str(random.randint(1000000000000000, 9999999999999999))
+    ts = datetime.now().strftime("%Y%m%d%H%M%S")
+    enc_str = f"iPhone 14 13.2.{uuid[:12]}{phonenum}{ts}{password}0$$$0."
+    return {
+        "content": {
+            "fieldData": {
+                "accountType": "",
+                "authentication": legacy_trans_number(password),
+                "deviceUid": uuid[:16],
+                "isChinatelecom": "",
+                "loginAuthCipherAsymmertric": legacy_encrypt(enc_str),
+                "loginType": "4",
+                "phoneNum": legacy_trans_number(phonenum),
+                "systemVersion": "13.2.3",
+            },
+            "attach": "test",
+        },
+        "headerInfos": {
+            "code": "userLoginNormal",
+            "clientType": self.client_type,
+            "timestamp": ts,
+            "shopId": "20002",
+            "source": "110003",
+            "sourcePassword": "Sid98s",
+            "token": "",
+            "userLoginName": legacy_trans_number(phonenum),
+        },
+    }
+
+
+def legacy_important_data_body(self, **kwargs):
+    ts = datetime.now().strftime("%Y%m%d%H%M00")
+    return {
+        "content": {
+            "fieldData": {
+                "provinceCode": self.login_info["provinceCode"] or "600101",
+                "cityCode": self.login_info["cityCode"] or "8441900",
+                "shopId": "20002",
+                "isChinatelecom": "0",
+                "account": legacy_trans_number(self.phonenum),
+            },
+            "attach": "test",
+        },
+        "headerInfos": {
+            "code": "userFluxPackage",
+            "clientType": self.client_type,
+            "timestamp": ts,
+            "shopId": "20002",
+            "source": "110003",
+            "sourcePassword": "Sid98s",
+            "userLoginName": legacy_trans_number(self.phonenum),
+            "token": kwargs.get("token") or self.token,
+        },
+    }
+
+
+def measure(func, number):
+    """返回 (每次耗时 µs, 每次保留的内存字节, 每次临时分配峰值字节)"""
+    seconds = min(timeit.repeat(func, number=number, repeat=3)) / number
+    tracemalloc.start()
+    results = []
+    before, _ = tracemalloc.get_traced_memory()
+    for _ in range(number):
+        results.append(func())
+    after, _ = tracemalloc.get_traced_memory()
+    tracemalloc.reset_peak()
+    base, _ = tracemalloc.get_traced_memory()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return seconds * 1e6, (after - before) / number, peak - base
+
+
+def strip_volatile(body):
+    """去掉随机、加密与时间戳字段后用于比较两种实现的结果"""
+    field_data = dict(body["content"]["fieldData"])
+    for key in ("deviceUid", "loginAuthCipherAsymmertric"):
+        field_data.pop(key, None)
+    header = {k: v for k, v in body["headerInfos"].items() if k != "timestamp"}
+    return {"content": {**body["content"], "fieldData": field_data}, "headerInfos": header}
+
+
+if __name__ == "__main__":
+    number = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    telecom = Telecom()
+    telecom.set_login_info(
+        {"phonenum": "13800000001", "password": "123456", "token": "tok",
+         "provinceCode": "600101", "cityCode": "8441900"}
+    )
+    cases = (
+        ("qryImportantData", lambda: legacy_important_data_body(telecom),
+         telecom.build_important_data_body, number),
+        ("userLoginNormal", lambda: legacy_login_body(telecom, "13800000001", "123456"),
+         lambda: telecom.build_login_body("13800000001", "123456"), max(number // 20, 10)),
+    )
+    for name, legacy, current, count in cases:
+        assert strip_volatile(legacy()) == strip_volatile(current()), f"{name} 请求体不一致"
+        legacy_stats = measure(legacy, count)
+        current_stats = measure(current, count)
+        print(f"{name}（{count} 次）")
+        for label, (us, kept, peak) in (("原实现", legacy_stats), ("模板", current_stats)):
+            print(f"  {label}: {us:8.1f} µs/次，保留 {kept:6.0f} B/次，临时峰值 {peak:6.0f} B")
+        print(f"  加速 {legacy_stats[0] / current_stats[0]:.2f}x")
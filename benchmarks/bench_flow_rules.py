@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+# _*_ coding:utf-8 _*_
+# flowList 识别基准：对比原 to_summary 中的逐条子串判断与规则表 classify_flow_items
+# 用法：python benchmarks/bench_flow_rules.py [流量包数量]
+
+import os
+import re
+import sys
+import time
+import random
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from telecom_class import Telecom, classify_flow_items, get_flow_stats
+
+
+def make_flow_list(count, seed=0):
+    """生成包含各类流量包及非流量项的 flowList"""
+    rng = random.Random(seed)
+    units = ("KB", "MB", "GB")
+    items = []
+    for i in range(count):
+        used = f"{rng.randint(0, 1024)}{rng.choice(units)}"
+        left = f"{rng.randint(0, 1024)}{rng.choice(units)}"
+        shape = i % 5
+        if shape == 0:
+            items.append(
+                {"title": f"国内通用流量{i}", "leftTitle": "已用", "leftTitleHh": used,
+                 "rightTitle": "剩余", "rightTitleHh": left, "rightTitleEnd": ""}
+            )
+        elif shape == 1:
+            items.append(
+                {"title": f"定向流量{i}", "leftTitle": "超出", "leftTitleHh": used,
+                 "rightTitle": "", "rightTitleHh": "", "rightTitleEnd": f"共/{left}"}
+            )
+        elif shape == 2:
+            items.append(
+                {"title": f"无限流量{i}", "leftTitle": "已用", "leftTitleHh": used,
+                 "rightTitle": f"达{rng.randint(1, 100)}GB后降速", "rightTitleHh": "",
+                 "rightTitleEnd": ""}
+            )
+        elif shape == 3:
+            items.append(
+                {"title": f"未知流量{i}", "leftTitle": "有效期", "leftTitleHh": "",
+                 "rightTitle": "", "rightTitleHh": "", "rightTitleEnd": ""}
+            )
+        else:
+            items.append(
+                {"title": f"通话{i}", "leftTitle": "已用", "leftTitleHh": "10",
+                 "rightTitle": "剩余", "rightTitleHh": "90", "rightTitleEnd": ""}
+            )
+    return items
+
+
+def legacy_flow_items(telecom, flow_lists):
+    """原 to_summary 的实现（去掉 print），用于对比"""
+    flowItems = []
+    for item in flow_lists:
+        if "流量" not in item["title"]:
+            continue
+        if "已用" in item["leftTitle"] and "剩余" in item["rightTitle"]:
+            item_use = telecom.convert_flow(item["leftTitleHh"], "KB")
+            item_balance = telecom.convert_flow(item["rightTitleHh"], "KB")
+            item_total = item_use + item_balance
+        elif "超出" in item["leftTitle"] and "/" in item["rightTitleEnd"]:
+            item_balance = -telecom.convert_flow(item["leftTitleHh"], "KB")
+            item_use = (
+                telecom.convert_flow(item["rightTitleEnd"].split("/")[1], "KB")
+                - item_balance
+            )
+            item_total = item_use + item_balance
+        elif "已用" in item["leftTitle"] and "降速" in item["rightTitle"]:
+            item_total = telecom.convert_flow(
+                re.search(r"(\d+[KMGT]B)", item["rightTitle"]).group(1), "KB"
+            )
+            item_use = telecom.convert_flow(item["leftTitleHh"], "KB")
+            item_balance = item_total - item_use
+        else:
+            continue
+        flowItems.append(
+            {"name": item["title"], "use": item_use, "balance": item_balance,
+             "total": item_total}
+        )
+    return flowItems
+
+
+def bench(func, *args, repeat=5):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(*args)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    flow_list = make_flow_list(count)
+    telecom = Telecom()
+    legacy_time, legacy = bench(legacy_flow_items, telecom, flow_list)
+    rules_time, current = bench(classify_flow_items, flow_list)
+    assert legacy == current, "识别结果不一致"
+    print(f"flowList {count} 项，识别 {len(current)} 个流量包")
+    print(f"原实现:   {legacy_time * 1000:.1f} ms")
+    print(f"规则表:   {rules_time * 1000:.1f} ms（{legacy_time / rules_time:.2f}x）")
+    stats = get_flow_stats()
+    stats.pop("recent_unmatched")
+    print(f"识别统计: {stats}")
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+# _*_ coding:utf-8 _*_
+# 共享用量解码基准：对比原逐字符拼接的 trans_number 解码与移位表 str.translate 批量解码
+# 用法：python benchmarks/bench_share_usage.py [成员数量] [共享类型数量]
+
+import os
+import sys
+import copy
+import time
+import random
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from telecom_class import Telecom
+
+
+def make_share_usage(members, share_types, seed=0):
+    """生成家庭套餐共享用量响应，号码字段为加密后的形式"""
+    rng = random.Random(seed)
+    telecom = Telecom()
+    phones = [f"1{rng.randint(3000000000, 9999999999)}" for _ in range(members)]
+    encoded = [telecom.trans_number(phone) for phone in phones]
+    return {
+        "responseData": {
+            "data": {
+                "sharePhoneBeans": [{"sharePhoneNum": phone} for phone in encoded],
+                "shareTypeBeans": [
+                    {
+                        "shareTypeName": f"共享类型{t}",
+                        "shareUsageInfos": [
+                            {
+                                "title": f"共享流量{t}-{i}",
+                                "totalAmount": 10 * 1024 * 1024,
+                                "shareUsageAmounts": [
+                                    {"phoneNum": phone, "usageAmount": rng.randint(0, 10**6)}
+                                    for phone in encoded
+                                ],
+                            }
+                            for i in range(2)
+                        ],
+                    }
+                    for t in range(share_types)
+                ],
+            }
+        }
+    }
+
+
+def legacy_trans_number(phonenum, encode=True):
+    result = ""
+    caesar_size = 2 if encode else -2
+    for char in phonenum:
+        result += chr(ord(char) + caesar_size & 65535)
+    return result
+
+
+def legacy_decode(data):
+    """原 decode_share_usage 的实现，用于对比"""
+    if data.get("responseData") and data.get("responseData").get("data", {}).get(
+        "sharePhoneBeans", []
+    ):
+        for item in data["responseData"]["data"]["sharePhoneBeans"]:
+            item["sharePhoneNum"] = legacy_trans_number(item["sharePhoneNum"], False)
+        for share_type in data["responseData"]["data"]["shareTypeBeans"]:
+            for share_info in share_type["shareUsageInfos"]:
+                for share_amount in share_info["shareUsageAmounts"]:
+                    share_amount["phoneNum"] = legacy_trans_number(
+                        share_amount["phoneNum"], False
+                    )
+    return data
+
+
+def bench(func, data, repeat=5):
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        payload = copy.deepcopy(data)
+        start = time.perf_counter()
+        result = func(payload)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+if __name__ == "__main__":
+    members = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    share_types = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    data = make_share_usage(members, share_types)
+    telecom = Telecom()
+    legacy_time, legacy = bench(legacy_decode, data)
+    table_time, current = bench(telecom.decode_share_usage, data)
+    flat_time, flat = bench(lambda d: telecom.decode_share_usage(d, flatten=True), data)
+    assert legacy == current, "解码结果不一致"
+    table = flat.pop("shareUsageTable")
+    assert legacy == flat and len(table) == members * share_types * 2
+    print(f"成员 {members}，共享类型 {share_types}，号码字段 {members * (share_types * 2 + 1)} 个")
+    print(f"原实现:       {legacy_time * 1000:.1f} ms")
+    print(f"移位表:       {table_time * 1000:.1f} ms（{legacy_time / table_time:.2f}x）")
+    print(f"移位表+展开:  {flat_time * 1000:.1f} ms，展开 {len(table)} 行")
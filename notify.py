@@ -9,13 +9,26 @@ import re
 import threading
 import time
 import urllib.parse
+import uuid
 import smtplib
+import atexit
+import itertools
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
 from email.mime.text import MIMEText
 from email.header import Header
 from email.utils import formataddr
+from typing import Optional
 
+import asyncio
 import requests
 
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
 # 原先的 print 函数和主线程的锁
 _print = print
 mutex = threading.Lock()
@@ -30,9 +43,60 @@ def print(text, *args, **kw):
         _print(text, *args, **kw)
 
 
+_config_versions = itertools.count(1)
+
+
+class _PushConfig(dict):
+    """推送配置，任何修改都会更新 version，用于判断已启用渠道等缓存是否失效"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.version = next(_config_versions)
+
+    def _changed(self):
+        self.version = next(_config_versions)
+
+    def __setitem__(self, key, value):
+        # 值未变化时不使缓存失效，重复 update 相同配置不会触发重新计算
+        if key not in self or self.get(key) != value:
+            super().__setitem__(key, value)
+            self._changed()
+
+    def __delitem__(self, key):
+        super().__delitem__(key)
+        self._changed()
+
+    def __ior__(self, other):
+        self.update(other)
+        return self
+
+    def update(self, *args, **kwargs):
+        for key, value in dict(*args, **kwargs).items():
+            self[key] = value
+
+    def setdefault(self, key, default=None):
+        if key not in self:
+            self[key] = default
+        return self[key]
+
+    def pop(self, *args):
+        value = super().pop(*args)
+        self._changed()
+        return value
+
+    def popitem(self):
+        item = super().popitem()
+        self._changed()
+        return item
+
+    def clear(self):
+        super().clear()
+        self._changed()
+
+
 # 通知服务
 # fmt: off
-push_config = {
+push_config = _PushConfig({
     'HITOKOTO': False,                  # 启用一言（随机句子）
 
     'BARK_PUSH': '',                    # bark IP 或设备码，例：https://api.day.app/DxHcxxxxxRxxxxxxcm/
@@ -137,7 +201,7 @@ push_config = {
     'DODO_BOTID': '',                   # DoDo机器人的id
     'DODO_LANDSOURCEID': '',            # DoDo机器人所在的群ID
     'DODO_SOURCEID': '',                # DoDo机器人推送目标用户的ID
-}
+})
 # fmt: on
 
 for k in push_config:
@@ -145,13 +209,84 @@ for k in push_config:
         v = os.getenv(k)
         push_config[k] = v
 
+def _env_positive(name: str, default, cast=float):
+    """读取正数环境变量，格式无效时提示并使用默认值"""
+    value = os.getenv(name)
+    if not value:
+        return default
+    try:
+        number = cast(value)
+        if number > 0:
+            return number
+    except ValueError:
+        pass
+    print(f"环境变量 {name}={value!r} 应为正数，使用默认值 {default}")
+    return default
+
+
+# 推送请求默认超时（秒）与推送线程池大小
+NOTIFY_TIMEOUT = _env_positive("NOTIFY_TIMEOUT", 15.0)
+NOTIFY_WORKERS = _env_positive("NOTIFY_WORKERS", 4, int)
+
+
+class TimeoutSession(requests.Session):
+    """未指定 timeout 的请求使用默认超时，避免推送服务无响应时一直阻塞"""
+
+    def __init__(self, timeout=NOTIFY_TIMEOUT):
+        super().__init__()
+        self.timeout = timeout
+
+    def request(self, method, url, **kwargs):
+        kwargs.setdefault("timeout", self.timeout)
+        return super().request(method, url, **kwargs)
+
+
+_sessions = {}
+_sessions_lock = threading.Lock()
+
+
+def get_session(channel: str) -> requests.Session:
+    """每个推送渠道一个长连接会话，多批次推送时复用 TCP/TLS 连接"""
+    session = _sessions.get(channel)
+    if session is None:
+        with _sessions_lock:
+            session = _sessions.get(channel)
+            if session is None:
+                session = _sessions[channel] = TimeoutSession()
+    return session
+
+
+# 各渠道请求超时（秒），未列出的使用 NOTIFY_TIMEOUT
+CHANNEL_TIMEOUTS = {"telegram_bot": max(NOTIFY_TIMEOUT, 30)}
+
 
-def bark(title: str, content: str) -> None:
+def channel_timeout(channel: str) -> float:
+    return CHANNEL_TIMEOUTS.get(channel, NOTIFY_TIMEOUT)
+
+
+def send_http(channel: str, title: str, content: str):
     """
-    使用 bark 推送消息。
+    同步发送基于 HTTP 的渠道：{channel}_request 构造请求（dict: method/url/data/headers/params/proxies），
+    {channel}_result 处理响应（json 或 (状态码, 文本)），返回新的请求时继续发送（如备用地址），
+    返回 False 表示推送失败
     """
+    build, handle, response_type = HTTP_CHANNELS[channel]
+    request = build(title, content)
+    session = get_session(channel)
+    while isinstance(request, dict):
+        response = session.request(timeout=channel_timeout(channel), **request)
+        if response_type == "json":
+            payload = response.json()
+        else:
+            payload = (response.status_code, response.text)
+        request = handle(payload, request)
+    return request is not False
+
+
+def bark_request(title: str, content: str):
+    """构造 bark 推送请求，未配置时返回 None"""
     if not push_config.get("BARK_PUSH"):
-        return
+        return None
     print("bark 服务启动")
 
     if push_config.get("BARK_PUSH").startswith("http"):
@@ -180,14 +315,22 @@ def bark(title: str, content: str) -> None:
     ):
         data[bark_params.get(pair[0])] = pair[1]
     headers = {"Content-Type": "application/json;charset=utf-8"}
-    response = requests.post(
-        url=url, data=json.dumps(data), headers=headers, timeout=15
-    ).json()
+    return {"method": "POST", "url": url, "data": json.dumps(data), "headers": headers}
+
 
+def bark_result(response, request):
     if response["code"] == 200:
         print("bark 推送成功！")
     else:
         print("bark 推送失败！")
+        return False
+
+
+def bark(title: str, content: str) -> Optional[bool]:
+    """
+    使用 bark 推送消息。
+    """
+    return send_http("bark", title, content)
 
 
 def console(title: str, content: str) -> None:
@@ -198,12 +341,10 @@ def console(title: str, content: str) -> None:
         print(f"{title}\n\n{content}")
 
 
-def dingding_bot(title: str, content: str) -> None:
-    """
-    使用 钉钉机器人 推送消息。
-    """
+def dingding_bot_request(title: str, content: str):
+    """构造 钉钉机器人 推送请求，未配置时返回 None"""
     if not push_config.get("DD_BOT_SECRET") or not push_config.get("DD_BOT_TOKEN"):
-        return
+        return None
     print("钉钉机器人 服务启动")
 
     timestamp = str(round(time.time() * 1000))
@@ -217,35 +358,51 @@ def dingding_bot(title: str, content: str) -> None:
     url = f'https://oapi.dingtalk.com/robot/send?access_token={push_config.get("DD_BOT_TOKEN")}&timestamp={timestamp}&sign={sign}'
     headers = {"Content-Type": "application/json;charset=utf-8"}
     data = {"msgtype": "text", "text": {"content": f"{title}\n\n{content}"}}
-    response = requests.post(
-        url=url, data=json.dumps(data), headers=headers, timeout=15
-    ).json()
+    return {"method": "POST", "url": url, "data": json.dumps(data), "headers": headers}
 
+
+def dingding_bot_result(response, request):
     if not response["errcode"]:
         print("钉钉机器人 推送成功！")
     else:
         print("钉钉机器人 推送失败！")
+        return False
 
 
-def feishu_bot(title: str, content: str) -> None:
+def dingding_bot(title: str, content: str) -> Optional[bool]:
     """
-    使用 飞书机器人 推送消息。
+    使用 钉钉机器人 推送消息。
     """
+    return send_http("dingding_bot", title, content)
+
+
+def feishu_bot_request(title: str, content: str):
+    """构造 飞书机器人 推送请求，未配置时返回 None"""
     if not push_config.get("FSKEY"):
-        return
+        return None
     print("飞书 服务启动")
 
     url = f'https://open.feishu.cn/open-apis/bot/v2/hook/{push_config.get("FSKEY")}'
     data = {"msg_type": "text", "content": {"text": f"{title}\n\n{content}"}}
-    response = requests.post(url, data=json.dumps(data)).json()
+    return {"method": "POST", "url": url, "data": json.dumps(data)}
+
 
+def feishu_bot_result(response, request):
     if response.get("StatusCode") == 0 or response.get("code") == 0:
         print("飞书 推送成功！")
     else:
         print("飞书 推送失败！错误信息如下：\n", response)
+        return False
+
+
+def feishu_bot(title: str, content: str) -> Optional[bool]:
+    """
+    使用 飞书机器人 推送消息。
+    """
+    return send_http("feishu_bot", title, content)
 
 
-def go_cqhttp(title: str, content: str) -> None:
+def go_cqhttp(title: str, content: str) -> Optional[bool]:
     """
     使用 go_cqhttp 推送消息。
     """
@@ -254,20 +411,19 @@ def go_cqhttp(title: str, content: str) -> None:
     print("go-cqhttp 服务启动")
 
     url = f'{push_config.get("GOBOT_URL")}?access_token={push_config.get("GOBOT_TOKEN")}&{push_config.get("GOBOT_QQ")}&message=标题:{title}\n内容:{content}'
-    response = requests.get(url).json()
+    response = get_session("go_cqhttp").get(url).json()
 
     if response["status"] == "ok":
         print("go-cqhttp 推送成功！")
     else:
         print("go-cqhttp 推送失败！")
+        return False
 
 
-def gotify(title: str, content: str) -> None:
-    """
-    使用 gotify 推送消息。
-    """
+def gotify_request(title: str, content: str):
+    """构造 gotify 推送请求，未配置时返回 None"""
     if not push_config.get("GOTIFY_URL") or not push_config.get("GOTIFY_TOKEN"):
-        return
+        return None
     print("gotify 服务启动")
 
     url = f'{push_config.get("GOTIFY_URL")}/message?token={push_config.get("GOTIFY_TOKEN")}'
@@ -276,15 +432,25 @@ def gotify(title: str, content: str) -> None:
         "message": content,
         "priority": push_config.get("GOTIFY_PRIORITY"),
     }
-    response = requests.post(url, data=data).json()
+    return {"method": "POST", "url": url, "data": data}
 
+
+def gotify_result(response, request):
     if response.get("id"):
         print("gotify 推送成功！")
     else:
         print("gotify 推送失败！")
+        return False
 
 
-def iGot(title: str, content: str) -> None:
+def gotify(title: str, content: str) -> Optional[bool]:
+    """
+    使用 gotify 推送消息。
+    """
+    return send_http("gotify", title, content)
+
+
+def iGot(title: str, content: str) -> Optional[bool]:
     """
     使用 iGot 推送消息。
     """
@@ -295,15 +461,16 @@ def iGot(title: str, content: str) -> None:
     url = f'https://push.hellyw.com/{push_config.get("IGOT_PUSH_KEY")}'
     data = {"title": title, "content": content}
     headers = {"Content-Type": "application/x-www-form-urlencoded"}
-    response = requests.post(url, data=data, headers=headers).json()
+    response = get_session("iGot").post(url, data=data, headers=headers).json()
 
     if response["ret"] == 0:
         print("iGot 推送成功！")
     else:
         print(f'iGot 推送失败！{response["errMsg"]}')
+        return False
 
 
-def serverJ(title: str, content: str) -> None:
+def serverJ(title: str, content: str) -> Optional[bool]:
     """
     通过 serverJ 推送消息。
     """
@@ -320,15 +487,16 @@ def serverJ(title: str, content: str) -> None:
     else:
         url = f'https://sctapi.ftqq.com/{push_config.get("PUSH_KEY")}.send'
 
-    response = requests.post(url, data=data).json()
+    response = get_session("serverJ").post(url, data=data).json()
 
     if response.get("errno") == 0 or response.get("code") == 0:
         print("serverJ 推送成功！")
     else:
         print(f'serverJ 推送失败！错误码：{response["message"]}')
+        return False
 
 
-def pushdeer(title: str, content: str) -> None:
+def pushdeer(title: str, content: str) -> Optional[bool]:
     """
     通过PushDeer 推送消息
     """
@@ -345,15 +513,16 @@ def pushdeer(title: str, content: str) -> None:
     if push_config.get("DEER_URL"):
         url = push_config.get("DEER_URL")
 
-    response = requests.post(url, data=data).json()
+    response = get_session("pushdeer").post(url, data=data).json()
 
     if len(response.get("content").get("result")) > 0:
         print("PushDeer 推送成功！")
     else:
         print("PushDeer 推送失败！错误信息：", response)
+        return False
 
 
-def chat(title: str, content: str) -> None:
+def chat(title: str, content: str) -> Optional[bool]:
     """
     通过Chat 推送消息
     """
@@ -362,20 +531,19 @@ def chat(title: str, content: str) -> None:
     print("chat 服务启动")
     data = "payload=" + json.dumps({"text": title + "\n" + content})
     url = push_config.get("CHAT_URL") + push_config.get("CHAT_TOKEN")
-    response = requests.post(url, data=data)
+    response = get_session("chat").post(url, data=data)
 
     if response.status_code == 200:
         print("Chat 推送成功！")
     else:
         print("Chat 推送失败！错误信息：", response)
+        return False
 
 
-def pushplus_bot(title: str, content: str) -> None:
-    """
-    通过 pushplus 推送消息。
-    """
+def pushplus_bot_request(title: str, content: str):
+    """构造 pushplus 推送请求，未配置时返回 None"""
     if not push_config.get("PUSH_PLUS_TOKEN"):
-        return
+        return None
     print("PUSHPLUS 服务启动")
 
     url = "https://www.pushplus.plus/send"
@@ -392,7 +560,19 @@ def pushplus_bot(title: str, content: str) -> None:
     }
     body = json.dumps(data).encode(encoding="utf-8")
     headers = {"Content-Type": "application/json"}
-    response = requests.post(url=url, data=body, headers=headers).json()
+    return {"method": "POST", "url": url, "data": body, "headers": headers}
+
+
+def pushplus_bot_result(response, request):
+    """pushplus 请求失败时返回备用地址的请求"""
+    if request["url"] != "https://www.pushplus.plus/send":
+        if response["code"] == 200:
+            print("PUSHPLUS(hxtrip) 推送成功！")
+
+        else:
+            print("PUSHPLUS 推送失败！")
+            return False
+        return True
 
     code = response["code"]
     if code == 200:
@@ -402,20 +582,21 @@ def pushplus_bot(title: str, content: str) -> None:
         )
     elif code == 900 or code == 903 or code == 905 or code == 999:
         print(response["msg"])
+        return False
 
     else:
-        url_old = "http://pushplus.hxtrip.com/send"
-        headers["Accept"] = "application/json"
-        response = requests.post(url=url_old, data=body, headers=headers).json()
+        headers = {**request["headers"], "Accept": "application/json"}
+        return {**request, "url": "http://pushplus.hxtrip.com/send", "headers": headers}
 
-        if response["code"] == 200:
-            print("PUSHPLUS(hxtrip) 推送成功！")
 
-        else:
-            print("PUSHPLUS 推送失败！")
+def pushplus_bot(title: str, content: str) -> Optional[bool]:
+    """
+    通过 pushplus 推送消息。
+    """
+    return send_http("pushplus_bot", title, content)
 
 
-def weplus_bot(title: str, content: str) -> None:
+def weplus_bot(title: str, content: str) -> Optional[bool]:
     """
     通过 微加机器人 推送消息。
     """
@@ -438,15 +619,16 @@ def weplus_bot(title: str, content: str) -> None:
     }
     body = json.dumps(data).encode(encoding="utf-8")
     headers = {"Content-Type": "application/json"}
-    response = requests.post(url=url, data=body, headers=headers).json()
+    response = get_session("weplus_bot").post(url=url, data=body, headers=headers).json()
 
     if response["code"] == 200:
         print("微加机器人 推送成功！")
     else:
         print("微加机器人 推送失败！")
+        return False
 
 
-def qmsg_bot(title: str, content: str) -> None:
+def qmsg_bot(title: str, content: str) -> Optional[bool]:
     """
     使用 qmsg 推送消息。
     """
@@ -456,15 +638,16 @@ def qmsg_bot(title: str, content: str) -> None:
 
     url = f'https://qmsg.zendee.cn/{push_config.get("QMSG_TYPE")}/{push_config.get("QMSG_KEY")}'
     payload = {"msg": f'{title}\n\n{content.replace("----", "-")}'.encode("utf-8")}
-    response = requests.post(url=url, params=payload).json()
+    response = get_session("qmsg_bot").post(url=url, params=payload).json()
 
     if response["code"] == 0:
         print("qmsg 推送成功！")
     else:
         print(f'qmsg 推送失败！{response["reason"]}')
+        return False
 
 
-def wecom_app(title: str, content: str) -> None:
+def wecom_app(title: str, content: str) -> Optional[bool]:
     """
     通过 企业微信 APP 推送消息。
     """
@@ -496,6 +679,7 @@ def wecom_app(title: str, content: str) -> None:
         print("企业微信推送成功！")
     else:
         print("企业微信推送失败！错误信息如下：\n", response)
+        return False
 
 
 class WeCom:
@@ -513,7 +697,7 @@ class WeCom:
             "corpid": self.CORPID,
             "corpsecret": self.CORPSECRET,
         }
-        req = requests.post(url, params=values)
+        req = get_session("wecom_app").post(url, params=values)
         data = json.loads(req.text)
         return data["access_token"]
 
@@ -529,7 +713,7 @@ class WeCom:
             "safe": "0",
         }
         send_msges = bytes(json.dumps(send_values), "utf-8")
-        respone = requests.post(send_url, send_msges)
+        respone = get_session("wecom_app").post(send_url, send_msges)
         respone = respone.json()
         return respone["errmsg"]
 
@@ -555,17 +739,15 @@ class WeCom:
             },
         }
         send_msges = bytes(json.dumps(send_values), "utf-8")
-        respone = requests.post(send_url, send_msges)
+        respone = get_session("wecom_app").post(send_url, send_msges)
         respone = respone.json()
         return respone["errmsg"]
 
 
-def wecom_bot(title: str, content: str) -> None:
-    """
-    通过 企业微信机器人 推送消息。
-    """
+def wecom_bot_request(title: str, content: str):
+    """构造 企业微信机器人 推送请求，未配置时返回 None"""
     if not push_config.get("QYWX_KEY"):
-        return
+        return None
     print("企业微信机器人服务启动")
 
     origin = "https://qyapi.weixin.qq.com"
@@ -575,22 +757,28 @@ def wecom_bot(title: str, content: str) -> None:
     url = f"{origin}/cgi-bin/webhook/send?key={push_config.get('QYWX_KEY')}"
     headers = {"Content-Type": "application/json;charset=utf-8"}
     data = {"msgtype": "text", "text": {"content": f"{title}\n\n{content}"}}
-    response = requests.post(
-        url=url, data=json.dumps(data), headers=headers, timeout=15
-    ).json()
+    return {"method": "POST", "url": url, "data": json.dumps(data), "headers": headers}
+
 
+def wecom_bot_result(response, request):
     if response["errcode"] == 0:
         print("企业微信机器人推送成功！")
     else:
         print("企业微信机器人推送失败！")
+        return False
 
 
-def telegram_bot(title: str, content: str) -> None:
+def wecom_bot(title: str, content: str) -> Optional[bool]:
     """
-    使用 telegram 机器人 推送消息。
+    通过 企业微信机器人 推送消息。
     """
+    return send_http("wecom_bot", title, content)
+
+
+def telegram_bot_request(title: str, content: str):
+    """构造 telegram 机器人 推送请求，未配置时返回 None"""
     if not push_config.get("TG_BOT_TOKEN") or not push_config.get("TG_USER_ID"):
-        return
+        return None
     print("tg 服务启动")
 
     if push_config.get("TG_API_HOST"):
@@ -619,17 +807,31 @@ def telegram_bot(title: str, content: str) -> None:
             push_config.get("TG_PROXY_HOST"), push_config.get("TG_PROXY_PORT")
         )
         proxies = {"http": proxyStr, "https": proxyStr}
-    response = requests.post(
-        url=url, headers=headers, params=payload, proxies=proxies
-    ).json()
+    return {
+        "method": "POST",
+        "url": url,
+        "headers": headers,
+        "params": payload,
+        "proxies": proxies,
+    }
 
+
+def telegram_bot_result(response, request):
     if response["ok"]:
         print("tg 推送成功！")
     else:
         print("tg 推送失败！")
+        return False
 
 
-def aibotk(title: str, content: str) -> None:
+def telegram_bot(title: str, content: str) -> Optional[bool]:
+    """
+    使用 telegram 机器人 推送消息。
+    """
+    return send_http("telegram_bot", title, content)
+
+
+def aibotk(title: str, content: str) -> Optional[bool]:
     """
     使用 智能微秘书 推送消息。
     """
@@ -657,15 +859,16 @@ def aibotk(title: str, content: str) -> None:
         }
     body = json.dumps(data).encode(encoding="utf-8")
     headers = {"Content-Type": "application/json"}
-    response = requests.post(url=url, data=body, headers=headers).json()
+    response = get_session("aibotk").post(url=url, data=body, headers=headers).json()
     print(response)
     if response["code"] == 0:
         print("智能微秘书 推送成功！")
     else:
         print(f'智能微秘书 推送失败！{response["error"]}')
+        return False
 
 
-def smtp(title: str, content: str) -> None:
+def smtp(title: str, content: str) -> Optional[bool]:
     """
     使用 SMTP 邮件 推送消息。
     """
@@ -707,9 +910,9 @@ def smtp(title: str, content: str) -> None:
 
     try:
         smtp_server = (
-            smtplib.SMTP_SSL(push_config.get("SMTP_SERVER"))
+            smtplib.SMTP_SSL(push_config.get("SMTP_SERVER"), timeout=NOTIFY_TIMEOUT)
             if push_config.get("SMTP_SSL") == "true"
-            else smtplib.SMTP(push_config.get("SMTP_SERVER"))
+            else smtplib.SMTP(push_config.get("SMTP_SERVER"), timeout=NOTIFY_TIMEOUT)
         )
         smtp_server.login(
             push_config.get("SMTP_EMAIL"), push_config.get("SMTP_PASSWORD")
@@ -723,9 +926,10 @@ def smtp(title: str, content: str) -> None:
         print("SMTP 邮件 推送成功！")
     except Exception as e:
         print(f"SMTP 邮件 推送失败！{e}")
+        return False
 
 
-def pushme(title: str, content: str) -> None:
+def pushme(title: str, content: str) -> Optional[bool]:
     """
     使用 PushMe 推送消息。
     """
@@ -745,15 +949,16 @@ def pushme(title: str, content: str) -> None:
         "date": push_config.get("date") if push_config.get("date") else "",
         "type": push_config.get("type") if push_config.get("type") else "",
     }
-    response = requests.post(url, data=data)
+    response = get_session("pushme").post(url, data=data)
 
     if response.status_code == 200 and response.text == "success":
         print("PushMe 推送成功！")
     else:
         print(f"PushMe 推送失败！{response.status_code} {response.text}")
+        return False
 
 
-def chronocat(title: str, content: str) -> None:
+def chronocat(title: str, content: str) -> Optional[bool]:
     """
     使用 CHRONOCAT 推送消息。
     """
@@ -775,6 +980,7 @@ def chronocat(title: str, content: str) -> None:
         "Authorization": f'Bearer {push_config.get("CHRONOCAT_TOKEN")}',
     }
 
+    ok = True
     for chat_type, ids in [(1, user_ids), (2, group_ids)]:
         if not ids:
             continue
@@ -788,23 +994,23 @@ def chronocat(title: str, content: str) -> None:
                     }
                 ],
             }
-            response = requests.post(url, headers=headers, data=json.dumps(data))
+            response = get_session("chronocat").post(url, headers=headers, data=json.dumps(data))
             if response.status_code == 200:
                 if chat_type == 1:
                     print(f"QQ个人消息:{ids}推送成功！")
                 else:
                     print(f"QQ群消息:{ids}推送成功！")
             else:
+                ok = False
                 if chat_type == 1:
                     print(f"QQ个人消息:{ids}推送失败！")
                 else:
                     print(f"QQ群消息:{ids}推送失败！")
+    return ok
 
 
-def ntfy(title: str, content: str) -> None:
-    """
-    通过 Ntfy 推送消息
-    """
+def ntfy_request(title: str, content: str):
+    """构造 Ntfy 推送请求，未配置时返回 None"""
 
     def encode_rfc2047(text: str) -> str:
         """将文本编码为符合 RFC 2047 标准的格式"""
@@ -813,7 +1019,7 @@ def ntfy(title: str, content: str) -> None:
         return f"=?utf-8?B?{encoded_str}?="
 
     if not push_config.get("NTFY_TOPIC"):
-        return
+        return None
     print("ntfy 服务启动")
     priority = "3"
     if not push_config.get("NTFY_PRIORITY"):
@@ -828,13 +1034,26 @@ def ntfy(title: str, content: str) -> None:
     headers = {"Title": encoded_title, "Priority": priority}  # 使用编码后的 title
 
     url = push_config.get("NTFY_URL") + "/" + push_config.get("NTFY_TOPIC")
-    response = requests.post(url, data=data, headers=headers)
-    if response.status_code == 200:  # 使用 response.status_code 进行检查
+    return {"method": "POST", "url": url, "data": data, "headers": headers}
+
+
+def ntfy_result(response, request):
+    status_code, text = response
+    if status_code == 200:  # 使用 status_code 进行检查
         print("Ntfy 推送成功！")
     else:
-        print("Ntfy 推送失败！错误信息：", response.text)
+        print("Ntfy 推送失败！错误信息：", text)
+        return False
 
-def dodo_bot(title: str, content: str) -> None:
+
+def ntfy(title: str, content: str) -> Optional[bool]:
+    """
+    通过 Ntfy 推送消息
+    """
+    return send_http("ntfy", title, content)
+
+
+def dodo_bot(title: str, content: str) -> Optional[bool]:
     """
     通过 DoDo机器人 推送消息
     """
@@ -871,19 +1090,22 @@ def dodo_bot(title: str, content: str) -> None:
     })
 
     try:
-        response = requests.post(url, headers=headers, data=payload)
+        response = get_session("dodo_bot").post(url, headers=headers, data=payload)
         if response.status_code == 200:
             response = response.json()
             if response.get("status") == 0 and response.get("message") == "success":
                 print(f'DoDo 推送成功！')
             else:
                 print(f'DoDo 推送失败！错误信息：\n{response}')
+                return False
         else:
             print("DoDo 推送失败！错误信息：", response.text)
+            return False
     except Exception as e:
         print(f"DoDo 推送请求异常: {str(e)}")
+        return False
 
-def wxpusher_bot(title: str, content: str) -> None:
+def wxpusher_bot(title: str, content: str) -> Optional[bool]:
     """
     通过 wxpusher 推送消息。
     支持的环境变量:
@@ -931,12 +1153,13 @@ def wxpusher_bot(title: str, content: str) -> None:
     }
 
     headers = {"Content-Type": "application/json"}
-    response = requests.post(url=url, json=data, headers=headers).json()
+    response = get_session("wxpusher_bot").post(url=url, json=data, headers=headers).json()
 
     if response.get("code") == 1000:
         print("wxpusher 推送成功！")
     else:
         print(f"wxpusher 推送失败！错误信息：{response.get('msg')}")
+        return False
 
 
 def parse_headers(headers):
@@ -990,44 +1213,105 @@ def parse_body(body, content_type, value_format_fn=None):
     return parsed
 
 
-def custom_notify(title: str, content: str) -> None:
-    """
-    通过 自定义通知 推送消息。
-    """
+class WebhookTemplate:
+    """预先解析的自定义通知模板，发送时只做 $title / $content 替换"""
+
+    def __init__(self, url, method, content_type, body, headers):
+        self.url = url
+        self.method = method
+        self.content_type = content_type
+        self.body = body
+        self.headers = parse_headers(headers)
+        # text/plain 或空请求体整体替换，其余按 key: value 预先拆分
+        self.fields = None
+        if body and content_type != "text/plain":
+            self.fields = [
+                (match.group(1).strip(), match.group(2).strip())
+                for match in WEBHOOK_FIELD_RE.finditer(body)
+            ]
+
+    def render(self, title, content):
+        """返回 (url, headers, body)，结果与 parse_headers / parse_body 一致"""
+        title_value = title.replace("\n", "\\n")
+        content_value = content.replace("\n", "\\n")
+
+        def format_value(value):
+            return value.replace("$title", title_value).replace("$content", content_value)
+
+        url = self.url.replace("$title", urllib.parse.quote_plus(title)).replace(
+            "$content", urllib.parse.quote_plus(content)
+        )
+        if self.fields is None:
+            body = format_value(self.body) if self.body else self.body
+        else:
+            parsed = {}
+            for key, value in self.fields:
+                try:
+                    value = format_value(value)
+                    parsed[key] = json.loads(value)
+                except:
+                    parsed[key] = value
+            if self.content_type == "application/x-www-form-urlencoded":
+                body = urllib.parse.urlencode(parsed, doseq=True)
+            elif self.content_type == "application/json":
+                body = json.dumps(parsed)
+            else:
+                body = parsed
+        return url, dict(self.headers), body
+
+
+WEBHOOK_FIELD_RE = re.compile(r"(\w+):\s*((?:(?!\n\w+:).)*)")
+_webhook_cache = {"version": None, "template": None}
+
+
+def get_webhook_template():
+    """按当前配置编译自定义通知模板，配置变化后重新编译；未包含 $title 时返回 None"""
+    if _webhook_cache["version"] != push_config.version:
+        url = push_config.get("WEBHOOK_URL") or ""
+        body = push_config.get("WEBHOOK_BODY") or ""
+        template = None
+        if "$title" in url or "$title" in body:
+            template = WebhookTemplate(
+                url,
+                push_config.get("WEBHOOK_METHOD"),
+                push_config.get("WEBHOOK_CONTENT_TYPE"),
+                push_config.get("WEBHOOK_BODY"),
+                push_config.get("WEBHOOK_HEADERS"),
+            )
+        _webhook_cache.update(version=push_config.version, template=template)
+    return _webhook_cache["template"]
+
+
+def custom_notify_request(title: str, content: str):
+    """构造 自定义通知 推送请求，未配置时返回 None"""
     if not push_config.get("WEBHOOK_URL") or not push_config.get("WEBHOOK_METHOD"):
-        return
+        return None
 
     print("自定义通知服务启动")
 
-    WEBHOOK_URL = push_config.get("WEBHOOK_URL")
-    WEBHOOK_METHOD = push_config.get("WEBHOOK_METHOD")
-    WEBHOOK_CONTENT_TYPE = push_config.get("WEBHOOK_CONTENT_TYPE")
-    WEBHOOK_BODY = push_config.get("WEBHOOK_BODY")
-    WEBHOOK_HEADERS = push_config.get("WEBHOOK_HEADERS")
-
-    if "$title" not in WEBHOOK_URL and "$title" not in WEBHOOK_BODY:
+    template = get_webhook_template()
+    if template is None:
         print("请求头或者请求体中必须包含 $title 和 $content")
-        return
+        return None
 
-    headers = parse_headers(WEBHOOK_HEADERS)
-    body = parse_body(
-        WEBHOOK_BODY,
-        WEBHOOK_CONTENT_TYPE,
-        lambda v: v.replace("$title", title.replace("\n", "\\n")).replace(
-            "$content", content.replace("\n", "\\n")
-        ),
-    )
-    formatted_url = WEBHOOK_URL.replace(
-        "$title", urllib.parse.quote_plus(title)
-    ).replace("$content", urllib.parse.quote_plus(content))
-    response = requests.request(
-        method=WEBHOOK_METHOD, url=formatted_url, headers=headers, timeout=15, data=body
-    )
+    url, headers, body = template.render(title, content)
+    return {"method": template.method, "url": url, "headers": headers, "data": body}
 
-    if response.status_code == 200:
+
+def custom_notify_result(response, request):
+    status_code, text = response
+    if status_code == 200:
         print("自定义通知推送成功！")
     else:
-        print(f"自定义通知推送失败！{response.status_code} {response.text}")
+        print(f"自定义通知推送失败！{status_code} {text}")
+        return False
+
+
+def custom_notify(title: str, content: str) -> Optional[bool]:
+    """
+    通过 自定义通知 推送消息。
+    """
+    return send_http("custom_notify", title, content)
 
 
 def one() -> str:
@@ -1036,91 +1320,342 @@ def one() -> str:
     :return:
     """
     url = "https://v1.hitokoto.cn/"
-    res = requests.get(url).json()
+    res = get_session("hitokoto").get(url).json()
     return res["hitokoto"] + "    ----" + res["from"]
 
 
+# 推送渠道函数返回 False 表示推送失败，返回 None/True 表示成功或未配置
+# 推送渠道及启用条件：每个条件为若干配置项，其中任意一项有值即满足，所有条件满足时启用
+NOTIFY_CHANNELS = (
+    (bark, (("BARK_PUSH",),)),
+    (console, (("CONSOLE",),)),
+    (dingding_bot, (("DD_BOT_TOKEN",), ("DD_BOT_SECRET",))),
+    (feishu_bot, (("FSKEY",),)),
+    (go_cqhttp, (("GOBOT_URL",), ("GOBOT_QQ",))),
+    (gotify, (("GOTIFY_URL",), ("GOTIFY_TOKEN",))),
+    (iGot, (("IGOT_PUSH_KEY",),)),
+    (serverJ, (("PUSH_KEY",),)),
+    (pushdeer, (("DEER_KEY",),)),
+    (chat, (("CHAT_URL",), ("CHAT_TOKEN",))),
+    (pushplus_bot, (("PUSH_PLUS_TOKEN",),)),
+    (weplus_bot, (("WE_PLUS_BOT_TOKEN",),)),
+    (qmsg_bot, (("QMSG_KEY",), ("QMSG_TYPE",))),
+    (wecom_app, (("QYWX_AM",),)),
+    (wecom_bot, (("QYWX_KEY",),)),
+    (telegram_bot, (("TG_BOT_TOKEN",), ("TG_USER_ID",))),
+    (aibotk, (("AIBOTK_KEY",), ("AIBOTK_TYPE",), ("AIBOTK_NAME",))),
+    (
+        smtp,
+        (
+            ("SMTP_SERVER",),
+            ("SMTP_SSL",),
+            ("SMTP_EMAIL",),
+            ("SMTP_PASSWORD",),
+            ("SMTP_NAME",),
+        ),
+    ),
+    (pushme, (("PUSHME_KEY",),)),
+    (chronocat, (("CHRONOCAT_URL",), ("CHRONOCAT_QQ",), ("CHRONOCAT_TOKEN",))),
+    (
+        dodo_bot,
+        (
+            ("DODO_BOTTOKEN",),
+            ("DODO_BOTID",),
+            ("DODO_LANDSOURCEID",),
+            ("DODO_SOURCEID",),
+        ),
+    ),
+    (custom_notify, (("WEBHOOK_URL",), ("WEBHOOK_METHOD",))),
+    (ntfy, (("NTFY_TOPIC",),)),
+    (
+        wxpusher_bot,
+        (("WXPUSHER_APP_TOKEN",), ("WXPUSHER_TOPIC_IDS", "WXPUSHER_UIDS")),
+    ),
+)
+# 基于 HTTP 的渠道：名称 -> (构造请求, 处理响应, 响应类型)，同步与异步发送共用
+HTTP_CHANNELS = {
+    "bark": (bark_request, bark_result, "json"),
+    "dingding_bot": (dingding_bot_request, dingding_bot_result, "json"),
+    "feishu_bot": (feishu_bot_request, feishu_bot_result, "json"),
+    "gotify": (gotify_request, gotify_result, "json"),
+    "pushplus_bot": (pushplus_bot_request, pushplus_bot_result, "json"),
+    "wecom_bot": (wecom_bot_request, wecom_bot_result, "json"),
+    "telegram_bot": (telegram_bot_request, telegram_bot_result, "json"),
+    "ntfy": (ntfy_request, ntfy_result, "text"),
+    "custom_notify": (custom_notify_request, custom_notify_result, "text"),
+}
+_channels_cache = {"version": None, "channels": []}
+
+
+def active_channels() -> list:
+    """当前配置下启用的推送渠道函数，仅在配置变化后重新计算"""
+    if _channels_cache["version"] != push_config.version:
+        channels = [
+            func
+            for func, conditions in NOTIFY_CHANNELS
+            if all(
+                any(push_config.get(key) for key in keys) for keys in conditions
+            )
+        ]
+        _channels_cache.update(version=push_config.version, channels=channels)
+    return list(_channels_cache["channels"])
+
+
+def active_channel_names() -> list:
+    """当前启用的推送渠道名称"""
+    return [func.__name__ for func in active_channels()]
+
+
 def add_notify_function():
-    notify_function = []
-    if push_config.get("BARK_PUSH"):
-        notify_function.append(bark)
-    if push_config.get("CONSOLE"):
-        notify_function.append(console)
-    if push_config.get("DD_BOT_TOKEN") and push_config.get("DD_BOT_SECRET"):
-        notify_function.append(dingding_bot)
-    if push_config.get("FSKEY"):
-        notify_function.append(feishu_bot)
-    if push_config.get("GOBOT_URL") and push_config.get("GOBOT_QQ"):
-        notify_function.append(go_cqhttp)
-    if push_config.get("GOTIFY_URL") and push_config.get("GOTIFY_TOKEN"):
-        notify_function.append(gotify)
-    if push_config.get("IGOT_PUSH_KEY"):
-        notify_function.append(iGot)
-    if push_config.get("PUSH_KEY"):
-        notify_function.append(serverJ)
-    if push_config.get("DEER_KEY"):
-        notify_function.append(pushdeer)
-    if push_config.get("CHAT_URL") and push_config.get("CHAT_TOKEN"):
-        notify_function.append(chat)
-    if push_config.get("PUSH_PLUS_TOKEN"):
-        notify_function.append(pushplus_bot)
-    if push_config.get("WE_PLUS_BOT_TOKEN"):
-        notify_function.append(weplus_bot)
-    if push_config.get("QMSG_KEY") and push_config.get("QMSG_TYPE"):
-        notify_function.append(qmsg_bot)
-    if push_config.get("QYWX_AM"):
-        notify_function.append(wecom_app)
-    if push_config.get("QYWX_KEY"):
-        notify_function.append(wecom_bot)
-    if push_config.get("TG_BOT_TOKEN") and push_config.get("TG_USER_ID"):
-        notify_function.append(telegram_bot)
-    if (
-        push_config.get("AIBOTK_KEY")
-        and push_config.get("AIBOTK_TYPE")
-        and push_config.get("AIBOTK_NAME")
-    ):
-        notify_function.append(aibotk)
-    if (
-        push_config.get("SMTP_SERVER")
-        and push_config.get("SMTP_SSL")
-        and push_config.get("SMTP_EMAIL")
-        and push_config.get("SMTP_PASSWORD")
-        and push_config.get("SMTP_NAME")
-    ):
-        notify_function.append(smtp)
-    if push_config.get("PUSHME_KEY"):
-        notify_function.append(pushme)
-    if (
-        push_config.get("CHRONOCAT_URL")
-        and push_config.get("CHRONOCAT_QQ")
-        and push_config.get("CHRONOCAT_TOKEN")
-    ):
-        notify_function.append(chronocat)
-    if (
-        push_config.get("DODO_BOTTOKEN")
-        and push_config.get("DODO_BOTID")
-        and push_config.get("DODO_LANDSOURCEID")
-        and push_config.get("DODO_SOURCEID")
-    ):
-        notify_function.append(dodo_bot)
-    if push_config.get("WEBHOOK_URL") and push_config.get("WEBHOOK_METHOD"):
-        notify_function.append(custom_notify)
-    if push_config.get("NTFY_TOPIC"):
-        notify_function.append(ntfy)
-    if push_config.get("WXPUSHER_APP_TOKEN") and (
-        push_config.get("WXPUSHER_TOPIC_IDS") or push_config.get("WXPUSHER_UIDS")
-    ):
-        notify_function.append(wxpusher_bot)
+    notify_function = active_channels()
     if not notify_function:
         print(f"无推送渠道，请检查通知变量是否正确")
     return notify_function
 
 
-def send(title: str, content: str, ignore_default_config: bool = False, **kwargs):
+class NotifyDispatcher:
+    """
+    常驻的推送调度器：固定大小的线程池，每个渠道一个有序队列。
+    同一渠道的消息按提交顺序依次发送，不同渠道之间并行，并统计各渠道耗时。
+    """
+
+    def __init__(self, max_workers=NOTIFY_WORKERS):
+        self.max_workers = max(1, max_workers)
+        self.executor = None
+        self.lock = threading.Lock()
+        self.queues = {}  # 渠道名 -> deque[(func, title, content, future)]
+        self.running = set()  # 正在发送的渠道
+        self.pending = set()
+        self.stats = {}
+
+    def submit(self, func, title, content, callback=None) -> Future:
+        """callback(ok, error) 在结果写入 future 之前于推送线程中调用"""
+        future = Future()
+        channel = func.__name__
+        with self.lock:
+            if self.executor is None:
+                self.executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers, thread_name_prefix="notify"
+                )
+            self.queues.setdefault(channel, deque()).append(
+                (func, title, content, callback, future)
+            )
+            self.pending.add(future)
+            if channel not in self.running:
+                self.running.add(channel)
+                self.executor.submit(self._drain, channel)
+        future.add_done_callback(self._done)
+        return future
+
+    def _done(self, future):
+        with self.lock:
+            self.pending.discard(future)
+
+    def _drain(self, channel):
+        while True:
+            with self.lock:
+                queue = self.queues[channel]
+                if not queue:
+                    self.running.discard(channel)
+                    return
+                func, title, content, callback, future = queue.popleft()
+            start = time.perf_counter()
+            error = result = None
+            try:
+                result = func(title, content)
+            except Exception as e:
+                error = e
+                print(f"{channel} 推送异常：{e}")
+            # 渠道函数返回 False 表示推送失败
+            ok = error is None and result is not False
+            self._record(channel, time.perf_counter() - start, ok)
+            if callback is not None:
+                try:
+                    callback(ok, error)
+                except Exception as e:
+                    print(f"{channel} 推送回调异常：{e}")
+            if error is None:
+                future.set_result(result)
+            else:
+                future.set_exception(error)
+
+    def _record(self, channel, elapsed, ok):
+        with self.lock:
+            stats = self.stats.setdefault(
+                channel,
+                {"sent": 0, "failed": 0, "latency_total": 0.0, "latency_max": 0.0},
+            )
+            stats["sent" if ok else "failed"] += 1
+            stats["latency_total"] += elapsed
+            stats["latency_max"] = max(stats["latency_max"], elapsed)
+
+    def flush(self, timeout=None) -> bool:
+        """等待已提交的推送全部完成，超时返回 False"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self.lock:
+                pending = list(self.pending)
+            if not pending:
+                return True
+            for future in pending:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                try:
+                    future.exception(timeout=remaining)
+                except FutureTimeoutError:
+                    return False
+
+    def get_stats(self) -> dict:
+        """各渠道发送次数、失败次数及平均/最长耗时（秒）"""
+        with self.lock:
+            stats = {channel: dict(item) for channel, item in self.stats.items()}
+        for item in stats.values():
+            count = item["sent"] + item["failed"]
+            item["latency_avg"] = item["latency_total"] / count if count else 0.0
+        return stats
+
+
+dispatcher = NotifyDispatcher()
+# 退出前等待未完成的推送
+atexit.register(dispatcher.flush)
+
+
+def flush(timeout=None) -> bool:
+    return dispatcher.flush(timeout)
+
+
+# 发件箱：NOTIFY_OUTBOX 为 SQLite 文件路径，设置后每条推送先入队再发送，失败的在之后重试
+outbox = None
+# 不经过发件箱的渠道
+OUTBOX_SKIP = {"console"}
+
+
+def open_outbox(path: str):
+    """启用发件箱，path 为空时关闭"""
+    global outbox
+    if outbox is not None:
+        outbox.close()
+        outbox = None
+    if path:
+        from notify_outbox import Outbox
+
+        outbox = Outbox(
+            path,
+            base_delay=float(os.getenv("NOTIFY_OUTBOX_RETRY_DELAY", 60)),
+            max_attempts=int(os.getenv("NOTIFY_OUTBOX_MAX_ATTEMPTS", 10)),
+        )
+        outbox.purge()
+    return outbox
+
+
+if os.getenv("NOTIFY_OUTBOX"):
+    open_outbox(os.getenv("NOTIFY_OUTBOX"))
+
+
+def _settle(key, channel, ok, error):
+    """推送完成后确认发件箱中的消息，失败时安排重试"""
+    if ok:
+        outbox.ack(key)
+        return
+    retry = outbox.fail(key, error or "推送失败")
+    if retry is None:
+        print(f"{channel} 推送多次失败，已放弃重试")
+    else:
+        print(f"{channel} 推送失败，将于 {time.strftime('%m-%d %H:%M:%S', time.localtime(retry))} 后重试")
+
+
+# 发件箱写入失败（数据库被锁、磁盘已满、路径无效等）只提示一次
+_outbox_error_logged = False
+
+
+def _enqueue(message_id: str, channel: str, title: str, content: str):
+    """写入发件箱，返回 (key, 是否新消息)；写入失败时返回 None，由调用方直接发送"""
+    global _outbox_error_logged
+    try:
+        return outbox.enqueue(message_id, channel, title, content)
+    except Exception as e:
+        if not _outbox_error_logged:
+            _outbox_error_logged = True
+            print(f"发件箱写入失败，本次推送直接发送：{e}")
+        return None
+
+
+def _submit(mode, title: str, content: str, message_id: str):
+    """
+    提交到推送线程池，返回 (future, 是否已写入发件箱)；
+    启用发件箱时先入队，同一消息 ID 的相同内容已在发件箱中时不重复发送，入队失败时直接发送
+    """
+    channel = mode.__name__
+    queued = None
+    if outbox is not None and channel not in OUTBOX_SKIP:
+        queued = _enqueue(message_id, channel, title, content)
+    if queued is None:
+        return dispatcher.submit(mode, title, content), False
+    key, new = queued
+    if not new:
+        print(f"{channel} 本次消息已发送或正在发件箱中等待重试，跳过重复推送")
+        future = Future()
+        future.set_result(None)
+        return future, True
+    future = dispatcher.submit(
+        mode, title, content, lambda ok, error: _settle(key, channel, ok, error)
+    )
+    return future, True
+
+
+def _delivered(future) -> bool:
+    """推送是否成功：渠道函数未抛出异常且未返回 False"""
+    return future.exception() is None and future.result() is not False
+
+
+def drain_outbox(wait: bool = True, limit: int = 500) -> list:
+    """投递发件箱中到期的消息（上次运行失败或未发送完成的推送），返回提交的 future 列表"""
+    if outbox is None:
+        return []
+    functions = {func.__name__: func for func, _ in NOTIFY_CHANNELS}
+    futures = []
+    while True:
+        rows = outbox.claim(limit)
+        if not rows:
+            break
+        for key, channel, title, content in rows:
+            func = functions.get(channel)
+            if func is None:
+                outbox.fail(key, f"未知渠道 {channel}")
+                continue
+            futures.append(
+                dispatcher.submit(
+                    func,
+                    title,
+                    content,
+                    lambda ok, error, key=key, channel=channel: _settle(
+                        key, channel, ok, error
+                    ),
+                )
+            )
+    if wait:
+        for future in futures:
+            future.exception()
+    return futures
+
+
+def get_stats() -> dict:
+    return dispatcher.get_stats()
+
+
+def send(
+    title: str,
+    content: str,
+    ignore_default_config: bool = False,
+    wait: bool = True,
+    **kwargs,
+):
+    """推送到所有已配置的渠道；wait=False 时提交后立即返回，可稍后调用 flush() 等待完成"""
     if kwargs:
         global push_config
         if ignore_default_config:
-            push_config = kwargs  # 清空从环境变量获取的配置
+            push_config = _PushConfig(kwargs)  # 清空从环境变量获取的配置
         else:
             push_config.update(kwargs)
 
@@ -1140,12 +1675,270 @@ def send(title: str, content: str, ignore_default_config: bool = False, **kwargs
         content += "\n\n" + one()
 
     notify_function = add_notify_function()
-    ts = [
-        threading.Thread(target=mode, args=(title, content), name=mode.__name__)
-        for mode in notify_function
+    message_id = uuid.uuid4().hex
+    futures = [_submit(mode, title, content, message_id)[0] for mode in notify_function]
+    if wait:
+        for future in futures:
+            future.exception()
+    return futures
+
+
+# 各渠道单条消息的长度上限：(计量方式, 上限)，按 标题 + 空行 + 内容 计算，未列出的渠道不限制
+# json 为 JSON 转义后的长度（Bark 以 ASCII 转义的 JSON 发送，中文每字占 6 字节，APNs 负载上限 4KB）
+CHANNEL_LIMITS = {
+    "bark": ("json", 3500),
+    "telegram_bot": ("chars", 4096),
+    "wecom_bot": ("bytes", 2048),
+    "wecom_app": ("bytes", 2048),
+    "dingding_bot": ("bytes", 20000),
+    "feishu_bot": ("bytes", 20000),
+    "pushplus_bot": ("chars", 20000),
+    "serverJ": ("bytes", 32000),
+    "ntfy": ("bytes", 4096),
+    "smtp": ("bytes", 1024 * 1024),
+}
+
+
+def measure(text: str, unit: str) -> int:
+    if unit == "bytes":
+        return len(text.encode("utf-8"))
+    if unit == "json":
+        return len(json.dumps(text)) - 2
+    return len(text)
+
+
+def _split_oversized(text, capacity, unit):
+    """超长内容按行切分，单行仍超长时按字符切分"""
+    chunks, current, size = [], [], 0
+    newline = measure("\n", unit)
+    lines = []
+    for line in text.split("\n"):
+        if measure(line, unit) <= capacity:
+            lines.append(line)
+            continue
+        piece = ""
+        for char in line:
+            if measure(piece + char, unit) > capacity:
+                lines.append(piece)
+                piece = ""
+            piece += char
+        lines.append(piece)
+    for line in lines:
+        line_size = measure(line, unit)
+        if current and size + newline + line_size > capacity:
+            chunks.append("\n".join(current))
+            current, size = [], 0
+        size += line_size + (newline if current else 0)
+        current.append(line)
+    if current:
+        chunks.append("\n".join(current))
+    return chunks
+
+
+def pack_groups(parts, limit=None, unit="chars", separator="\n", overhead=0, max_count=0):
+    """
+    按原顺序把多段内容依次装入消息，当前消息放不下（超过 limit - overhead）或已有 max_count 段时另起一条，
+    各段顺序与输入一致；对有序的连续分组，贪心装入即可得到最少的消息数。
+    单段超长时按行拆开后依次装入。max_count 为 0 时不限制每条消息的段数。
+    返回每条消息的 [(段在 parts 中的下标, 内容)]，空的段跳过
+    """
+    capacity = max(limit - overhead, 1) if limit else None
+    sep_size = measure(separator, unit)
+    messages = []  # [已用大小, [(下标, 内容)]]
+    for index, part in enumerate(parts):
+        if not part:
+            continue
+        size = measure(part, unit) if capacity else 0
+        if capacity and size > capacity:
+            chunks = _split_oversized(part, capacity, unit)
+        else:
+            chunks = [part]
+        for chunk in chunks:
+            chunk_size = measure(chunk, unit) if capacity else 0
+            if messages:
+                current = messages[-1]
+                fits = capacity is None or current[0] + sep_size + chunk_size <= capacity
+                if fits and not (max_count and len(current[1]) >= max_count):
+                    current[0] += sep_size + chunk_size
+                    current[1].append((index, chunk))
+                    continue
+            messages.append([chunk_size, [(index, chunk)]])
+    return [members for _, members in messages]
+
+
+def pack_messages(parts, limit=None, unit="chars", separator="\n", overhead=0, max_count=0):
+    """按 pack_groups 分组后合并为消息文本列表"""
+    return [
+        separator.join(chunk for _, chunk in members)
+        for members in pack_groups(parts, limit, unit, separator, overhead, max_count)
     ]
-    [t.start() for t in ts]
-    [t.join() for t in ts]
+
+
+def send_many(
+    title: str,
+    parts: list,
+    wait: bool = True,
+    separator: str = "\n",
+    max_count: int = 0,
+    on_result=None,
+):
+    """
+    把多段内容（如多个账号的报告）按各渠道的长度上限按顺序合并后推送，
+    每个渠道用尽量少的消息发出；拆成多条时标题追加“第i/n批”。
+    on_result(渠道名, 该条消息包含的段下标, 是否送达) 在每条消息完成后于推送线程中调用，
+    已写入发件箱的消息视为送达（之后由发件箱负责重试）
+    """
+    if not any(parts):
+        print(f"{title} 推送内容为空！")
+        return []
+
+    skipTitle = os.getenv("SKIP_PUSH_TITLE")
+    if skipTitle and title in re.split("\n", skipTitle):
+        print(f"{title} 在SKIP_PUSH_TITLE环境变量内，跳过推送！")
+        return []
+
+    hitokoto = push_config.get("HITOKOTO")
+    if hitokoto and str(hitokoto).lower() != "false":
+        parts = parts + [one()]
+
+    futures = []
+    message_id = uuid.uuid4().hex
+    for mode in add_notify_function():
+        unit, limit = CHANNEL_LIMITS.get(mode.__name__, ("chars", None))
+        # 预留标题、“第i/n批”及标题与内容间空行的长度
+        overhead = measure(f"{title}第99/99批\n\n", unit) if limit else 0
+        messages = pack_groups(parts, limit, unit, separator, overhead, max_count)
+        for i, members in enumerate(messages):
+            message_title = (
+                f"{title}第{i + 1}/{len(messages)}批" if len(messages) > 1 else title
+            )
+            message = separator.join(chunk for _, chunk in members)
+            future, queued = _submit(mode, message_title, message, message_id)
+            if on_result is not None:
+                indices = sorted({index for index, _ in members})
+                future.add_done_callback(
+                    lambda f, channel=mode.__name__, indices=indices, queued=queued: on_result(
+                        channel, indices, queued or _delivered(f)
+                    )
+                )
+            futures.append(future)
+        if len(messages) > 1:
+            print(f"{mode.__name__} 共{sum(1 for part in parts if part)}段内容，分{len(messages)}条推送")
+    if wait:
+        for future in futures:
+            future.exception()
+    return futures
+
+
+_async_sessions = {}  # 事件循环 -> aiohttp.ClientSession
+
+
+def get_async_session():
+    """当前事件循环共用的 aiohttp 会话（连接池），首次调用时创建"""
+    loop = asyncio.get_running_loop()
+    session = _async_sessions.get(loop)
+    if session is None or session.closed:
+        session = _async_sessions[loop] = aiohttp.ClientSession()
+    return session
+
+
+async def aclose():
+    """关闭当前事件循环的 aiohttp 会话"""
+    session = _async_sessions.pop(asyncio.get_running_loop(), None)
+    if session is not None:
+        await session.close()
+
+
+async def asend_http(channel: str, title: str, content: str):
+    """异步发送基于 HTTP 的渠道，请求构造与响应处理与同步版本相同"""
+    build, handle, response_type = HTTP_CHANNELS[channel]
+    request = build(title, content)
+    session = get_async_session()
+    timeout = aiohttp.ClientTimeout(total=channel_timeout(channel))
+    while isinstance(request, dict):
+        request = dict(request)
+        proxies = request.pop("proxies", None)
+        data = request.pop("data", None)
+        if isinstance(data, dict):
+            # 与 requests 一致，表单中值为 None 的字段不发送
+            data = {key: value for key, value in data.items() if value is not None}
+        async with session.request(
+            data=data,
+            proxy=(proxies or {}).get("https"),
+            timeout=timeout,
+            **request,
+        ) as response:
+            if response_type == "json":
+                payload = await response.json(content_type=None)
+            else:
+                payload = (response.status, await response.text())
+        request = handle(payload, {**request, "data": data, "proxies": proxies})
+    return request is not False
+
+
+async def _asend_channel(mode, title, content, message_id):
+    channel = mode.__name__
+    key = None
+    if outbox is not None and channel not in OUTBOX_SKIP:
+        # SQLite 读写放到线程中执行，不阻塞事件循环
+        queued = await asyncio.to_thread(_enqueue, message_id, channel, title, content)
+        if queued is not None:
+            key, new = queued
+            if not new:
+                print(f"{channel} 本次消息已发送或正在发件箱中等待重试，跳过重复推送")
+                return None
+    start = time.perf_counter()
+    error = result = None
+    try:
+        if aiohttp is not None and channel in HTTP_CHANNELS:
+            result = await asend_http(channel, title, content)
+        else:
+            # 其他渠道（SMTP、需先获取 token 的企业微信应用等）在线程中执行同步实现
+            result = await asyncio.to_thread(mode, title, content)
+    except Exception as e:
+        print(f"{channel} 推送异常：{e}")
+        error = e
+    ok = error is None and result is not False
+    dispatcher._record(channel, time.perf_counter() - start, ok)
+    if key is not None:
+        await asyncio.to_thread(_settle, key, channel, ok, error)
+    return error
+
+
+async def asend(
+    title: str, content: str, ignore_default_config: bool = False, **kwargs
+):
+    """
+    send 的异步版本：HTTP 渠道在当前事件循环上并发发送，共用 aiohttp 连接池；
+    未安装 aiohttp 或非 HTTP 渠道时在线程中执行同步实现。返回各渠道的异常（成功为 None）
+    """
+    if kwargs:
+        global push_config
+        if ignore_default_config:
+            push_config = _PushConfig(kwargs)  # 清空从环境变量获取的配置
+        else:
+            push_config.update(kwargs)
+
+    if not content:
+        print(f"{title} 推送内容为空！")
+        return []
+
+    skipTitle = os.getenv("SKIP_PUSH_TITLE")
+    if skipTitle and title in re.split("\n", skipTitle):
+        print(f"{title} 在SKIP_PUSH_TITLE环境变量内，跳过推送！")
+        return []
+
+    hitokoto = push_config.get("HITOKOTO")
+    if hitokoto and str(hitokoto).lower() != "false":
+        content += "\n\n" + await asyncio.to_thread(one)
+
+    message_id = uuid.uuid4().hex
+    return await asyncio.gather(
+        *(
+            _asend_channel(mode, title, content, message_id)
+            for mode in add_notify_function()
+        )
+    )
 
 
 def main():
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+# _*_ coding:utf-8 _*_
+# 推送发件箱：每条（渠道, 消息）先写入 SQLite 再发送，按渠道逐条确认，
+# 失败的按带抖动的指数退避重试，下次运行开始时继续投递未确认的消息。
+#
+# 每次发送生成一个消息 ID，幂等键为 (消息 ID, 渠道, 标题, 内容) 的哈希：同一次发送的重试或重复投递不会重复推送，
+# 不同次发送的相同内容（如两次运行的相同摘要、相同的错误提示）各自入队、各自送达；
+# 待发送消息按 (state, next_attempt) 索引取出，积压上千条时取出到期消息仍只需一次索引扫描。
+
+import time
+import random
+import sqlite3
+import hashlib
+import threading
+
+PENDING, SENT, DEAD = "pending", "sent", "dead"
+
+
+def message_key(message_id, channel, title, content):
+    """消息的幂等键，只在同一消息 ID 内按内容去重"""
+    digest = hashlib.sha256()
+    for value in (message_id, channel, title, content):
+        digest.update(value.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+class Outbox:
+    """
+    SQLite 发件箱（WAL 模式），可在推送线程中并发调用。
+    claim 取出的消息会被租用 lease 秒，期间其他进程的 claim 不会重复取出；
+    ack 确认后保留 keep_sent 秒，同一消息 ID 的重复入队不会再次发送，失败超过 max_attempts 次或超过 max_age 秒的消息不再重试。
+    """
+
+    def __init__(
+        self,
+        path,
+        base_delay=60,
+        max_delay=3600,
+        max_attempts=10,
+        max_age=3 * 86400,
+        lease=300,
+        keep_sent=86400,
+    ):
+        self.path = path
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_attempts = max_attempts
+        self.max_age = max_age
+        self.lease = lease
+        self.keep_sent = keep_sent
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        with self.conn:
+            self.conn.execute(
+                """CREATE TABLE IF NOT EXISTS outbox (
+                    key TEXT PRIMARY KEY,
+                    channel TEXT NOT NULL,
+                    title TEXT NOT NULL,
+                    content TEXT NOT NULL,
+                    state TEXT NOT NULL,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    next_attempt REAL NOT NULL,
+                    created REAL NOT NULL,
+                    updated REAL NOT NULL,
+                    last_error TEXT
+                )"""
+            )
+            self.conn.execute(
+                "CREATE INDEX IF NOT EXISTS outbox_due ON outbox (state, next_attempt)"
+            )
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+    def enqueue(self, message_id, channel, title, content, now=None):
+        """入队并返回 (key, 是否新入队)；同一消息 ID 的相同内容已在队列中或已发送时不重复入队"""
+        now = now or time.time()
+        key = message_key(message_id, channel, title, content)
+        with self.lock, self.conn:
+            cursor = self.conn.execute(
+                "INSERT OR IGNORE INTO outbox (key, channel, title, content, state, "
+                "next_attempt, created, updated) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, channel, title, content, PENDING, now + self.lease, now, now),
+            )
+        return key, cursor.rowcount > 0
+
+    def claim(self, limit=100, now=None):
+        """取出到期的待发送消息 [(key, channel, title, content)]，并租用 lease 秒"""
+        now = now or time.time()
+        with self.lock, self.conn:
+            rows = self.conn.execute(
+                "SELECT key, channel, title, content FROM outbox "
+                "WHERE state = ? AND next_attempt <= ? ORDER BY next_attempt LIMIT ?",
+                (PENDING, now, limit),
+            ).fetchall()
+            self.conn.executemany(
+                "UPDATE outbox SET next_attempt = ? WHERE key = ?",
+                [(now + self.lease, row[0]) for row in rows],
+            )
+        return rows
+
+    def ack(self, key, now=None):
+        now = now or time.time()
+        with self.lock, self.conn:
+            self.conn.execute(
+                "UPDATE outbox SET state = ?, updated = ?, last_error = NULL WHERE key = ?",
+                (SENT, now, key),
+            )
+
+    def backoff(self, attempts):
+        """第 attempts 次失败后的等待秒数：指数增长，取上限后在 [50%, 100%] 间随机抖动"""
+        delay = min(self.max_delay, self.base_delay * 2 ** (attempts - 1))
+        return delay * random.uniform(0.5, 1.0)
+
+    def fail(self, key, error="", now=None):
+        """记录一次失败，返回下次重试时间；放弃重试时返回 None"""
+        now = now or time.time()
+        with self.lock, self.conn:
+            row = self.conn.execute(
+                "SELECT attempts, created FROM outbox WHERE key = ? AND state = ?",
+                (key, PENDING),
+            ).fetchone()
+            if row is None:
+                return None
+            attempts = row[0] + 1
+            next_attempt = now + self.backoff(attempts)
+            give_up = attempts >= self.max_attempts or next_attempt - row[1] > self.max_age
+            self.conn.execute(
+                "UPDATE outbox SET state = ?, attempts = ?, next_attempt = ?, updated = ?, "
+                "last_error = ? WHERE key = ?",
+                (DEAD if give_up else PENDING, attempts, next_attempt, now, str(error), key),
+            )
+        return None if give_up else next_attempt
+
+    def purge(self, now=None):
+        """删除超过 keep_sent 的已发送记录和超过 max_age 的放弃记录，返回删除条数"""
+        now = now or time.time()
+        with self.lock, self.conn:
+            cursor = self.conn.execute(
+                "DELETE FROM outbox WHERE (state = ? AND updated < ?) OR (state = ? AND updated < ?)",
+                (SENT, now - self.keep_sent, DEAD, now - self.max_age),
+            )
+        return cursor.rowcount
+
+    def get_stats(self) -> dict:
+        """各状态的消息数"""
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT state, COUNT(*) FROM outbox GROUP BY state"
+            ).fetchall()
+        stats = {PENDING: 0, SENT: 0, DEAD: 0}
+        stats.update(rows)
+        return stats
@@ -1,33 +1,624 @@
 #!/usr/bin/env python3
 # _*_ coding:utf-8 _*_
 
+import os
 import re
+import ssl
 import base64
+import math
+import asyncio
 import random
 import certifi
 import requests
+import threading
+import time
+import weakref
+from array import array
+from collections import Counter, deque, namedtuple
 from datetime import datetime
+from functools import lru_cache
+from operator import itemgetter
 from Crypto.PublicKey import RSA
 from Crypto.Cipher import PKCS1_v1_5
 from requests.adapters import HTTPAdapter
-from urllib3.util.ssl_ import create_urllib3_context
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+
+def _env_pool_size(name, default=10):
+    """读取连接池大小，需为正整数，格式无效时提示并使用默认值"""
+    value = os.environ.get(name)
+    if not value:
+        return default
+    try:
+        size = int(value)
+        if size > 0:
+            return size
+    except ValueError:
+        pass
+    print(f"⚠️ {name}={value!r} 应为正整数，使用默认值 {default}")
+    return default
+
+
+# 连接池大小，可通过环境变量调整（多账号并发时建议调大 TELECOM_POOL_MAXSIZE）
+TELECOM_POOL_CONNECTIONS = _env_pool_size("TELECOM_POOL_CONNECTIONS")
+TELECOM_POOL_MAXSIZE = _env_pool_size("TELECOM_POOL_MAXSIZE")
+
+# 连接复用统计：requests 为请求数，handshakes 为新建 TLS 连接数，resumed 为会话复用的握手数
+_POOL_STATS = {"requests": 0, "handshakes": 0, "resumed": 0}
+_POOL_LOCK = threading.Lock()
+_SHARED_SSL_CONTEXT = None
+_SHARED_ADAPTER = None
+
+LOGIN_URL = "https://appgologin.189.cn:9031/login/client/userLoginNormal"
+IMPORTANT_DATA_URL = "https://appfuwu.189.cn:9021/query/qryImportantData"
+FLUX_PACKAGE_URL = "https://appfuwu.189.cn:9021/query/userFluxPackage"
+SHARE_USAGE_URL = "https://appfuwu.189.cn:9021/query/qryShareUsage"
+
+
+class _ResumingSSLContext(ssl.SSLContext):
+    """
+    按主机缓存 TLS 会话，新建连接时尝试会话复用，减少完整握手。
+    TLS 1.2 握手完成即可拿到会话；TLS 1.3 的会话票据在握手后随响应下发，
+    因此同时记录每个主机最近一次的连接，新建连接时从仍存活的连接上取最新会话。
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__()
+        self._sessions = {}
+        self._last_sockets = {}
+
+    def _get_session(self, server_hostname):
+        with _POOL_LOCK:
+            ref = self._last_sockets.get(server_hostname)
+            sock = ref() if ref is not None else None
+            session = sock.session if sock is not None else None
+            if session is not None:
+                self._sessions[server_hostname] = session
+            return self._sessions.get(server_hostname)
+
+    def wrap_socket(self, sock, *args, server_hostname=None, **kwargs):
+        session = None
+        if kwargs.get("session") is None:
+            session = self._get_session(server_hostname)
+            if session is not None:
+                kwargs["session"] = session
+        try:
+            ssl_sock = super().wrap_socket(
+                sock, *args, server_hostname=server_hostname, **kwargs
+            )
+        except ValueError:
+            if session is None:
+                raise
+            # 会话与当前上下文不匹配时丢弃缓存，回退到完整握手
+            with _POOL_LOCK:
+                self._sessions.pop(server_hostname, None)
+                self._last_sockets.pop(server_hostname, None)
+            kwargs.pop("session")
+            ssl_sock = super().wrap_socket(
+                sock, *args, server_hostname=server_hostname, **kwargs
+            )
+        with _POOL_LOCK:
+            _POOL_STATS["handshakes"] += 1
+            if ssl_sock.session_reused:
+                _POOL_STATS["resumed"] += 1
+            elif ssl_sock.session is not None:
+                self._sessions[server_hostname] = ssl_sock.session
+            self._last_sockets[server_hostname] = weakref.ref(ssl_sock)
+        return ssl_sock
+
+
+def get_ssl_context():
+    """获取进程内共享的 SSL 上下文，CA 证书只加载一次"""
+    global _SHARED_SSL_CONTEXT
+    if _SHARED_SSL_CONTEXT is None:
+        with _POOL_LOCK:
+            if _SHARED_SSL_CONTEXT is None:
+                # 与 urllib3 默认上下文的安全设置一致
+                ssl_context = _ResumingSSLContext(ssl.PROTOCOL_TLS_CLIENT)
+                ssl_context.minimum_version = ssl.TLSVersion.TLSv1_2
+                ssl_context.options |= (
+                    ssl.OP_NO_SSLv2 | ssl.OP_NO_SSLv3 | ssl.OP_NO_COMPRESSION | ssl.OP_NO_TICKET
+                )
+                if getattr(ssl_context, "post_handshake_auth", None) is not None:
+                    ssl_context.post_handshake_auth = True
+                ssl_context.set_ciphers("DEFAULT:@SECLEVEL=1")
+                ssl_context.load_verify_locations(cafile=certifi.where())
+                _SHARED_SSL_CONTEXT = ssl_context
+    return _SHARED_SSL_CONTEXT
 
 
 class TelecomSSLAdapter(HTTPAdapter):
     """自定义适配器解决SSL证书问题"""
 
-    def __init__(self):
+    def __init__(self, pool_connections=None, pool_maxsize=None):
         self.ssl_context = None
-        super().__init__()
+        super().__init__(
+            pool_connections=pool_connections or TELECOM_POOL_CONNECTIONS,
+            pool_maxsize=pool_maxsize or TELECOM_POOL_MAXSIZE,
+        )
 
     def init_poolmanager(self, connections, maxsize, block=False, **pool_kwargs):
         if self.ssl_context is None:
-            self.ssl_context = create_urllib3_context()
-            self.ssl_context.set_ciphers("DEFAULT:@SECLEVEL=1")
-            self.ssl_context.load_verify_locations(cafile=certifi.where())
+            self.ssl_context = get_ssl_context()
         pool_kwargs["ssl_context"] = self.ssl_context
         return super().init_poolmanager(connections, maxsize, block, **pool_kwargs)
 
+    def build_connection_pool_key_attributes(self, request, verify, cert=None):
+        host_params, pool_kwargs = super().build_connection_pool_key_attributes(
+            request, verify, cert
+        )
+        # 共享上下文已加载 certifi，避免每个新连接重复解析 CA 证书
+        pool_kwargs.pop("ca_certs", None)
+        pool_kwargs.pop("ca_cert_dir", None)
+        return host_params, pool_kwargs
+
+    def cert_verify(self, conn, url, verify, cert):
+        super().cert_verify(conn, url, verify, cert)
+        if verify:
+            conn.ca_certs = None
+            conn.ca_cert_dir = None
+
+    def send(self, request, *args, **kwargs):
+        with _POOL_LOCK:
+            _POOL_STATS["requests"] += 1
+        return super().send(request, *args, **kwargs)
+
+
+def get_shared_adapter():
+    """获取进程内共享的连接池适配器，所有 Telecom 实例复用长连接"""
+    global _SHARED_ADAPTER
+    if _SHARED_ADAPTER is None:
+        adapter = TelecomSSLAdapter()
+        with _POOL_LOCK:
+            if _SHARED_ADAPTER is None:
+                _SHARED_ADAPTER = adapter
+    return _SHARED_ADAPTER
+
+
+def get_pool_stats():
+    """连接池统计，handshakes_saved 为复用连接或会话复用节省的完整握手次数"""
+    with _POOL_LOCK:
+        stats = dict(_POOL_STATS)
+    stats["handshakes_saved"] = (
+        stats["requests"] - stats["handshakes"] + stats["resumed"]
+    )
+    return stats
+
+
+# 限流配置：格式为 "每秒请求数:突发数"，每秒请求数为 0 时不限流
+# 可通过环境变量 TELECOM_RATE_LOGIN_HOST / TELECOM_RATE_QUERY_HOST / TELECOM_RATE_LOGIN / TELECOM_RATE_QUERY 覆盖
+RATE_LIMITS = {
+    "LOGIN_HOST": "2:4",  # 登录域名 appgologin.189.cn
+    "QUERY_HOST": "10:20",  # 查询域名 appfuwu.189.cn
+    "LOGIN": "1:3",  # 登录接口 userLoginNormal
+    "QUERY": "8:16",  # 查询接口 qryImportantData 等
+}
+LOGIN_CODES = {"userLoginNormal"}
+
+
+class TokenBucket:
+    """线程安全的令牌桶，reserve 返回取得令牌需要等待的秒数"""
+
+    def __init__(self, rate, burst):
+        self.rate = float(rate)
+        self.burst = max(1.0, float(burst))
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+        self.stats = {"acquired": 0, "waited": 0, "wait_total": 0.0, "wait_max": 0.0}
+
+    def reserve(self):
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(
+                self.burst, self.tokens + (now - self.updated) * self.rate
+            )
+            self.updated = now
+            # 令牌不足时允许透支，透支部分即为排队等待时间
+            self.tokens -= 1
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0.0
+            self.stats["acquired"] += 1
+            if wait > 0:
+                self.stats["waited"] += 1
+                self.stats["wait_total"] += wait
+                self.stats["wait_max"] = max(self.stats["wait_max"], wait)
+            return wait
+
+
+def parse_rate_limit(value):
+    """解析 "每秒请求数:突发数"，突发数缺省时等于每秒请求数，返回 (rate, burst)；格式不正确时抛出 ValueError"""
+    rate, _, burst = str(value).strip().partition(":")
+    rate = float(rate or 0)
+    burst = float(burst or rate)
+    if not (math.isfinite(rate) and math.isfinite(burst)) or rate < 0 or burst < 0:
+        raise ValueError(value)
+    return rate, burst
+
+
+class RateLimiter:
+    """按域名和接口类型（登录/查询）分别限流，进程内所有 Telecom 实例共享"""
+
+    def __init__(self, limits=None):
+        self.buckets = {}
+        self.lock = threading.Lock()
+        self.total = {"acquired": 0, "waited": 0, "wait_total": 0.0, "wait_max": 0.0}
+        for name, default in (limits or RATE_LIMITS).items():
+            env_name = f"TELECOM_RATE_{name}"
+            value = os.environ.get(env_name, default)
+            try:
+                rate, burst = parse_rate_limit(value)
+            except ValueError:
+                print(f"⚠️ {env_name}={value!r} 格式应为 \"每秒请求数:突发数\"，使用默认值 {default}")
+                rate, burst = parse_rate_limit(default)
+            if rate > 0:
+                self.buckets[name] = TokenBucket(rate, burst)
+
+    def reserve(self, url):
+        host_name = "LOGIN_HOST" if "appgologin" in url else "QUERY_HOST"
+        code_name = "LOGIN" if url.rsplit("/", 1)[-1] in LOGIN_CODES else "QUERY"
+        wait = 0.0
+        for name in (host_name, code_name):
+            if name in self.buckets:
+                wait = max(wait, self.buckets[name].reserve())
+        # 实际等待时间取两个桶中较长者
+        with self.lock:
+            self.total["acquired"] += 1
+            if wait > 0:
+                self.total["waited"] += 1
+                self.total["wait_total"] += wait
+                self.total["wait_max"] = max(self.total["wait_max"], wait)
+        return wait
+
+    def stats(self):
+        stats = {}
+        for name, bucket in self.buckets.items():
+            with bucket.lock:
+                stats[name] = dict(bucket.stats)
+        with self.lock:
+            stats["TOTAL"] = dict(self.total)
+        return stats
+
+
+RATE_LIMITER = RateLimiter()
+
+
+def get_rate_limit_stats():
+    """各限流桶的取令牌次数、排队次数及排队等待时间（秒），TOTAL 为请求实际等待"""
+    return RATE_LIMITER.stats()
+
+
+# 流量单位换算为 KB 的倍数
+FLOW_UNITS = {"KB": 1, "MB": 1024, "GB": 1024**2, "TB": 1024**3}
+FLOW_SIZE_RE = re.compile(r"(\d+(?:\.\d+)?[KMGT]B)")
+
+
+@lru_cache(maxsize=4096)
+def parse_flow_kb(size_str):
+    """流量字符串（如 "1.5GB"）换算为 KB，数字视为 KB；结果按字符串缓存"""
+    if not size_str:
+        return 0
+    if isinstance(size_str, (int, float)):
+        return int(size_str)
+    unit = size_str[-2:]
+    if unit not in FLOW_UNITS:
+        raise ValueError("Invalid unit")
+    return int(float(size_str[:-2]) * FLOW_UNITS[unit])
+
+
+# flowList 流量包识别规则：conditions 为 ((字段, 需包含的子串), ...)，全部满足即匹配，
+# parse(item) 返回 (已用, 剩余, 总量)，单位 KB。按顺序匹配，第一个命中的规则生效
+FlowRule = namedtuple("FlowRule", ("name", "conditions", "parse"))
+FLOW_RULES = []
+_FLOW_MATCH_FIELDS = ()  # 所有规则用到的字段，其取值组合作为匹配缓存的键
+_FLOW_STATS = Counter()
+_FLOW_UNMATCHED = deque(maxlen=20)  # 最近未识别的流量包，便于补充规则
+_FLOW_LOCK = threading.Lock()
+
+
+def register_flow_rule(name, conditions, parse, first=False):
+    """注册流量包识别规则，first=True 时优先于已有规则匹配；同名规则会被替换"""
+    global _FLOW_MATCH_FIELDS
+    rule = FlowRule(name, tuple(conditions), parse)
+    with _FLOW_LOCK:
+        FLOW_RULES[:] = [r for r in FLOW_RULES if r.name != name]
+        if first:
+            FLOW_RULES.insert(0, rule)
+        else:
+            FLOW_RULES.append(rule)
+        _FLOW_MATCH_FIELDS = tuple(
+            dict.fromkeys(field for r in FLOW_RULES for field, _ in r.conditions)
+        )
+        _match_flow_rule.cache_clear()
+    return rule
+
+
+def find_flow_rule(item, rules=None):
+    """返回第一个匹配的规则，没有匹配时返回 None"""
+    for rule in FLOW_RULES if rules is None else rules:
+        if all(text in (item.get(field) or "") for field, text in rule.conditions):
+            return rule
+    return None
+
+
+@lru_cache(maxsize=4096)
+def _match_flow_rule(values):
+    # 同一形态的流量包（标题字段相同）只做一次子串匹配
+    return find_flow_rule(dict(zip(_FLOW_MATCH_FIELDS, values)))
+
+
+def _parse_regular(item):
+    use = parse_flow_kb(item["leftTitleHh"])
+    balance = parse_flow_kb(item["rightTitleHh"])
+    return use, balance, use + balance
+
+
+def _parse_over(item):
+    balance = -parse_flow_kb(item["leftTitleHh"])
+    use = parse_flow_kb(item["rightTitleEnd"].split("/")[1]) - balance
+    return use, balance, use + balance
+
+
+def _parse_throttled(item):
+    total = parse_flow_kb(FLOW_SIZE_RE.search(item["rightTitle"]).group(1))
+    use = parse_flow_kb(item["leftTitleHh"])
+    return use, total - use, total
+
+
+# 常规流量
+register_flow_rule("regular", (("leftTitle", "已用"), ("rightTitle", "剩余")), _parse_regular)
+# 常规流量，超流量
+register_flow_rule("over", (("leftTitle", "超出"), ("rightTitleEnd", "/")), _parse_over)
+# 无限流量，达量降速
+register_flow_rule(
+    "throttled", (("leftTitle", "已用"), ("rightTitle", "降速")), _parse_throttled
+)
+
+
+def classify_flow_items(flow_list, rules=None):
+    """按规则表识别 flowList，返回 flowItems；不能识别或解析失败的计入统计而不中断"""
+    fields = _FLOW_MATCH_FIELDS
+    getter = itemgetter(*fields) if len(fields) > 1 else None
+    counts = {}
+    unmatched = []
+    flow_items = []
+    skipped = errors = 0
+    for item in flow_list:
+        title = item.get("title") or ""
+        if "流量" not in title:
+            skipped += 1
+            continue
+        if rules is not None:
+            rule = find_flow_rule(item, rules)
+        else:
+            try:
+                key = getter(item)
+            except (KeyError, TypeError):
+                key = tuple(map(item.get, fields))
+            rule = _match_flow_rule(key)
+        if rule is None:
+            unmatched.append(title)
+            continue
+        try:
+            use, balance, total = rule.parse(item)
+        except (KeyError, IndexError, AttributeError, ValueError):
+            errors += 1
+            unmatched.append(title)
+            continue
+        counts[rule.name] = counts.get(rule.name, 0) + 1
+        flow_items.append({"name": title, "use": use, "balance": balance, "total": total})
+    counts.update(
+        items=len(flow_list),
+        skipped=skipped,
+        errors=errors,
+        unmatched=len(unmatched) - errors,
+    )
+    with _FLOW_LOCK:
+        _FLOW_STATS.update(counts)
+        _FLOW_UNMATCHED.extend(unmatched[-_FLOW_UNMATCHED.maxlen :])
+    return flow_items
+
+
+def get_flow_stats():
+    """流量包识别统计：items 总数、skipped 非流量项、unmatched 未识别、errors 解析失败及各规则命中数"""
+    with _FLOW_LOCK:
+        stats = dict(_FLOW_STATS)
+        stats["recent_unmatched"] = list(_FLOW_UNMATCHED)
+    return stats
+
+
+class _CaesarTable(dict):
+    """str.translate 用的号码移位表：每个字符码位偏移 shift，首次遇到时计算并缓存"""
+
+    def __init__(self, shift):
+        super().__init__()
+        self.shift = shift
+        for code in range(128):
+            self[code] = chr(code + shift & 65535)
+
+    def __missing__(self, code):
+        value = self[code] = chr(code + self.shift & 65535)
+        return value
+
+
+ENCODE_TABLE = _CaesarTable(2)
+DECODE_TABLE = _CaesarTable(-2)
+
+# 共享用量展开表取值的字段名，按顺序取第一个存在的。
+# 层级结构 sharePhoneBeans/shareTypeBeans/shareUsageInfos/shareUsageAmounts/phoneNum 与解密号码时一致，
+# 以下取值字段未经接口样本确认：一个用量字段都取不到时不生成展开表，调用方使用原始嵌套结果
+SHARE_TYPE_NAME_KEYS = ("shareTypeName", "title", "name")
+SHARE_TITLE_KEYS = ("title", "shareUsageName", "name")
+SHARE_USED_KEYS = ("usageAmount", "usedAmount", "used")
+SHARE_TOTAL_KEYS = ("totalAmount", "total")
+
+_share_keys_warned = False
+
+
+def _first_value(data, keys, default=None):
+    for key in keys:
+        if key in data:
+            return data[key]
+    return default
+
+
+def _warn_share_keys(share_amount):
+    """共享用量字段名与预期不符时只提示一次，附上实际字段名便于修正"""
+    global _share_keys_warned
+    if not _share_keys_warned:
+        _share_keys_warned = True
+        print(
+            f"共享用量中未找到用量字段 {SHARE_USED_KEYS}，实际字段为 {sorted(share_amount)}，"
+            "不生成 shareUsageTable"
+        )
+
+
+TELECOM_PUBLIC_KEY_PEM = """-----BEGIN PUBLIC KEY-----
+MIGfMA0GCSqGSIb3DQEBAQUAA4GNADCBiQKBgQDBkLT15ThVgz6/NOl6s8GNPofd
+WzWbCkWnkaAm7O2LjkM1H7dMvzkiqdxU02jamGRHLX/ZNMCXHnPcW/sDhiFCBN18
+qFvy8g6VYb9QtroI09e176s+ZCtiv7hbin2cCTj99iUpnEloZm19lwHyo69u5UMi
+PMpq0/XKBO8lYhN/gwIDAQAB
+-----END PUBLIC KEY-----"""
+
+
+@lru_cache(maxsize=None)
+def get_cipher():
+    """登录加密用的 RSA 公钥只解析一次，进程内共享（PKCS1_v1_5 加密无状态，可多线程共用）"""
+    return PKCS1_v1_5.new(RSA.import_key(TELECOM_PUBLIC_KEY_PEM.encode()))
+
+
+def encode_number(value):
+    """号码、密码的移位编码；会传入明文密码，不做缓存，号码的编码结果保存在请求模板中"""
+    return value.translate(ENCODE_TABLE)
+
+
+# 请求 headerInfos 中固定不变的字段
+STATIC_HEADER_INFOS = {"shopId": "20002", "source": "110003", "sourcePassword": "Sid98s"}
+
+
+# Summary 的数值字段，顺序即 to_summary 字典的键顺序（phonenum 之后、createTime 之前），
+# 同时是 telecom_history 历史文件的列顺序，已有历史文件时只能在末尾追加字段
+SUMMARY_FIELDS = (
+    "balance",
+    "voiceUsage",
+    "voiceBalance",
+    "voiceTotal",
+    "flowUse",
+    "flowTotal",
+    "flowOver",
+    "commonUse",
+    "commonTotal",
+    "commonOver",
+    "specialUse",
+    "specialTotal",
+)
+FLOW_ITEM_FIELDS = ("use", "balance", "total")
+
+
+class Summary:
+    """单个号码的套餐用量，使用 __slots__ 减少大量账号时的内存占用；to_dict 还原为 to_summary 的字典格式"""
+
+    __slots__ = ("phonenum", *SUMMARY_FIELDS, "createTime", "flowItems")
+
+    def __init__(self, phonenum, values, createTime, flowItems):
+        self.phonenum = phonenum
+        for field, value in zip(SUMMARY_FIELDS, values):
+            setattr(self, field, value)
+        self.createTime = createTime
+        self.flowItems = flowItems
+
+    def values(self):
+        return tuple(getattr(self, field) for field in SUMMARY_FIELDS)
+
+    def to_dict(self):
+        return {
+            "phonenum": self.phonenum,
+            **dict(zip(SUMMARY_FIELDS, self.values())),
+            "createTime": self.createTime,
+            "flowItems": [dict(item) for item in self.flowItems],
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(
+            data["phonenum"],
+            [data[field] for field in SUMMARY_FIELDS],
+            data["createTime"],
+            [dict(item) for item in data.get("flowItems") or []],
+        )
+
+    def __eq__(self, other):
+        if not isinstance(other, Summary):
+            return NotImplemented
+        return self.to_dict() == other.to_dict()
+
+    def __repr__(self):
+        return f"Summary({self.phonenum!r}, {self.createTime!r})"
+
+
+class SummaryColumns:
+    """
+    多个号码的套餐用量按列存储：每个数值字段一个 array('q')，流量包明细展平为
+    flowName / flowUse / flowBalance / flowTotal 列，第 i 个号码的流量包为
+    flowOffsets[i]:flowOffsets[i + 1] 区间。数值列可直接用 numpy.frombuffer 零拷贝读取。
+    """
+
+    def __init__(self):
+        self.phonenum = []
+        self.createTime = []
+        self.columns = {field: array("q") for field in SUMMARY_FIELDS}
+        self.flowOffsets = array("q", [0])
+        self.flowName = []
+        self.flowColumns = {field: array("q") for field in FLOW_ITEM_FIELDS}
+
+    def __len__(self):
+        return len(self.phonenum)
+
+    def __getitem__(self, field):
+        return self.columns[field]
+
+    def append(self, summary):
+        self.phonenum.append(summary.phonenum)
+        self.createTime.append(summary.createTime)
+        for field, column in self.columns.items():
+            column.append(getattr(summary, field))
+        for item in summary.flowItems:
+            self.flowName.append(item["name"])
+            for field, column in self.flowColumns.items():
+                column.append(item[field])
+        self.flowOffsets.append(len(self.flowName))
+
+    @classmethod
+    def from_summaries(cls, summaries):
+        result = cls()
+        for summary in summaries:
+            if isinstance(summary, dict):
+                summary = Summary.from_dict(summary)
+            result.append(summary)
+        return result
+
+    def flow_items(self, index):
+        start, end = self.flowOffsets[index], self.flowOffsets[index + 1]
+        columns = [self.flowName] + [self.flowColumns[f] for f in FLOW_ITEM_FIELDS]
+        return [
+            dict(zip(("name",) + FLOW_ITEM_FIELDS, values))
+            for values in zip(*(column[start:end] for column in columns))
+        ]
+
+    def row(self, index):
+        return Summary(
+            self.phonenum[index],
+            [self.columns[field][index] for field in SUMMARY_FIELDS],
+            self.createTime[index],
+            self.flow_items(index),
+        )
+
+    def to_dicts(self):
+        return [self.row(i).to_dict() for i in range(len(self))]
+
 
 class Telecom:
     def __init__(self):
@@ -43,11 +634,16 @@ class Telecom:
             "Accept-Encoding": "gzip",
             "user-agent": "P216010901",
         }
-        # 创建会话并使用自定义适配器
-        self.session = requests.Session()
-        adapter = TelecomSSLAdapter()
-        self.session.mount("https://", adapter)
-        self.session.verify = certifi.where()
+        self.session = self._create_session()
+        # 按接口和账号缓存的请求模板，构造请求时复制后只填入时间戳、token 等变化字段
+        self._templates = {}
+
+    def _create_session(self):
+        """创建会话并挂载进程内共享的连接池适配器"""
+        session = requests.Session()
+        session.mount("https://", get_shared_adapter())
+        session.verify = certifi.where()
+        return session
 
     def set_login_info(self, login_info):
         self.login_info = login_info
@@ -56,22 +652,10 @@ class Telecom:
         self.token = login_info.get("token", None)
 
     def trans_number(self, phonenum, encode=True):
-        result = ""
-        caesar_size = 2 if encode else -2
-        for char in phonenum:
-            result += chr(ord(char) + caesar_size & 65535)
-        return result
+        return phonenum.translate(ENCODE_TABLE if encode else DECODE_TABLE)
 
     def encrypt(self, str):
-        public_key_pem = """-----BEGIN PUBLIC KEY-----
-MIGfMA0GCSqGSIb3DQEBAQUAA4GNADCBiQKBgQDBkLT15ThVgz6/NOl6s8GNPofd
-WzWbCkWnkaAm7O2LjkM1H7dMvzkiqdxU02jamGRHLX/ZNMCXHnPcW/sDhiFCBN18
-qFvy8g6VYb9QtroI09e176s+ZCtiv7hbin2cCTj99iUpnEloZm19lwHyo69u5UMi
-PMpq0/XKBO8lYhN/gwIDAQAB
------END PUBLIC KEY-----"""
-        public_key = RSA.import_key(public_key_pem.encode())
-        cipher = PKCS1_v1_5.new(public_key)
-        ciphertext = cipher.encrypt(str.encode())
+        ciphertext = get_cipher().encrypt(str.encode())
         encoded_ciphertext = base64.b64encode(ciphertext).decode()
         return encoded_ciphertext
 
@@ -83,231 +667,226 @@ PMpq0/XKBO8lYhN/gwIDAQAB
         ).days
         return int((fee_remain_flow / days_in_month))
 
-    def do_login(self, phonenum, password):
-        phonenum = phonenum or self.phonenum
-        password = password or self.password
+    def _post(self, url, body):
+        wait = RATE_LIMITER.reserve(url)
+        if wait > 0:
+            time.sleep(wait)
+        response = self.session.post(url, headers=self.headers, json=body)
+        return response.json()
+
+    def _template(self, code, account, field_data=None, token_first=False):
+        """
+        返回 (headerInfos 模板, fieldData 模板)，按接口、账号、客户端类型及 fieldData 静态字段缓存，
+        号码在模板中已编码好。token_first 为登录接口的字段顺序（token 在 userLoginName 之前）
+        """
+        field_data = field_data or {}
+        key = (code, account, self.client_type, tuple(field_data.items()))
+        template = self._templates.get(key)
+        if template is None:
+            header = {"code": code, "clientType": self.client_type, "timestamp": ""}
+            header.update(STATIC_HEADER_INFOS)
+            if token_first:
+                header["token"] = ""
+            header["userLoginName"] = encode_number(account)
+            header["token"] = ""
+            if "account" in field_data:
+                field_data = {**field_data, "account": encode_number(account)}
+            template = self._templates[key] = (header, field_data)
+        return template
+
+    def _header_infos(self, template, ts, token):
+        header = template.copy()
+        header["timestamp"] = ts
+        header["token"] = token
+        return header
+
+    def build_login_body(self, phonenum, password):
         uuid = str(random.randint(1000000000000000, 9999999999999999))
         ts = datetime.now().strftime("%Y%m%d%H%M%S")
         enc_str = f"iPhone 14 13.2.{uuid[:12]}{phonenum}{ts}{password}0$$$0."
-        body = {
+        header, _ = self._template("userLoginNormal", phonenum, token_first=True)
+        return {
             "content": {
                 "fieldData": {
                     "accountType": "",
-                    "authentication": self.trans_number(password),
+                    "authentication": encode_number(password),
                     "deviceUid": uuid[:16],
                     "isChinatelecom": "",
                     "loginAuthCipherAsymmertric": self.encrypt(enc_str),
                     "loginType": "4",
-                    "phoneNum": self.trans_number(phonenum),
+                    "phoneNum": header["userLoginName"],
                     "systemVersion": "13.2.3",
                 },
                 "attach": "test",
             },
-            "headerInfos": {
-                "code": "userLoginNormal",
-                "clientType": self.client_type,
-                "timestamp": ts,
-                "shopId": "20002",
-                "source": "110003",
-                "sourcePassword": "Sid98s",
-                "token": "",
-                "userLoginName": self.trans_number(phonenum),
-            },
+            "headerInfos": self._header_infos(header, ts, ""),
         }
-        response = self.session.post(
-            "https://appgologin.189.cn:9031/login/client/userLoginNormal",
-            headers=self.headers,
-            json=body,
-        )
-        return response.json()
 
-    def qry_important_data(self, **kwargs):
+    def build_important_data_body(self, **kwargs):
         ts = datetime.now().strftime("%Y%m%d%H%M00")
-        body = {
-            "content": {
-                "fieldData": {
-                    "provinceCode": self.login_info["provinceCode"] or "600101",
-                    "cityCode": self.login_info["cityCode"] or "8441900",
-                    "shopId": "20002",
-                    "isChinatelecom": "0",
-                    "account": self.trans_number(self.phonenum),
-                },
-                "attach": "test",
-            },
-            "headerInfos": {
-                "code": "userFluxPackage",
-                "clientType": self.client_type,
-                "timestamp": ts,
+        header, field_data = self._template(
+            "userFluxPackage",
+            self.phonenum,
+            {
+                "provinceCode": self.login_info["provinceCode"] or "600101",
+                "cityCode": self.login_info["cityCode"] or "8441900",
                 "shopId": "20002",
-                "source": "110003",
-                "sourcePassword": "Sid98s",
-                "userLoginName": self.trans_number(self.phonenum),
-                "token": kwargs.get("token") or self.token,
+                "isChinatelecom": "0",
+                "account": None,
             },
-        }
-        response = self.session.post(
-            "https://appfuwu.189.cn:9021/query/qryImportantData",
-            headers=self.headers,
-            json=body,
         )
-        return response.json()
+        return {
+            "content": {"fieldData": field_data.copy(), "attach": "test"},
+            "headerInfos": self._header_infos(header, ts, kwargs.get("token") or self.token),
+        }
 
-    def user_flux_package(self, **kwargs):
+    def build_flux_package_body(self, **kwargs):
         ts = datetime.now().strftime("%Y%m%d%H%M00")
-        body = {
-            "content": {
-                "fieldData": {
-                    "queryFlag": "0",
-                    "accessAuth": "1",
-                    "account": self.trans_number(self.phonenum),
-                },
-                "attach": "test",
-            },
-            "headerInfos": {
-                "code": "userFluxPackage",
-                "clientType": self.client_type,
-                "timestamp": ts,
-                "shopId": "20002",
-                "source": "110003",
-                "sourcePassword": "Sid98s",
-                "userLoginName": self.trans_number(self.phonenum),
-                "token": kwargs.get("token") or self.token,
-            },
-        }
-        response = self.session.post(
-            "https://appfuwu.189.cn:9021/query/userFluxPackage",
-            headers=self.headers,
-            json=body,
+        header, field_data = self._template(
+            "userFluxPackage",
+            self.phonenum,
+            {"queryFlag": "0", "accessAuth": "1", "account": None},
         )
-        return response.json()
+        return {
+            "content": {"fieldData": field_data.copy(), "attach": "test"},
+            "headerInfos": self._header_infos(header, ts, kwargs.get("token") or self.token),
+        }
 
-    def qry_share_usage(self, **kwargs):
+    def build_share_usage_body(self, **kwargs):
         billing_cycle = kwargs.get("billing_cycle") or datetime.now().strftime("%Y%m")
         ts = datetime.now().strftime("%Y%m%d%H%M00")
-        body = {
+        header, _ = self._template("qryShareUsage", self.phonenum)
+        return {
             "content": {
                 "attach": "test",
                 "fieldData": {
                     "billingCycle": billing_cycle,
-                    "account": self.trans_number(self.phonenum),
+                    "account": header["userLoginName"],
                 },
             },
-            "headerInfos": {
-                "code": "qryShareUsage",
-                "clientType": self.client_type,
-                "timestamp": ts,
-                "shopId": "20002",
-                "source": "110003",
-                "sourcePassword": "Sid98s",
-                "userLoginName": self.trans_number(self.phonenum),
-                "token": kwargs.get("token") or self.token,
-            },
+            "headerInfos": self._header_infos(header, ts, kwargs.get("token") or self.token),
         }
-        response = self.session.post(
-            "https://appfuwu.189.cn:9021/query/qryShareUsage",
-            headers=self.headers,
-            json=body,
-        )
-        data = response.json()
-        # 返回的号码字段加密，需做解密转换
-        if data.get("responseData") and data.get("responseData").get("data", {}).get(
-            "sharePhoneBeans", []
-        ):
-            for item in data["responseData"]["data"]["sharePhoneBeans"]:
-                item["sharePhoneNum"] = self.trans_number(item["sharePhoneNum"], False)
-            for share_type in data["responseData"]["data"]["shareTypeBeans"]:
-                for share_info in share_type["shareUsageInfos"]:
-                    for share_amount in share_info["shareUsageAmounts"]:
-                        share_amount["phoneNum"] = self.trans_number(
-                            share_amount["phoneNum"], False
+
+    def decode_share_usage(self, data, flatten=False):
+        """
+        解密共享用量中的号码字段；flatten=True 时同时生成按成员展开的用量表，
+        保存在 data["shareUsageTable"]，每行为 {member, shareType, title, used, total}。
+        成员条目中取不到 SHARE_USED_KEYS 任一字段时不生成展开表，只返回原始嵌套结果
+        """
+        share_data = (data.get("responseData") or {}).get("data") or {}
+        table = []
+        unknown_keys = None
+        if share_data.get("sharePhoneBeans"):
+            for item in share_data["sharePhoneBeans"]:
+                item["sharePhoneNum"] = item["sharePhoneNum"].translate(DECODE_TABLE)
+            for share_type in share_data.get("shareTypeBeans") or []:
+                type_name = _first_value(share_type, SHARE_TYPE_NAME_KEYS)
+                for share_info in share_type.get("shareUsageInfos") or []:
+                    title = _first_value(share_info, SHARE_TITLE_KEYS)
+                    total = _first_value(share_info, SHARE_TOTAL_KEYS)
+                    for share_amount in share_info.get("shareUsageAmounts") or []:
+                        member = share_amount["phoneNum"].translate(DECODE_TABLE)
+                        share_amount["phoneNum"] = member
+                        if not flatten or unknown_keys is not None:
+                            continue
+                        if not any(key in share_amount for key in SHARE_USED_KEYS):
+                            unknown_keys = share_amount
+                            continue
+                        table.append(
+                            {
+                                "member": member,
+                                "shareType": type_name,
+                                "title": title,
+                                "used": _first_value(share_amount, SHARE_USED_KEYS),
+                                "total": _first_value(share_amount, SHARE_TOTAL_KEYS, total),
+                            }
                         )
+        if flatten:
+            if unknown_keys is None:
+                data["shareUsageTable"] = table
+            else:
+                _warn_share_keys(unknown_keys)
         return data
 
-    def to_summary(self, data, phonenum=""):
-        if not data:
-            return {}
+    def do_login(self, phonenum, password):
         phonenum = phonenum or self.phonenum
+        password = password or self.password
+        return self._post(LOGIN_URL, self.build_login_body(phonenum, password))
+
+    def qry_important_data(self, **kwargs):
+        return self._post(IMPORTANT_DATA_URL, self.build_important_data_body(**kwargs))
+
+    def user_flux_package(self, **kwargs):
+        return self._post(FLUX_PACKAGE_URL, self.build_flux_package_body(**kwargs))
+
+    def qry_share_usage(self, flatten=False, **kwargs):
+        data = self._post(SHARE_USAGE_URL, self.build_share_usage_body(**kwargs))
+        return self.decode_share_usage(data, flatten)
+
+    def parse_summary(self, data, phonenum=""):
+        """解析 qryImportantData 的 responseData.data，返回 Summary"""
+        phonenum = phonenum or self.phonenum
+        flow_info = data["flowInfo"]
         # 总流量
-        total_amount = data["flowInfo"].get("totalAmount") or {}
+        total_amount = flow_info.get("totalAmount") or {}
         flow_use = int(total_amount.get("used") or 0)
-        flow_balance = int(total_amount.get("balance") or 0)
-        flow_total = flow_use + flow_balance
+        flow_total = flow_use + int(total_amount.get("balance") or 0)
         flow_over = int(total_amount.get("over") or 0)
         # 通用流量
-        common_flow = data["flowInfo"].get("commonFlow") or {}
+        common_flow = flow_info.get("commonFlow") or {}
         common_use = int(common_flow.get("used") or 0)
-        common_balance = int(common_flow.get("balance") or 0)
-        common_total = common_use + common_balance
+        common_total = common_use + int(common_flow.get("balance") or 0)
         common_over = int(common_flow.get("over") or 0)
         # 专用流量
-        special_amount = data["flowInfo"].get("specialAmount") or {}
+        special_amount = flow_info.get("specialAmount") or {}
         special_use = int(special_amount.get("used") or 0)
-        special_balance = int(special_amount.get("balance") or 0)
-        special_total = special_use + special_balance
+        special_total = special_use + int(special_amount.get("balance") or 0)
         # 语音通话
-        voice_usage = int(data["voiceInfo"]["voiceDataInfo"]["used"] or 0)
-        voice_balance = int(data["voiceInfo"]["voiceDataInfo"]["balance"] or 0)
-        voice_total = int(data["voiceInfo"]["voiceDataInfo"]["total"] or 0)
+        voice_data = data["voiceInfo"]["voiceDataInfo"]
+        voice_usage = int(voice_data["used"] or 0)
+        voice_balance = int(voice_data["balance"] or 0)
+        voice_total = int(voice_data["total"] or 0)
         # 余额
         balance = int(
             float(data["balanceInfo"]["indexBalanceDataInfo"]["balance"] or 0) * 100
         )
         # 流量包列表
-        flowItems = []
-        flow_lists = data.get("flowInfo", {}).get("flowList", [])
-        for item in flow_lists:
-            if "流量" not in item["title"]:
-                continue
-            # 常规流量
-            if "已用" in item["leftTitle"] and "剩余" in item["rightTitle"]:
-                item_use = self.convert_flow(item["leftTitleHh"], "KB")
-                item_balance = self.convert_flow(item["rightTitleHh"], "KB")
-                item_total = item_use + item_balance
-            # 常规流量，超流量
-            elif "超出" in item["leftTitle"] and "/" in item["rightTitleEnd"]:
-                item_balance = -self.convert_flow(item["leftTitleHh"], "KB")
-                item_use = (
-                    self.convert_flow(item["rightTitleEnd"].split("/")[1], "KB")
-                    - item_balance
-                )
-                item_total = item_use + item_balance
-            # 无限流量，达量降速
-            elif "已用" in item["leftTitle"] and "降速" in item["rightTitle"]:
-                item_total = self.convert_flow(
-                    re.search(r"(\d+[KMGT]B)", item["rightTitle"]).group(1), "KB"
-                )
-                item_use = self.convert_flow(item["leftTitleHh"], "KB")
-                item_balance = item_total - item_use
-            # 忽略其他不能识别的情形
-            else:
-                print(f"Ignore flow: {item}")
-                continue
-            flowItems.append(
-                {
-                    "name": item["title"],
-                    "use": item_use,
-                    "balance": item_balance,
-                    "total": item_total,
-                }
-            )
-        summary = {
-            "phonenum": phonenum,
-            "balance": balance,
-            "voiceUsage": voice_usage,
-            "voiceBalance": voice_balance,
-            "voiceTotal": voice_total,
-            "flowUse": flow_use,
-            "flowTotal": flow_total,
-            "flowOver": flow_over,
-            "commonUse": common_use,
-            "commonTotal": common_total,
-            "commonOver": common_over,
-            "specialUse": special_use,
-            "specialTotal": special_total,
-            "createTime": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-            "flowItems": flowItems,
-        }
-        return summary
+        flow_items = classify_flow_items(flow_info.get("flowList") or [])
+        return Summary(
+            phonenum,
+            (
+                balance,
+                voice_usage,
+                voice_balance,
+                voice_total,
+                flow_use,
+                flow_total,
+                flow_over,
+                common_use,
+                common_total,
+                common_over,
+                special_use,
+                special_total,
+            ),
+            datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            flow_items,
+        )
+
+    def to_summary(self, data, phonenum=""):
+        if not data:
+            return {}
+        return self.parse_summary(data, phonenum).to_dict()
+
+    def to_summary_many(self, responses):
+        """
+        批量解析多个号码，responses 为 (phonenum, responseData.data) 的可迭代对象，
+        返回 SummaryColumns；data 为空的号码跳过
+        """
+        columns = SummaryColumns()
+        for phonenum, data in responses:
+            if data:
+                columns.append(self.parse_summary(data, phonenum))
+        return columns
 
     def convert_flow(self, size_str, target_unit="KB", decimal=0):
         unit_dict = {"KB": 1024, "MB": 1024**2, "GB": 1024**3, "TB": 1024**4}
@@ -325,3 +904,73 @@ PMpq0/XKBO8lYhN/gwIDAQAB
             )
         else:
             raise ValueError("Invalid unit")
+
+
+class AsyncTelecom(Telecom):
+    """基于 aiohttp 的异步客户端，接口与 Telecom 一致，方法需 await 调用
+
+    多个实例可共用同一个 aiohttp.ClientSession 与 asyncio.Semaphore，
+    由一个事件循环并发驱动大量账号。
+    """
+
+    def __init__(self, session=None, semaphore=None):
+        if aiohttp is None:
+            raise ImportError("AsyncTelecom 需要 aiohttp，请先执行 pip3 install aiohttp")
+        super().__init__()
+        self.session = session
+        self.semaphore = semaphore
+        self._own_session = session is None
+
+    @staticmethod
+    def create_session(limit=100):
+        """创建沿用 SECLEVEL=1 共享 SSL 上下文的 aiohttp 会话，供多个实例共用"""
+        connector = aiohttp.TCPConnector(ssl=get_ssl_context(), limit=limit)
+        return aiohttp.ClientSession(connector=connector)
+
+    def _create_session(self):
+        # aiohttp 会话在首次请求时创建或由调用方传入，不创建用不到的 requests 会话
+        return None
+
+    async def close(self):
+        if self._own_session and self.session is not None:
+            await self.session.close()
+            self.session = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def _post(self, url, body):
+        wait = RATE_LIMITER.reserve(url)
+        if wait > 0:
+            await asyncio.sleep(wait)
+        if self.session is None:
+            self.session = self.create_session()
+            self._own_session = True
+        if self.semaphore is None:
+            return await self._do_post(url, body)
+        async with self.semaphore:
+            return await self._do_post(url, body)
+
+    async def _do_post(self, url, body):
+        async with self.session.post(url, headers=self.headers, json=body) as response:
+            return await response.json(content_type=None)
+
+    async def do_login(self, phonenum, password):
+        phonenum = phonenum or self.phonenum
+        password = password or self.password
+        return await self._post(LOGIN_URL, self.build_login_body(phonenum, password))
+
+    async def qry_important_data(self, **kwargs):
+        return await self._post(
+            IMPORTANT_DATA_URL, self.build_important_data_body(**kwargs)
+        )
+
+    async def user_flux_package(self, **kwargs):
+        return await self._post(FLUX_PACKAGE_URL, self.build_flux_package_body(**kwargs))
+
+    async def qry_share_usage(self, flatten=False, **kwargs):
+        data = await self._post(SHARE_USAGE_URL, self.build_share_usage_body(**kwargs))
+        return self.decode_share_usage(data, flatten)
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+# _*_ coding:utf-8 _*_
+# 套餐用量预测：基于 telecom_history 保存的历史数据，拟合各号码本账期的用量曲线，
+# 预测通用流量、各流量包、通话分钟和余额的耗尽日期及每日建议用量。
+#
+# 所有号码的所有序列拼成一个 NaN 填充的二维数组，一次性向量化地做最小二乘拟合，
+# 号码数量和历史长度增加时只增大数组，不增加 Python 层循环。
+# 依赖 numpy（可选），未安装时 forecast_accounts 抛出 RuntimeError。
+
+import calendar
+from datetime import datetime
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# 余额没有账期起点可以锚定，取最近多少天的数据拟合消耗速度
+BALANCE_LOOKBACK_DAYS = 30
+
+# 指标定义：(名称, 已用字段, 总量字段)，余额单独处理
+USAGE_METRICS = (
+    ("common", "commonUse", "commonTotal"),
+    ("voice", "voiceUsage", "voiceTotal"),
+)
+
+
+def cycle_bounds(now):
+    """当前账期（自然月）的起止时间戳"""
+    _, days_in_month = calendar.monthrange(now.year, now.month)
+    start = datetime(now.year, now.month, 1)
+    return start.timestamp(), start.timestamp() + days_in_month * 86400
+
+
+def _pad(rows):
+    """变长序列列表 -> NaN 填充的二维数组，使用下标运算整体填充"""
+    lengths = np.fromiter((len(row) for row in rows), dtype=np.int64, count=len(rows))
+    width = max(int(lengths.max()) if len(rows) else 0, 1)
+    result = np.full((len(rows), width), np.nan)
+    if lengths.sum():
+        flat = np.concatenate([np.asarray(row, dtype=float) for row in rows if len(row)])
+        row_index = np.repeat(np.arange(len(rows)), lengths)
+        offsets = np.repeat(np.cumsum(lengths) - lengths, lengths)
+        result[row_index, np.arange(len(flat)) - offsets] = flat
+    return result
+
+
+def fit_rates(t, used, anchored, cycle_start):
+    """
+    批量拟合每行的消耗速度（单位/天），返回 (rate, samples)
+    t/used: (行数, 列数) 数组，NaN 表示填充
+    anchored: 每行是否以账期起点 (cycle_start, 0) 作为锚点
+    已用量出现下降（换账期、充值、变更套餐）时，只使用最后一次下降之后的数据
+    """
+    valid = ~np.isnan(t) & ~np.isnan(used)
+    columns = np.arange(t.shape[1])
+    # 相邻有效样本间已用量下降的位置
+    drop = np.zeros_like(valid)
+    drop[:, 1:] = valid[:, 1:] & valid[:, :-1] & (used[:, 1:] < used[:, :-1])
+    last_drop = np.where(drop, columns, -1).max(axis=1)
+    valid &= columns >= last_drop[:, None]
+    # 中途重置过的序列不再以账期起点为锚点
+    anchored = anchored & (last_drop < 0)
+
+    # 以天为单位、以账期起点为原点，避免时间戳过大损失精度
+    days = np.where(valid, (t - cycle_start) / 86400, 0.0)
+    values = np.where(valid, used, 0.0)
+    n = valid.sum(axis=1) + anchored
+    sum_t = days.sum(axis=1)
+    sum_u = values.sum(axis=1)
+    sum_tt = (days * days).sum(axis=1)
+    sum_tu = (days * values).sum(axis=1)
+    denominator = n * sum_tt - sum_t * sum_t
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rate = np.where(
+            denominator > 0, (n * sum_tu - sum_t * sum_u) / denominator, np.nan
+        )
+    return rate, n
+
+
+def forecast_accounts(history, phonenums, now=None):
+    """
+    批量预测多个号码，返回 {phonenum: {指标名: 预测结果}}
+    指标名为 common、voice、balance 及各流量包名称，预测结果包含：
+    remaining 剩余量、rate 每日消耗、exhaust 预计耗尽时间（本账期内不会耗尽为 None）、
+    daily_allowance 剩余量按账期剩余天数平均的每日建议用量、samples 参与拟合的样本数
+    流量单位 KB，通话单位分钟，余额单位分
+    """
+    if np is None:
+        raise RuntimeError("用量预测需要安装 numpy")
+    now = now or datetime.now()
+    now_ts = now.timestamp()
+    cycle_start, cycle_end = cycle_bounds(now)
+    since = int(min(cycle_start, now_ts - BALANCE_LOOKBACK_DAYS * 86400))
+
+    keys, times, used, totals, anchored = [], [], [], [], []
+
+    def add(key, rows, used_field, total_field, anchor, start):
+        rows = [row for row in rows if row["time"] >= start]
+        # 没有数据或没有套餐总量（如未订购通话）的序列不做预测
+        if not rows or (anchor and rows[-1][total_field] <= 0):
+            return
+        keys.append(key)
+        times.append([row["time"] for row in rows])
+        used.append([row[used_field] for row in rows])
+        totals.append(rows[-1][total_field])
+        anchored.append(anchor)
+
+    # 读取历史只是文件 IO，拟合计算全部在下面的数组运算中完成
+    for phonenum in phonenums:
+        records = history.query(phonenum, since)
+        for name, used_field, total_field in USAGE_METRICS:
+            add((phonenum, name), records, used_field, total_field, True, cycle_start)
+        # 余额用负数表示“已用”，剩余量即余额本身
+        balance_rows = [
+            {"time": row["time"], "used": -row["balance"], "total": 0} for row in records
+        ]
+        add((phonenum, "balance"), balance_rows, "used", "total", False, since)
+        for item_name, rows in history.query_flow_items(phonenum, since).items():
+            add((phonenum, item_name), rows, "use", "total", True, cycle_start)
+
+    result = {phonenum: {} for phonenum in phonenums}
+    if not keys:
+        return result
+
+    t, u = _pad(times), _pad(used)
+    rate, samples = fit_rates(t, u, np.array(anchored), cycle_start)
+    last = (np.arange(len(keys)), (~np.isnan(u)).sum(axis=1) - 1)
+    last_time, last_used = t[last], u[last]
+    remaining = np.maximum(np.array(totals, dtype=float) - last_used, 0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        days_left = np.where(rate > 0, remaining / rate, np.inf)
+    # 剩余量是最后一条样本时的值，从该时刻起按速度外推
+    exhaust = last_time + days_left * 86400
+    # 用量类指标在账期结束时重置，账期内不会耗尽的不给出日期
+    resets = np.array(anchored)
+    never = ~np.isfinite(exhaust) | (resets & (exhaust >= cycle_end))
+    days_to_cycle_end = max((cycle_end - now_ts) / 86400, 1)
+    allowance = remaining / days_to_cycle_end
+
+    for i, (phonenum, name) in enumerate(keys):
+        result[phonenum][name] = {
+            "remaining": float(remaining[i]),
+            "rate": None if np.isnan(rate[i]) else float(rate[i]),
+            "exhaust": None if never[i] else datetime.fromtimestamp(exhaust[i]),
+            "daily_allowance": float(allowance[i]),
+            "samples": int(samples[i]),
+        }
+    return result
@@ -0,0 +1,398 @@
+#!/usr/bin/env python3
+# _*_ coding:utf-8 _*_
+# 套餐用量历史记录：每次 to_summary 的结果按号码追加到本地紧凑的时间序列文件
+#
+# 文件格式（每个序列一个 .hist 文件）由若干数据块组成：
+#   varint(first_ts) varint(last_ts) varint(count) varint(nfields) varint(len) zlib(payload)
+# payload 中每条记录为 zigzag varint 编码的差值：时间戳差值 + 各字段相对上一条的差值，
+# 每个数据块的第一条记录相对 0 编码，因此块可以独立解码。余额、已用流量等在账期内单调变化，
+# 差值大多为 0 或很小的数，再经 zlib 压缩后每条记录只占几个字节。
+
+import os
+import json
+import zlib
+import bisect
+import hashlib
+import tempfile
+import threading
+from datetime import datetime
+from telecom_class import SUMMARY_FIELDS, FLOW_ITEM_FIELDS
+
+# 默认降采样策略：(超过多少天, 每多少秒保留一条)，超过 7 天按小时、超过 90 天按天保留
+DEFAULT_DOWNSAMPLE = ((7, 3600), (90, 86400))
+
+
+def _write_varint(buf, value):
+    while value > 0x7F:
+        buf.append((value & 0x7F) | 0x80)
+        value >>= 7
+    buf.append(value)
+
+
+def _read_varint(data, pos):
+    result = shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        result |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return result, pos
+        shift += 7
+
+
+def _zigzag(value):
+    return value * 2 if value >= 0 else -value * 2 - 1
+
+
+def _unzigzag(value):
+    return value >> 1 if not value & 1 else -(value >> 1) - 1
+
+
+def encode_block(records, nfields):
+    """records: [(ts, (v1, v2, ...)), ...] -> 压缩后的数据块"""
+    payload = bytearray()
+    prev_ts, prev_values = 0, (0,) * nfields
+    for ts, values in records:
+        _write_varint(payload, _zigzag(ts - prev_ts))
+        for value, prev in zip(values, prev_values):
+            _write_varint(payload, _zigzag(value - prev))
+        prev_ts, prev_values = ts, values
+    body = zlib.compress(bytes(payload), 9)
+    header = bytearray()
+    for value in (records[0][0], records[-1][0], len(records), nfields, len(body)):
+        _write_varint(header, value)
+    return bytes(header) + body
+
+
+def decode_block(data, count, nfields):
+    payload = zlib.decompress(data)
+    records = []
+    pos, ts, values = 0, 0, [0] * nfields
+    for _ in range(count):
+        delta, pos = _read_varint(payload, pos)
+        ts += _unzigzag(delta)
+        for i in range(nfields):
+            delta, pos = _read_varint(payload, pos)
+            values[i] += _unzigzag(delta)
+        records.append((ts, tuple(values)))
+    return records
+
+
+def _journal_path(path):
+    return path + ".journal"
+
+
+def _apply_journal(path):
+    """
+    将尾块日志 varint(offset) + 块 写入序列文件的 offset 处并截断，完成后删除日志。
+    日志本身经临时文件 rename 写入，存在即完整，写入序列文件中断后可重复执行
+    """
+    journal = _journal_path(path)
+    try:
+        with open(journal, "rb") as f:
+            data = f.read()
+    except FileNotFoundError:
+        return
+    offset, pos = _read_varint(data, 0)
+    with open(path, "r+b" if os.path.exists(path) else "wb") as f:
+        f.seek(offset)
+        f.write(data[pos:])
+        f.truncate()
+    os.remove(journal)
+
+
+class _Series:
+    """单个序列文件的块索引：[(offset, end, first_ts, last_ts, count, nfields, body_offset)]"""
+
+    def __init__(self, path):
+        self.path = path
+        self.blocks = []
+        self.tail = None  # 最后一块解码后的记录，追加时免去重复读取解码
+        # 上次写尾块时中断：按日志补写
+        _apply_journal(path)
+        if not os.path.exists(path):
+            return
+        with open(path, "rb") as f:
+            data = f.read()
+        pos = 0
+        while pos < len(data):
+            offset = pos
+            try:
+                first_ts, pos = _read_varint(data, pos)
+                last_ts, pos = _read_varint(data, pos)
+                count, pos = _read_varint(data, pos)
+                nfields, pos = _read_varint(data, pos)
+                length, pos = _read_varint(data, pos)
+            except IndexError:
+                break
+            if pos + length > len(data):
+                # 末尾不完整的块（写入中断）直接丢弃
+                break
+            self.blocks.append(
+                (offset, pos + length, first_ts, last_ts, count, nfields, pos)
+            )
+            pos += length
+        if self.blocks and self.blocks[-1][1] != len(data):
+            with open(path, "r+b") as f:
+                f.truncate(self.blocks[-1][1])
+
+    @property
+    def last_ts(self):
+        return self.blocks[-1][3] if self.blocks else None
+
+    def read_block(self, block):
+        offset, end, _, _, count, nfields, body_offset = block
+        with open(self.path, "rb") as f:
+            f.seek(body_offset)
+            return decode_block(f.read(end - body_offset), count, nfields)
+
+    def read(self, start=None, end=None):
+        blocks = self.blocks
+        if start is not None:
+            # 按块的 last_ts 二分定位第一个可能包含 start 的块
+            i = bisect.bisect_left([b[3] for b in blocks], start)
+            blocks = blocks[i:]
+        records = []
+        for block in blocks:
+            if end is not None and block[2] > end:
+                break
+            for ts, values in self.read_block(block):
+                if (start is None or ts >= start) and (end is None or ts <= end):
+                    records.append((ts, values))
+        return records
+
+
+class HistoryStore:
+    """
+    按号码保存套餐用量历史：
+    - 主序列 {phonenum}.hist 记录 SUMMARY_FIELDS
+    - 每个流量包一个序列 {phonenum}.{名称摘要}.hist 记录 FLOW_ITEM_FIELDS，名称映射保存在 {phonenum}.items.json
+    - 追加只重写最后一个数据块，经尾块日志保证写入中断不会损坏已有历史；名称映射写入临时文件后 rename
+    - 同一次查询中同名的流量包合并（各字段求和）后记为一条
+    """
+
+    def __init__(self, directory, block_size=256):
+        self.directory = directory
+        self.block_size = block_size
+        self.series = {}
+        self.lock = threading.RLock()
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, phonenum, item_name=None):
+        if item_name is None:
+            return os.path.join(self.directory, f"{phonenum}.hist")
+        digest = hashlib.md5(item_name.encode("utf-8")).hexdigest()[:12]
+        return os.path.join(self.directory, f"{phonenum}.{digest}.hist")
+
+    def _catalog_path(self, phonenum):
+        return os.path.join(self.directory, f"{phonenum}.items.json")
+
+    def _load_catalog(self, phonenum):
+        try:
+            with open(self._catalog_path(phonenum), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return []
+
+    def _get_series(self, path):
+        if path not in self.series:
+            self.series[path] = _Series(path)
+        return self.series[path]
+
+    def _append(self, path, ts, values):
+        series = self._get_series(path)
+        if series.last_ts is not None and ts <= series.last_ts:
+            return False
+        record = (ts, tuple(values))
+        blocks = series.blocks
+        if blocks and blocks[-1][4] < self.block_size:
+            # 最后一块未满：解码后追加，重写最后一块
+            blocks = blocks[:-1]
+            records = (series.tail or series.read_block(series.blocks[-1])) + [record]
+            offset = series.blocks[-1][0]
+        else:
+            records = [record]
+            offset = blocks[-1][1] if blocks else 0
+        block = encode_block(records, len(values))
+        # 只重写尾块：先原子写入尾块日志，再写入序列文件并删除日志，中断时下次打开按日志补写
+        journal = bytearray()
+        _write_varint(journal, offset)
+        self._atomic_write(_journal_path(path), bytes(journal) + block)
+        _apply_journal(path)
+        series.blocks = blocks + [self._block_entry(block, offset, records, len(values))]
+        series.tail = records
+        return True
+
+    def _atomic_write(self, path, data):
+        """写入临时文件后 rename 替换，避免写一半导致文件损坏"""
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    @staticmethod
+    def _block_entry(block, offset, records, nfields):
+        pos = 0
+        for _ in range(5):
+            _, pos = _read_varint(block, pos)
+        return (
+            offset,
+            offset + len(block),
+            records[0][0],
+            records[-1][0],
+            len(records),
+            nfields,
+            offset + pos,
+        )
+
+    @staticmethod
+    def _timestamp(summary):
+        create_time = summary.get("createTime")
+        if create_time:
+            return int(datetime.strptime(create_time, "%Y-%m-%d %H:%M:%S").timestamp())
+        return int(datetime.now().timestamp())
+
+    def append_summary(self, summary):
+        """追加一条 to_summary 结果（含流量包明细），时间戳取 createTime"""
+        phonenum = summary["phonenum"]
+        ts = self._timestamp(summary)
+        with self.lock:
+            values = [int(summary.get(field) or 0) for field in SUMMARY_FIELDS]
+            if not self._append(self._path(phonenum), ts, values):
+                return False
+            # 同名流量包（如两个“国内通用流量”）合并，否则第二个因时间戳相同被丢弃
+            items = {}
+            for item in summary.get("flowItems") or []:
+                values = [int(item.get(field) or 0) for field in FLOW_ITEM_FIELDS]
+                if item["name"] in items:
+                    values = [a + b for a, b in zip(items[item["name"]], values)]
+                items[item["name"]] = values
+            catalog = self._load_catalog(phonenum)
+            new_names = [name for name in items if name not in catalog]
+            if new_names:
+                catalog.extend(new_names)
+                self._atomic_write(
+                    self._catalog_path(phonenum),
+                    json.dumps(catalog, ensure_ascii=False).encode("utf-8"),
+                )
+            for name, values in items.items():
+                self._append(self._path(phonenum, name), ts, values)
+            return True
+
+    def query(self, phonenum, start=None, end=None):
+        """按时间范围查询主序列，start/end 为 datetime 或时间戳，返回字典列表"""
+        start, end = self._to_ts(start), self._to_ts(end)
+        with self.lock:
+            records = self._get_series(self._path(phonenum)).read(start, end)
+        return [
+            {"time": ts, **dict(zip(SUMMARY_FIELDS, values))} for ts, values in records
+        ]
+
+    def query_flow_items(self, phonenum, start=None, end=None):
+        """按时间范围查询各流量包序列，返回 {流量包名称: [字典列表]}"""
+        start, end = self._to_ts(start), self._to_ts(end)
+        result = {}
+        with self.lock:
+            for name in self._load_catalog(phonenum):
+                series = self._get_series(self._path(phonenum, name))
+                result[name] = [
+                    {"time": ts, **dict(zip(FLOW_ITEM_FIELDS, values))}
+                    for ts, values in series.read(start, end)
+                ]
+        return result
+
+    def phonenums(self):
+        return sorted(
+            name[: -len(".hist")]
+            for name in os.listdir(self.directory)
+            if name.endswith(".hist") and name.count(".") == 1
+        )
+
+    @staticmethod
+    def _to_ts(value):
+        if isinstance(value, datetime):
+            return int(value.timestamp())
+        return value
+
+    def _rewrite(self, path, records, nfields):
+        series = self._get_series(path)
+        blocks, data = [], bytearray()
+        for i in range(0, len(records), self.block_size):
+            chunk = records[i : i + self.block_size]
+            block = encode_block(chunk, nfields)
+            blocks.append(self._block_entry(block, len(data), chunk, nfields))
+            data += block
+        self._atomic_write(path, bytes(data))
+        series.blocks = blocks
+        series.tail = None
+
+    def compact(self, retention_days=0, downsample=DEFAULT_DOWNSAMPLE, now=None):
+        """
+        清理超过 retention_days 天的数据（0 为永久保留），并对旧数据降采样：
+        超过 N 天的数据每个时间桶只保留最后一条（累计值取桶内最后一条即可代表该时段）。
+        返回删除的记录数。
+        """
+        now = int((now or datetime.now()).timestamp())
+        rules = sorted(downsample, reverse=True)
+        removed = 0
+        with self.lock:
+            for name in os.listdir(self.directory):
+                if not name.endswith(".hist"):
+                    continue
+                path = os.path.join(self.directory, name)
+                series = self._get_series(path)
+                if not series.blocks:
+                    continue
+                nfields = series.blocks[0][5]
+                records = series.read()
+                kept, last_bucket = [], None
+                for ts, values in reversed(records):
+                    age_days = (now - ts) / 86400
+                    if retention_days and age_days > retention_days:
+                        continue
+                    bucket_seconds = next(
+                        (seconds for days, seconds in rules if age_days > days), None
+                    )
+                    if bucket_seconds:
+                        bucket = (bucket_seconds, ts // bucket_seconds)
+                        if bucket == last_bucket:
+                            continue
+                        last_bucket = bucket
+                    else:
+                        last_bucket = None
+                    kept.append((ts, values))
+                kept.reverse()
+                if len(kept) != len(records):
+                    removed += len(records) - len(kept)
+                    if kept:
+                        self._rewrite(path, kept, nfields)
+                    else:
+                        os.remove(path)
+                        self.series.pop(path, None)
+        return removed
+
+    def maybe_compact(self, retention_days=0, min_interval=86400):
+        """距上次整理超过 min_interval 秒时执行 compact，返回删除的记录数"""
+        marker = os.path.join(self.directory, ".compacted")
+        try:
+            if datetime.now().timestamp() - os.path.getmtime(marker) < min_interval:
+                return 0
+        except FileNotFoundError:
+            pass
+        removed = self.compact(retention_days)
+        with open(marker, "w") as f:
+            f.write(datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
+        return removed
+
+    def get_stats(self):
+        files = [n for n in os.listdir(self.directory) if n.endswith(".hist")]
+        return {
+            "series": len(files),
+            "bytes": sum(
+                os.path.getsize(os.path.join(self.directory, n)) for n in files
+            ),
+        }
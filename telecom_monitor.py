@@ -2,12 +2,12 @@
 # -*- coding: utf-8 -*-
 # Repo: https://github.com/Cp0204/ChinaTelecomMonitor
 # ConfigFile: telecom_config.json
-# Modify: 2025-09-24（多账号版 + 固定批次推送）
+# Modify: 2025-09-24（多账号版 + 按渠道长度分批推送）
 # 此版本是AI修改，支持多账号查询及批次推送控制
 # 核心规则：
-# 1. 未设置 TELECOM_BATCH_SIZE 环境变量时，默认每次推送1个账号结果
-# 2. 设置环境变量时，仅支持值为1或2（值为2时正常推送，值≥3时报错提醒，需自行研究适配）
-# 3. 环境变量值无效时（如非数字），自动 fallback 到默认1个/批
+# 1. 各账号的报告按原顺序依推送渠道的消息长度上限合并，每个渠道用尽量少的消息推送（如 Bark 按 4KB 负载、Telegram 按 4096 字）
+# 2. 单个账号的报告超过渠道上限时按行拆分到多条消息
+# 3. 可选环境变量 TELECOM_BATCH_SIZE 限制每条消息最多包含的账号数，未设置或为 0 时不限制
 
 """
 任务名称
@@ -18,82 +18,245 @@ cron: 0 20 * * *
 
 import os
 import sys
-import json
+import argparse
 import datetime
 import calendar
+import threading
+from concurrent.futures import ThreadPoolExecutor
 
 # 兼容青龙
 try:
-    from telecom_class import Telecom
+    from telecom_class import Telecom, get_flow_stats, get_pool_stats, get_rate_limit_stats
 except:
     print("正在尝试自动安装依赖...")
     os.system("pip3 install pycryptodome requests &> /dev/null")
-    from telecom_class import Telecom
+    from telecom_class import Telecom, get_flow_stats, get_pool_stats, get_rate_limit_stats
+from telecom_store import open_store
+from telecom_history import HistoryStore
+from telecom_forecast import forecast_accounts
+from telecom_trace import Tracer
 
 
 CONFIG_DATA = {}
+CONFIG_LOCK = threading.RLock()  # 并发处理账号时保护 CONFIG_DATA 的读写
 NOTIFYS = []  # 存储所有账号的通知内容
-CONFIG_PATH = sys.argv[1] if len(sys.argv) > 1 else "telecom_config.json"
+SUPPRESSED = {}  # change 模式下未达到推送阈值的账号：号码 -> 摘要
+PUSH_BASELINES = {}  # change 模式下本次需要推送的账号：号码 -> 摘要，推送送达后才作为新的对比基准
+PUSH_RESULTS = {}  # 推送渠道 -> {号码: 是否送达}
+RUN_STATS = {"token_hits": 0, "logins": 0}  # 本次运行 token 命中与登录次数
+
+
+def parse_args(argv):
+    """
+    命令行：telecom_monitor.py [配置文件] [--profile [spans.jsonl]]
+    --profile 在结束时输出各阶段耗时统计，指定文件时同时将所有 span 写为 JSON Lines；
+    不认识的参数（如青龙等调度器附加的参数）忽略
+    """
+    parser = argparse.ArgumentParser(description="电信套餐用量监控")
+    parser.add_argument("config", nargs="?", default="telecom_config.json", help="配置文件")
+    parser.add_argument(
+        "--profile", nargs="?", const="", default=None, metavar="PATH", help="输出各阶段耗时统计"
+    )
+    args, _ = parser.parse_known_args(argv)
+    return args
+
+
+ARGS = parse_args(sys.argv[1:])
+PROFILE_PATH = ARGS.profile or ""
+TRACER = Tracer(enabled=ARGS.profile is not None)
+CONFIG_PATH = ARGS.config
 TELECOM_FLUX_PACKAGE = os.environ.get("TELECOM_FLUX_PACKAGE", "true").lower() != "false"
+# 状态存储：json（默认，即 CONFIG_PATH 文件）或 sqlite（TELECOM_DB_PATH，默认与配置文件同名的 .db）
+TELECOM_STORE = os.environ.get("TELECOM_STORE", "json").lower()
+TELECOM_DB_PATH = os.environ.get("TELECOM_DB_PATH")
+CONFIG_STORE = None
+# 用量历史：默认保存在配置文件同目录的 telecom_history 下，TELECOM_HISTORY=false 关闭
+TELECOM_HISTORY = os.environ.get("TELECOM_HISTORY", "true").lower() != "false"
+TELECOM_HISTORY_DIR = os.environ.get("TELECOM_HISTORY_DIR") or os.path.join(
+    os.path.dirname(os.path.abspath(CONFIG_PATH)), "telecom_history"
+)
+TELECOM_HISTORY_RETENTION_DAYS = 0
+retention_env = os.environ.get("TELECOM_HISTORY_RETENTION_DAYS")
+if retention_env:
+    try:
+        TELECOM_HISTORY_RETENTION_DAYS = max(0, int(retention_env))
+    except ValueError:
+        print(f"❌ 环境变量 TELECOM_HISTORY_RETENTION_DAYS={retention_env} 格式无效（需为非负整数），永久保留用量历史")
+HISTORY = None
+# 推送发件箱：推送失败的消息保存在 SQLite 中，下次运行开始时补发，TELECOM_OUTBOX=false 关闭
+TELECOM_OUTBOX = os.environ.get("TELECOM_OUTBOX", "true").lower() != "false"
+TELECOM_OUTBOX_PATH = os.environ.get("NOTIFY_OUTBOX") or os.path.join(
+    os.path.dirname(os.path.abspath(CONFIG_PATH)), "notify_outbox.db"
+)
+# 用量预测（需要 numpy 与用量历史），在通知末尾追加各号码的耗尽日期预测
+TELECOM_FORECAST = os.environ.get("TELECOM_FORECAST", "false").lower() == "true"
+
+# 推送模式：always（默认）每次推送所有账号；change 仅推送变化达到阈值的账号，其余合并为一行摘要
+TELECOM_PUSH_MODE = os.environ.get("TELECOM_PUSH_MODE", "always").lower()
+
+
+# 读取非负数环境变量，格式无效时使用默认值
+def env_threshold(name, default):
+    value = os.environ.get(name)
+    if not value:
+        return default
+    try:
+        threshold = float(value)
+        if threshold >= 0 and threshold != float("inf"):
+            return threshold
+    except ValueError:
+        pass
+    print(f"❌ 环境变量 {name}={value} 格式无效（需为非负数），使用默认值 {default}")
+    return default
+
+
+# change 模式的阈值：余额变化（元）、通用流量及单个流量包用量变化（MB）
+TELECOM_PUSH_BALANCE_DELTA = env_threshold("TELECOM_PUSH_BALANCE_DELTA", 1.0)
+TELECOM_PUSH_FLOW_DELTA = env_threshold("TELECOM_PUSH_FLOW_DELTA", 1024.0)
+
+# 每条消息最多包含的账号数，0 为不限制（仅受各推送渠道的长度上限约束）
+TELECOM_BATCH_SIZE = 0
+batch_env = os.environ.get("TELECOM_BATCH_SIZE")
+if batch_env:
+    try:
+        TELECOM_BATCH_SIZE = max(0, int(batch_env))
+    except ValueError:
+        print(f"❌ 环境变量 TELECOM_BATCH_SIZE={batch_env} 格式无效（需为非负整数），按推送渠道长度上限自动分批")
+
+# 并发处理的账号数，默认1（逐个处理）
+TELECOM_CONCURRENCY = 1
+concurrency_env = os.environ.get("TELECOM_CONCURRENCY")
+if concurrency_env is not None:
+    try:
+        TELECOM_CONCURRENCY = max(1, int(concurrency_env))
+    except ValueError:
+        print(f"❌ 环境变量 TELECOM_CONCURRENCY={concurrency_env} 格式无效（需为正整数），自动 fallback 到逐个处理")
+
+
+# 加载通知模块，配置了 push_config 时覆盖青龙环境通知设置
+def load_notify():
+    import notify
+
+    if CONFIG_DATA.get("push_config"):
+        notify.push_config.update(CONFIG_DATA["push_config"])
+        notify.push_config["CONSOLE"] = notify.push_config.get("CONSOLE", True)
+    return notify
 
-# 初始化批次大小：优先读取环境变量，按规则处理
-TELECOM_BATCH_SIZE = 1  # 默认值：每次1个账号
-batch_env = os.environ.get("TELECOM_BATCH_SIZE")  # 读取环境变量
 
-if batch_env is not None:
+# 发送多段通知，各渠道按自身长度上限顺序合并后用尽量少的消息推送
+# owners[i] 为 parts[i] 所属的号码，用于按账号记录是否送达
+def send_notify_many(title, parts, owners=()):
     try:
-        batch_val = int(batch_env)
-        if batch_val == 1:
-            TELECOM_BATCH_SIZE = 1
-            print(f"✅ 检测到环境变量 TELECOM_BATCH_SIZE={batch_val}，每次推送1个账号")
-        elif batch_val == 2:
-            TELECOM_BATCH_SIZE = 2
-            print(f"✅ 检测到环境变量 TELECOM_BATCH_SIZE={batch_val}，每次推送2个账号（已知正常）")
-        else:
-            # 值≥3时，强制用默认1个/批，并给出报错提醒
-            TELECOM_BATCH_SIZE = 1
-            print(f"❌ 检测到环境变量 TELECOM_BATCH_SIZE={batch_val}，超出支持范围（仅支持1/2）")
-            print(f"❌ 已知：值≥3（如4）会导致Bark推送报错，当前自动 fallback 到默认1个/批")
-            print(f"❌ 若需推送更多账号，需自行研究适配（如简化推送内容、拆分更多批次）")
-    except:
-        # 环境变量非数字时，用默认值
-        TELECOM_BATCH_SIZE = 1
-        print(f"❌ 环境变量 TELECOM_BATCH_SIZE={batch_env} 格式无效（需为数字1/2），自动 fallback 到默认1个/批")
-else:
-    print(f"ℹ️ 未检测到 TELECOM_BATCH_SIZE 环境变量，默认每次推送1个账号")
-
-
-# 发送通知消息
-def send_notify(title, body):
+        load_notify().send_many(
+            title,
+            parts,
+            wait=False,
+            max_count=TELECOM_BATCH_SIZE,
+            on_result=lambda channel, indices, ok: record_push_result(owners, channel, indices, ok),
+        )
+    except Exception as e:
+        print(f"发送通知消息失败：{str(e)}")
+
+
+# 记录一条推送消息的结果：渠道 -> {号码: 该号码的报告是否全部送达}，控制台不计入
+def record_push_result(owners, channel, indices, ok):
+    if channel == "console":
+        return
+    with CONFIG_LOCK:
+        results = PUSH_RESULTS.setdefault(channel, {})
+        for index in indices:
+            phonenum = owners[index] if index < len(owners) else None
+            if phonenum:
+                results[phonenum] = results.get(phonenum, True) and ok
+
+
+# 至少有一个推送渠道（不含控制台）送达了其全部报告的号码，没有配置其他渠道时返回 None
+def delivered_phonenums():
     try:
-        # 导入通知模块
         import notify
 
-        # 如未配置 push_config 则使用青龙环境通知设置
-        if CONFIG_DATA.get("push_config"):
-            notify.push_config.update(CONFIG_DATA["push_config"])
-            notify.push_config["CONSOLE"] = notify.push_config.get("CONSOLE", True)
-        notify.send(title, body)
+        if not any(func.__name__ != "console" for func in notify.active_channels()):
+            return None
     except Exception as e:
-        print(f"发送通知消息失败：{str(e)}")
+        print(f"获取推送渠道失败：{str(e)}")
+    with CONFIG_LOCK:
+        return {
+            phonenum
+            for results in PUSH_RESULTS.values()
+            for phonenum, ok in results.items()
+            if ok
+        }
+
+
+# change 模式：账号的报告送达（或已写入发件箱）后才更新其对比基准，未送达的账号下次运行仍与上次送达的数据对比
+def update_push_baselines(delivered):
+    if not PUSH_BASELINES:
+        return
+    with CONFIG_LOCK:
+        kept = []
+        for phonenum, summary in PUSH_BASELINES.items():
+            if delivered is None or phonenum in delivered:
+                CONFIG_DATA[f"pushSummary_{phonenum}"] = summary
+            else:
+                kept.append(phonenum)
+    if kept:
+        print(f"推送未送达，{len(kept)}个账号的对比基准保持不变：{'、'.join(kept)}")
+
+
+# 打开推送发件箱并补发上次运行未送达的通知
+def drain_outbox():
+    try:
+        notify = load_notify()
+        if notify.outbox is None:
+            notify.open_outbox(TELECOM_OUTBOX_PATH)
+        futures = notify.drain_outbox()
+        if futures:
+            print(f"📮 补发上次未送达的通知{len(futures)}条")
+    except Exception as e:
+        print(f"补发通知失败：{str(e)}")
+
+
+# 等待所有通知发送完成并输出各渠道耗时
+def flush_notify():
+    try:
+        import notify
 
+        notify.flush()
+        for channel, stats in notify.get_stats().items():
+            print(
+                f"📨 {channel}: 成功{stats['sent']}次，失败{stats['failed']}次，"
+                f"平均{stats['latency_avg']:.2f}秒，最长{stats['latency_max']:.2f}秒"
+            )
+        if notify.outbox is not None:
+            pending = notify.outbox.get_stats()["pending"]
+            if pending:
+                print(f"📮 发件箱中有{pending}条通知待重试")
+    except Exception as e:
+        print(f"等待通知发送失败：{str(e)}")
 
-# 添加消息（仅存储，不立即发送）
-def add_notify(text):
-    global NOTIFYS
-    NOTIFYS.append(text)
+
+# 添加消息（仅存储，不立即发送），notifys 为单个账号的消息列表，未指定时直接写入 NOTIFYS
+def add_notify(text, notifys=None):
+    if notifys is None:
+        notifys = NOTIFYS
+    notifys.append(text)
     print("📢", text)
     return text
 
 
-def usage_status_icon(used, total):
-    """流量使用状态图标"""
+def add_run_stat(key, count=1):
+    with CONFIG_LOCK:
+        RUN_STATS[key] = RUN_STATS.get(key, 0) + count
+
+
+def usage_status_icon(used, total, today=None):
+    """流量使用状态图标，today 为计算时间进度的日期，默认当天"""
     if total <= 0:
         return "⚫"  # 无流量
     if used >= total:
         return "🔴"  # 超流量
     # 未超提示进度
-    today = datetime.date.today()
+    today = today or datetime.date.today()
     _, days_in_month = calendar.monthrange(today.year, today.month)
     time_progress = today.day / days_in_month
     usage_progress = used / total
@@ -105,6 +268,37 @@ def usage_status_icon(used, total):
         return "🟢"  # 均匀使用范围内
 
 
+def format_forecast(phonenum, forecast):
+    """格式化单个号码的用量预测，只列出本账期内会耗尽的指标及每日建议用量"""
+    names = {"common": "通用流量", "voice": "通话", "balance": "余额"}
+
+    def fmt(name, value):
+        if name == "voice":
+            return f"{value:.0f}分钟"
+        if name == "balance":
+            return f"{value / 100:.2f}元"
+        return f"{value / 1024 / 1024:.2f}GB"
+
+    lines = []
+    for name, item in forecast.items():
+        if item["exhaust"] is None or not item["rate"]:
+            continue
+        if item["remaining"] <= 0:
+            lines.append(f"  - {names.get(name, name)}：已用尽")
+            continue
+        # 余额可能在账期之后才耗尽，显示完整日期
+        exhaust = item["exhaust"].strftime(
+            "%Y-%m-%d" if name == "balance" else "%m-%d %H:%M"
+        )
+        line = f"  - {names.get(name, name)}：预计{exhaust}用尽，日均{fmt(name, item['rate'])}"
+        if name != "balance":
+            line += f"，建议每日≤{fmt(name, item['daily_allowance'])}"
+        lines.append(line)
+    if not lines:
+        return f"📈 {phonenum}：本账期用量充足"
+    return f"📈 {phonenum}：\n" + "\n".join(lines)
+
+
 def compare_and_format_diff(current_summary, last_summary):
     """
     计算本次数据与上次数据的差值，并返回格式化后的短字符串。
@@ -160,22 +354,108 @@ def compare_and_format_diff(current_summary, last_summary):
     return fee_diff_str, data_diff_str
 
 
-def process_account(phonenum, password):
-    """处理单个账号的查询和通知"""
+def summary_date(summary):
+    try:
+        return datetime.datetime.strptime(summary["createTime"], "%Y-%m-%d %H:%M:%S").date()
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+def push_reasons(current, baseline):
+    """
+    change 模式下对比本次数据与上次推送时的数据，返回需要推送的原因列表，为空时不推送。
+    与上次推送（而不是上次查询）对比，多次小幅变化累计达到阈值时仍会推送。
+    """
+    if not baseline:
+        return ["首次查询"]
+    reasons = []
+    flow_delta = TELECOM_PUSH_FLOW_DELTA * 1024  # KB
+
+    balance_delta = (current.get("balance", 0) - baseline.get("balance", 0)) / 100
+    if abs(balance_delta) >= TELECOM_PUSH_BALANCE_DELTA:
+        reasons.append(f"余额{'↑' if balance_delta > 0 else '↓'}{abs(balance_delta):.2f}元")
+
+    common_delta = current.get("commonUse", 0) - baseline.get("commonUse", 0)
+    if abs(common_delta) >= flow_delta:
+        reasons.append(f"通用流量{'+' if common_delta > 0 else '-'}{abs(common_delta) / 1024:.0f}MB")
+
+    last_items = {item["name"]: item for item in baseline.get("flowItems") or []}
+    items = {item["name"]: item for item in current.get("flowItems") or []}
+    added = [name for name in items if name not in last_items]
+    removed = [name for name in last_items if name not in items]
+    if added:
+        reasons.append(f"新增流量包：{'、'.join(added)}")
+    if removed:
+        reasons.append(f"流量包失效：{'、'.join(removed)}")
+    for name, item in items.items():
+        if name in last_items and abs(item["use"] - last_items[name]["use"]) >= flow_delta:
+            reasons.append(f"{name}用量{(item['use'] - last_items[name]['use']) / 1024:+.0f}MB")
+
+    # 各自按查询当天的时间进度计算状态颜色
+    last_icon = usage_status_icon(
+        baseline.get("commonUse", 0), baseline.get("commonTotal", 0), summary_date(baseline)
+    )
+    icon = usage_status_icon(
+        current.get("commonUse", 0), current.get("commonTotal", 0), summary_date(current)
+    )
+    if icon != last_icon:
+        reasons.append(f"状态{last_icon}→{icon}")
+    return reasons
+
+
+def format_digest_item(telecom, summary):
+    """未推送账号的摘要：号码 余额/通用流量剩余"""
+    common_left = max(summary["commonTotal"] - summary["commonUse"], 0)
+    return (
+        f"{summary['phonenum']} {round(summary['balance'] / 100, 2)}元"
+        f"/{telecom.convert_flow(common_left, 'GB', 2)}GB"
+    )
+
+
+def process_account(phonenum, password, notifys=None):
+    """处理单个账号的查询和通知，notifys 用于收集该账号的通知内容"""
     # 为每个账号创建独立的Telecom实例
     telecom = Telecom()
     
     # 获取上次保存的 summary 数据
-    last_summary = CONFIG_DATA.get(f"summary_{phonenum}") # 读取上次数据
+    with CONFIG_LOCK:
+        last_summary = CONFIG_DATA.get(f"summary_{phonenum}") # 读取上次数据
+        saved_login_info = CONFIG_DATA.get(f"login_info_{phonenum}")
     
-    # 登录失败次数记录，按号码区分
-    login_fail_key = f"loginFailTime_{phonenum}"
-    login_fail_time = CONFIG_DATA.get(login_fail_key, 0)
+        # 登录失败次数记录，按号码区分
+        login_fail_key = f"loginFailTime_{phonenum}"
+        login_fail_time = CONFIG_DATA.get(login_fail_key, 0)
+
+    # 优先使用已保存的 token 查询，没有拿到 responseData（X201 过期或其他错误）时都重新登录
+    important_data = None
+    if (
+        saved_login_info
+        and saved_login_info.get("token")
+        and saved_login_info.get("password") == password
+    ):
+        telecom.set_login_info(saved_login_info)
+        with TRACER.span("qry_important_data", phonenum):
+            important_data = telecom.qry_important_data()
+        if important_data.get("responseData"):
+            print(f"使用已保存的 token 获取信息成功：{phonenum}")
+            add_run_stat("token_hits")
+        else:
+            code = (important_data.get("headerInfos") or {}).get("code")
+            if code == "X201":
+                print(f"已保存的 token 已过期：{phonenum}")
+            else:
+                print(f"使用已保存的 token 获取信息失败（{code}），重新登录：{phonenum}")
+            important_data = None
     
     # 尝试登录
-    if login_fail_time < 5:
+    if important_data is None and login_fail_time >= 5:
+        add_notify(f"登录受限：{phonenum}已连续失败{login_fail_time}次，为避免风控暂不执行", notifys)
+        return False
+    if important_data is None:
         print(f"登录账号：{phonenum}")
-        data = telecom.do_login(phonenum, password)
+        add_run_stat("logins")
+        with TRACER.span("login", phonenum):
+            data = telecom.do_login(phonenum, password)
         if data.get("responseData", {}).get("resultCode") == "0000":
             print(f"登录成功：{phonenum}")
             login_info = data["responseData"]["data"]["loginSuccessResult"]
@@ -185,45 +465,54 @@ def process_account(phonenum, password):
                 "%Y-%m-%d %H:%M:%S"
             )
             # 按号码保存登录信息
-            CONFIG_DATA[f"login_info_{phonenum}"] = login_info
-            CONFIG_DATA[login_fail_key] = 0
+            with CONFIG_LOCK:
+                CONFIG_DATA[f"login_info_{phonenum}"] = login_info
+                CONFIG_DATA[login_fail_key] = 0
             telecom.set_login_info(login_info)
         else:
             login_fail_time += 1
-            CONFIG_DATA[login_fail_key] = login_fail_time
-            update_config()
-            add_notify(f"登录失败：{phonenum}，已连续失败{login_fail_time}次")
+            with CONFIG_LOCK:
+                CONFIG_DATA[login_fail_key] = login_fail_time
+                update_config()
+            add_notify(f"登录失败：{phonenum}，已连续失败{login_fail_time}次", notifys)
             return False
-    else:
-        add_notify(f"登录受限：{phonenum}已连续失败{login_fail_time}次，为避免风控暂不执行")
-        return False
 
     # 获取主要信息
-    important_data = telecom.qry_important_data()
-    if important_data.get("responseData"):
-        print(f"获取信息成功：{phonenum}")
-    elif important_data["headerInfos"]["code"] == "X201":
-        print(f"信息获取失败，尝试重新登录：{phonenum}")
-        # 重新登录
-        data = telecom.do_login(phonenum, password)
-        if data.get("responseData", {}).get("resultCode") == "0000":
-            login_info = data["responseData"]["data"]["loginSuccessResult"]
-            login_info["phonenum"] = phonenum
-            login_info["password"] = password
-            CONFIG_DATA[f"login_info_{phonenum}"] = login_info
-            telecom.set_login_info(login_info)
+    if important_data is None:
+        with TRACER.span("qry_important_data", phonenum):
             important_data = telecom.qry_important_data()
-        else:
-            add_notify(f"重新登录失败，无法获取信息：{phonenum}")
-            return False
+        if important_data.get("responseData"):
+            print(f"获取信息成功：{phonenum}")
+        elif important_data["headerInfos"]["code"] == "X201":
+            print(f"信息获取失败，尝试重新登录：{phonenum}")
+            # 重新登录
+            add_run_stat("logins")
+            with TRACER.span("login", phonenum):
+                data = telecom.do_login(phonenum, password)
+            if data.get("responseData", {}).get("resultCode") == "0000":
+                login_info = data["responseData"]["data"]["loginSuccessResult"]
+                login_info["phonenum"] = phonenum
+                login_info["password"] = password
+                login_info["createTime"] = datetime.datetime.now().strftime(
+                    "%Y-%m-%d %H:%M:%S"
+                )
+                with CONFIG_LOCK:
+                    CONFIG_DATA[f"login_info_{phonenum}"] = login_info
+                telecom.set_login_info(login_info)
+                with TRACER.span("qry_important_data", phonenum):
+                    important_data = telecom.qry_important_data()
+            else:
+                add_notify(f"重新登录失败，无法获取信息：{phonenum}", notifys)
+                return False
 
     # 处理信息
     try:
-        summary = telecom.to_summary(important_data["responseData"]["data"])
+        with TRACER.span("to_summary", phonenum):
+            summary = telecom.to_summary(important_data["responseData"]["data"])
         # 更新本次数据的创建时间
         summary["createTime"] = datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S') 
     except Exception as e:
-        add_notify(f"处理数据出错：{phonenum} - {str(e)}")
+        add_notify(f"处理数据出错：{phonenum} - {str(e)}", notifys)
         return False
         
     if summary:
@@ -238,14 +527,36 @@ def process_account(phonenum, password):
             fee_diff_str, data_diff_str = compare_and_format_diff(summary, last_summary)
             
         # 【新增逻辑 2】：保存本次summary数据为下次的对比基础
-        CONFIG_DATA[f"summary_{phonenum}"] = summary
+        with CONFIG_LOCK:
+            CONFIG_DATA[f"summary_{phonenum}"] = summary
+        if HISTORY:
+            try:
+                with TRACER.span("history", phonenum):
+                    HISTORY.append_summary(summary)
+            except Exception as e:
+                print(f"保存用量历史失败：{phonenum} - {e}")
         # =======================================================
 
+    # change 模式：与上次推送时的数据对比，未达到阈值时只记入摘要，也不再查询流量包明细
+    reasons = []
+    if TELECOM_PUSH_MODE == "change":
+        with CONFIG_LOCK:
+            baseline = CONFIG_DATA.get(f"pushSummary_{phonenum}")
+        reasons = push_reasons(summary, baseline)
+        if not reasons:
+            print(f"无明显变化，不推送：{phonenum}")
+            with CONFIG_LOCK:
+                SUPPRESSED[phonenum] = format_digest_item(telecom, summary)
+            return True
+        with CONFIG_LOCK:
+            PUSH_BASELINES[phonenum] = summary
+
 
     # 获取流量包明细
     flux_package_str = ""
     if TELECOM_FLUX_PACKAGE:
-        user_flux_package = telecom.user_flux_package()
+        with TRACER.span("user_flux_package", phonenum):
+            user_flux_package = telecom.user_flux_package()
         if user_flux_package and user_flux_package.get("responseData"):
             print(f"获取流量包明细：{phonenum}")
             packages = user_flux_package["responseData"]["data"]["productOFFRatable"][
@@ -265,54 +576,76 @@ def process_account(phonenum, password):
                     else:
                         flux_package_str += f"""🔹[{product['title']}]{product['leftTitle']}{product['leftHighlight']}{product['rightCommon']}\n"""
 
-    # 流量字符串
-    common_str = (
-        f"{telecom.convert_flow(summary['commonUse'],'GB',2)} / {telecom.convert_flow(summary['commonTotal'],'GB',2)} GB"
-        if summary["flowOver"] == 0
-        else f"-{telecom.convert_flow(summary['flowOver'],'GB',2)} / {telecom.convert_flow(summary['commonTotal'],'GB',2)} GB"
-    )
-    common_str = (
-        f"{common_str} {usage_status_icon(summary['commonUse'],summary['commonTotal'])}"
-    )
-    special_str = (
-        f"{telecom.convert_flow(summary['specialUse'], 'GB', 2)} / {telecom.convert_flow(summary['specialTotal'], 'GB', 2)} GB"
-        if summary['specialTotal'] > 0
-        else ""
-    )
-
-    # 基本信息
-    # 【关键修改】：将 fee_diff_str 和 data_diff_str 插入到通知中
-    notify_str = f"""
-📱 手机：{summary['phonenum']}
+    with TRACER.span("render", phonenum):
+        # 流量字符串
+        common_str = (
+            f"{telecom.convert_flow(summary['commonUse'],'GB',2)} / {telecom.convert_flow(summary['commonTotal'],'GB',2)} GB"
+            if summary["flowOver"] == 0
+            else f"-{telecom.convert_flow(summary['flowOver'],'GB',2)} / {telecom.convert_flow(summary['commonTotal'],'GB',2)} GB"
+        )
+        common_str = (
+            f"{common_str} {usage_status_icon(summary['commonUse'],summary['commonTotal'])}"
+        )
+        special_str = (
+            f"{telecom.convert_flow(summary['specialUse'], 'GB', 2)} / {telecom.convert_flow(summary['specialTotal'], 'GB', 2)} GB"
+            if summary['specialTotal'] > 0
+            else ""
+        )
+
+        # 基本信息
+        # 【关键修改】：将 fee_diff_str 和 data_diff_str 插入到通知中
+        notify_str = f"""
+📱 手机：{summary['phonenum']}{f"{chr(10)}🔔 变化：{'，'.join(reasons)}" if reasons else ''}
 💰 余额：{round(summary['balance']/100,2)}元{fee_diff_str}
 📞 通话：{summary['voiceUsage']}{f" / {summary['voiceTotal']}" if summary['voiceTotal']>0 else ''} 分钟
 🌐 总流量
   - 通用：{common_str}{data_diff_str}{f'{chr(10)}  - 专用：{special_str}' if special_str else ''}"""
 
-    # 流量包明细
-    if TELECOM_FLUX_PACKAGE and flux_package_str:
-        notify_str += f"\n\n【流量包明细】\n\n{flux_package_str.strip()}"
+        # 流量包明细
+        if TELECOM_FLUX_PACKAGE and flux_package_str:
+            notify_str += f"\n\n【流量包明细】\n\n{flux_package_str.strip()}"
 
-    notify_str += f"\n\n查询时间：{summary['createTime']}"
-    notify_str += "\n" + "="*30  # 分隔不同账号的信息
+        notify_str += f"\n\n查询时间：{summary['createTime']}"
+        notify_str += "\n" + "="*30  # 分隔不同账号的信息
 
-    add_notify(notify_str.strip())
+    add_notify(notify_str.strip(), notifys)
     return True
 
 
+def run_account(account):
+    """在工作线程中处理单个账号，返回该账号的通知列表"""
+    phonenum, password = account
+    notifys = []
+    print(f"\n===== 开始处理账号：{phonenum} =====")
+    with TRACER.span("account", phonenum):
+        process_account(phonenum, password, notifys)
+    return notifys
+
+
 def main():
-    global CONFIG_DATA, NOTIFYS
+    global CONFIG_DATA, CONFIG_STORE, HISTORY, NOTIFYS
     start_time = datetime.datetime.now()
     print(f"===============程序开始===============")
     print(f"⏰ 执行时间: {start_time.strftime('%Y-%m-%d %H:%M:%S')}")
-    print(f"📦 当前推送批次大小: {TELECOM_BATCH_SIZE}个账号/次")
+    print(f"📦 每条消息账号数上限: {TELECOM_BATCH_SIZE or '不限制'}")
+    print(f"🧵 账号并发数: {TELECOM_CONCURRENCY}")
+    if TELECOM_PUSH_MODE == "change":
+        print(
+            f"🔔 仅推送变化: 余额±{TELECOM_PUSH_BALANCE_DELTA}元，"
+            f"流量±{TELECOM_PUSH_FLOW_DELTA}MB，流量包增减或状态变化"
+        )
     print()
     
     # 读取配置
-    if os.path.exists(CONFIG_PATH):
-        print(f"⚙️ 正从 {CONFIG_PATH} 文件中读取配置")
-        with open(CONFIG_PATH, "r", encoding="utf-8") as file:
-            CONFIG_DATA = json.load(file)
+    CONFIG_STORE = open_store(CONFIG_PATH, TELECOM_STORE, TELECOM_DB_PATH)
+    if CONFIG_STORE.exists():
+        print(f"⚙️ 正从 {CONFIG_STORE.path} 中读取配置")
+        CONFIG_DATA = CONFIG_STORE.load()
+    if TELECOM_HISTORY:
+        HISTORY = HistoryStore(TELECOM_HISTORY_DIR)
+    if TELECOM_OUTBOX:
+        with TRACER.span("drain_outbox"):
+            drain_outbox()
     
     # 获取多账号信息
     telecom_users = os.environ.get("TELECOM_USER", "")
@@ -337,32 +670,82 @@ def main():
     
     print(f"共发现{len(valid_accounts)}个有效账号，开始处理...")
     
-    # 逐个处理账号
-    for phonenum, password in valid_accounts:
-        print(f"\n===== 开始处理账号：{phonenum} =====")
-        process_account(phonenum, password)
+    # 处理账号，并发时仍按输入顺序汇总通知
+    if TELECOM_CONCURRENCY > 1 and len(valid_accounts) > 1:
+        workers = min(TELECOM_CONCURRENCY, len(valid_accounts))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(run_account, valid_accounts))
+    else:
+        results = [run_account(account) for account in valid_accounts]
+    # owners[i] 为 NOTIFYS[i] 所属的号码，账号格式错误等全局提示为 None
+    owners = [None] * len(NOTIFYS)
+    for (phonenum, _), notifys in zip(valid_accounts, results):
+        NOTIFYS.extend(notifys)
+        owners.extend([phonenum] * len(notifys))
+    # change 模式下只有账号报告或错误提示需要推送时才发送，摘要与预测随之附带
+    has_changes = bool(NOTIFYS) or TELECOM_PUSH_MODE != "change"
+    if SUPPRESSED:
+        digest = [SUPPRESSED[p] for p, _ in valid_accounts if p in SUPPRESSED]
+        add_notify(f"🔕 无明显变化{len(digest)}个：{'；'.join(digest)}")
+
+    # 所有账号处理完后批量预测
+    if TELECOM_FORECAST and HISTORY:
+        try:
+            phonenums = [phonenum for phonenum, _ in valid_accounts]
+            with TRACER.span("forecast"):
+                forecasts = forecast_accounts(HISTORY, phonenums)
+            add_notify(
+                "【用量预测】\n"
+                + "\n".join(format_forecast(p, forecasts[p]) for p in phonenums)
+            )
+        except Exception as e:
+            print(f"用量预测失败：{e}")
     
-    # 按批次发送通知
-    if NOTIFYS:
-        total_batches = (len(NOTIFYS) + TELECOM_BATCH_SIZE - 1) // TELECOM_BATCH_SIZE
+    # 按各推送渠道的长度上限分批发送通知
+    if NOTIFYS and not has_changes:
+        print("\n所有账号均无明显变化，本次不推送")
+    elif NOTIFYS:
         print(f"\n===============推送通知===============")
-        print(f"共{len(NOTIFYS)}条信息，分{total_batches}批推送（每批{TELECOM_BATCH_SIZE}个账号）")
-        
-        for i in range(total_batches):
-            # 计算当前批次的起始和结束索引
-            start_idx = i * TELECOM_BATCH_SIZE
-            end_idx = start_idx + TELECOM_BATCH_SIZE
-            batch_notifies = NOTIFYS[start_idx:end_idx]
-            
-            # 构建批次标题和内容（包含批次信息，方便区分）
-            batch_title = f"【电信套餐监控】第{i+1}/{total_batches}批"
-            batch_body = "\n".join(batch_notifies)
-            
-            # 发送当前批次
-            print(f"正在发送第{i+1}批通知...")
-            send_notify(batch_title, batch_body)
+        print(f"共{len(NOTIFYS)}条信息，按各渠道长度上限分批推送")
+        with TRACER.span("notify"):
+            send_notify_many("【电信套餐监控】", NOTIFYS, owners)
+            flush_notify()
+        update_push_baselines(delivered_phonenums())
     
-    update_config()
+    with TRACER.span("save_config"):
+        update_config()
+    if HISTORY:
+        try:
+            with TRACER.span("history_compact"):
+                HISTORY.maybe_compact(TELECOM_HISTORY_RETENTION_DAYS)
+        except Exception as e:
+            print(f"整理用量历史失败：{e}")
+    print(f"\n🔑 Token 命中{RUN_STATS['token_hits']}次，登录{RUN_STATS['logins']}次")
+    pool_stats = get_pool_stats()
+    print(
+        f"\n🔗 连接复用: 请求{pool_stats['requests']}次，新建连接{pool_stats['handshakes']}次"
+        f"（会话复用{pool_stats['resumed']}次），节省完整握手{pool_stats['handshakes_saved']}次"
+    )
+    rate_stats = get_rate_limit_stats()["TOTAL"]
+    if rate_stats["waited"]:
+        print(
+            f"🚦 限流排队: {rate_stats['waited']}/{rate_stats['acquired']}次请求，"
+            f"累计等待{rate_stats['wait_total']:.2f}秒，最长{rate_stats['wait_max']:.2f}秒"
+        )
+    flow_stats = get_flow_stats()
+    if flow_stats.get("unmatched") or flow_stats.get("errors"):
+        print(
+            f"🧩 流量包识别: 未识别{flow_stats.get('unmatched', 0)}个，解析失败{flow_stats.get('errors', 0)}个"
+            f"（{'、'.join(dict.fromkeys(flow_stats['recent_unmatched']))}）"
+        )
+    if TRACER.enabled:
+        print(f"\n===============阶段耗时===============")
+        print(TRACER.report())
+        if PROFILE_PATH:
+            try:
+                print(f"📝 已将{TRACER.write_jsonl(PROFILE_PATH)}个 span 写入 {PROFILE_PATH}")
+            except OSError as e:
+                print(f"写入 span 失败：{e}")
     print(f"\n===============程序结束===============")
     print(f"⏰ 结束时间: {datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
     print(f"⏱️  运行时长: {datetime.datetime.now() - start_time}")
@@ -370,8 +753,8 @@ def main():
 
 def update_config():
     # 更新配置
-    with open(CONFIG_PATH, "w", encoding="utf-8") as file:
-        json.dump(CONFIG_DATA, file, ensure_ascii=False, indent=2)
+    with CONFIG_LOCK:
+        CONFIG_STORE.save(CONFIG_DATA)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+# _*_ coding:utf-8 _*_
+# 配置/状态存储：默认 JSON 整文件读写，可选 SQLite（按账号分行存储，只写入有变化的行）
+# 迁移：python3 telecom_store.py telecom_config.json telecom_config.db
+
+import os
+import re
+import sys
+import json
+import sqlite3
+import threading
+from contextlib import closing
+
+# login_info_13800000000 / summary_13800000000 / loginFailTime_13800000000
+ACCOUNT_KEY_RE = re.compile(r"^(.+)_(\d{11})$")
+
+
+def split_key(key):
+    """将配置键拆分为 (账号, 字段)，非账号相关的键账号为空字符串"""
+    match = ACCOUNT_KEY_RE.match(key)
+    if match:
+        return match.group(2), match.group(1)
+    return "", key
+
+
+def join_key(account, field):
+    return f"{field}_{account}" if account else field
+
+
+class JsonConfigStore:
+    """整文件 JSON 存储，与原有 telecom_config.json 格式一致"""
+
+    def __init__(self, path):
+        self.path = path
+
+    def exists(self):
+        return os.path.exists(self.path)
+
+    def load(self):
+        if not self.exists():
+            return {}
+        with open(self.path, "r", encoding="utf-8") as file:
+            return json.load(file)
+
+    def save(self, data):
+        with open(self.path, "w", encoding="utf-8") as file:
+            json.dump(data, file, ensure_ascii=False, indent=2)
+
+
+class SqliteConfigStore:
+    """
+    SQLite 存储（WAL 模式），每个账号的每个字段一行。
+    save 只对比并写入有变化的行，在一个事务内完成，写入中断不会损坏其他账号的数据。
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.snapshot = {}
+        self.lock = threading.Lock()
+        # sqlite3 连接的 with 只提交事务、不关闭连接，需要 closing 显式关闭
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                """CREATE TABLE IF NOT EXISTS config (
+                    account TEXT NOT NULL,
+                    field TEXT NOT NULL,
+                    value TEXT NOT NULL,
+                    PRIMARY KEY (account, field)
+                ) WITHOUT ROWID"""
+            )
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def exists(self):
+        with closing(self._connect()) as conn:
+            return conn.execute("SELECT 1 FROM config LIMIT 1").fetchone() is not None
+
+    def load(self):
+        data = {}
+        with self.lock:
+            with closing(self._connect()) as conn:
+                rows = conn.execute("SELECT account, field, value FROM config").fetchall()
+            self.snapshot = {}
+            for account, field, value in rows:
+                key = join_key(account, field)
+                data[key] = json.loads(value)
+                self.snapshot[key] = value
+        return data
+
+    def save(self, data):
+        with self.lock:
+            serialized = {
+                key: json.dumps(value, ensure_ascii=False, sort_keys=True)
+                for key, value in data.items()
+            }
+            upserts = [
+                (*split_key(key), value)
+                for key, value in serialized.items()
+                if self.snapshot.get(key) != value
+            ]
+            deletes = [split_key(key) for key in self.snapshot if key not in serialized]
+            if not upserts and not deletes:
+                return 0
+            with closing(self._connect()) as conn, conn:
+                conn.executemany(
+                    "INSERT INTO config (account, field, value) VALUES (?, ?, ?) "
+                    "ON CONFLICT (account, field) DO UPDATE SET value = excluded.value",
+                    upserts,
+                )
+                conn.executemany(
+                    "DELETE FROM config WHERE account = ? AND field = ?", deletes
+                )
+            self.snapshot = serialized
+            return len(upserts) + len(deletes)
+
+
+def migrate_json_to_sqlite(json_path, db_path):
+    """将 telecom_config.json 导入 SQLite，数据库已有数据时不重复导入，返回导入的键数"""
+    store = SqliteConfigStore(db_path)
+    if store.exists() or not os.path.exists(json_path):
+        return 0
+    data = JsonConfigStore(json_path).load()
+    store.save(data)
+    return len(data)
+
+
+def open_store(config_path, backend="json", db_path=None):
+    """按 backend 打开存储，sqlite 首次使用时自动从 JSON 配置迁移"""
+    if backend != "sqlite":
+        return JsonConfigStore(config_path)
+    db_path = db_path or os.path.splitext(config_path)[0] + ".db"
+    migrated = migrate_json_to_sqlite(config_path, db_path)
+    if migrated:
+        print(f"⚙️ 已将 {config_path} 中的 {migrated} 项配置迁移到 {db_path}")
+    return SqliteConfigStore(db_path)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        exit("用法：python3 telecom_store.py telecom_config.json [telecom_config.db]")
+    src = sys.argv[1]
+    dst = sys.argv[2] if len(sys.argv) > 2 else os.path.splitext(src)[0] + ".db"
+    print(f"已迁移 {migrate_json_to_sqlite(src, dst)} 项配置到 {dst}")
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+# _*_ coding:utf-8 _*_
+# 分阶段耗时追踪：用 with tracer.span("阶段", 号码) 包住登录、查询、推送等步骤，
+# 运行结束后输出各阶段 p50/p95/最长耗时及最慢的账号，可将所有 span 写为 JSON Lines 便于之后分析。
+# 未启用时 span 返回共享的空上下文管理器，不计时、不分配对象。
+
+import json
+import math
+import threading
+import time
+from collections import defaultdict
+
+
+class _NoopSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+class _Span:
+    __slots__ = ("tracer", "phase", "account", "start", "wall")
+
+    def __init__(self, tracer, phase, account):
+        self.tracer = tracer
+        self.phase = phase
+        self.account = account
+
+    def __enter__(self):
+        self.wall = time.time()
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, *exc_info):
+        duration = time.perf_counter() - self.start
+        self.tracer.record(
+            self.phase, self.account, self.wall, duration, exc_type is None
+        )
+        return False
+
+
+def percentile(sorted_values, q):
+    """最近秩法百分位数，sorted_values 需已排序"""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values), max(1, math.ceil(q * len(sorted_values)))) - 1
+    return sorted_values[index]
+
+
+class Tracer:
+    """线程安全的 span 记录器，account 为空表示与账号无关的全局阶段"""
+
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self.spans = []
+        self.lock = threading.Lock()
+
+    def span(self, phase, account=""):
+        if not self.enabled:
+            return NOOP_SPAN
+        return _Span(self, phase, account)
+
+    def record(self, phase, account, start, duration, ok=True):
+        item = {
+            "phase": phase,
+            "account": account,
+            "start": round(start, 6),
+            "duration": round(duration, 6),
+            "ok": ok,
+            "thread": threading.current_thread().name,
+        }
+        with self.lock:
+            self.spans.append(item)
+
+    def phase_stats(self):
+        """{阶段: {count, total, p50, p95, max}}，按总耗时从高到低排列"""
+        durations = defaultdict(list)
+        with self.lock:
+            for item in self.spans:
+                durations[item["phase"]].append(item["duration"])
+        stats = {}
+        for phase, values in durations.items():
+            values.sort()
+            stats[phase] = {
+                "count": len(values),
+                "total": sum(values),
+                "p50": percentile(values, 0.5),
+                "p95": percentile(values, 0.95),
+                "max": values[-1],
+            }
+        return dict(sorted(stats.items(), key=lambda item: item[1]["total"], reverse=True))
+
+    def slowest_accounts(self, phase="account", top=5):
+        """按 phase 阶段耗时最长的账号：[(号码, 耗时, {阶段: 耗时})]"""
+        with self.lock:
+            spans = list(self.spans)
+        totals, breakdown = {}, defaultdict(lambda: defaultdict(float))
+        for item in spans:
+            if not item["account"]:
+                continue
+            if item["phase"] == phase:
+                totals[item["account"]] = totals.get(item["account"], 0.0) + item["duration"]
+            else:
+                breakdown[item["account"]][item["phase"]] += item["duration"]
+        ranked = sorted(totals.items(), key=lambda item: item[1], reverse=True)[:top]
+        return [(account, total, dict(breakdown[account])) for account, total in ranked]
+
+    def report(self, top=5):
+        """格式化的耗时报告"""
+        stats = self.phase_stats()
+        if not stats:
+            return "未记录到任何阶段耗时"
+        width = max(len(phase) for phase in stats)
+        lines = []
+        for phase, item in stats.items():
+            lines.append(
+                f"{phase.ljust(width)}  次数{item['count']:>5}  合计{item['total']:>8.3f}s"
+                f"  p50{item['p50']:>7.3f}s  p95{item['p95']:>7.3f}s  最长{item['max']:>7.3f}s"
+            )
+        slowest = self.slowest_accounts(top=top)
+        if slowest:
+            lines.append(f"最慢的{len(slowest)}个账号：")
+            for account, total, phases in slowest:
+                detail = "，".join(
+                    f"{phase} {duration:.3f}s"
+                    for phase, duration in sorted(phases.items(), key=lambda item: item[1], reverse=True)
+                )
+                lines.append(f"  {account}: {total:.3f}s（{detail}）")
+        return "\n".join(lines)
+
+    def write_jsonl(self, path):
+        """将所有 span 按开始时间写为 JSON Lines，返回写入条数"""
+        with self.lock:
+            spans = sorted(self.spans, key=lambda item: item["start"])
+        with open(path, "w", encoding="utf-8") as file:
+            for item in spans:
+                file.write(json.dumps(item, ensure_ascii=False) + "\n")
+        return len(spans)
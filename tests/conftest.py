@@ -0,0 +1,14 @@
+import os
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# 测试直接导入仓库根目录与 app 目录下的模块
+for path in (ROOT, os.path.join(ROOT, "app")):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+# api_server 在导入时打开登录信息文件，测试中放到临时目录
+os.environ.setdefault(
+    "CONFIG_PATH", os.path.join(tempfile.mkdtemp(prefix="telecom-test-"), "login_info.json")
+)
@@ -0,0 +1,36 @@
+from client_registry import ClientRegistry
+
+
+class Client:
+    def __init__(self):
+        self.token = None
+        self.login_info = None
+
+    def set_login_info(self, login_info):
+        self.login_info = login_info
+        self.token = login_info.get("token")
+
+
+def test_evicts_least_recently_used():
+    registry = ClientRegistry(Client, max_size=2)
+    a = registry.get("a")
+    registry.get("b")
+    assert registry.get("a") is a  # a 变为最近使用
+    registry.get("c")  # 淘汰 b
+    assert set(registry.clients) == {"a", "c"}
+    assert registry.get("a") is a
+    assert registry.get_stats() == {"created": 3, "evictions": 1, "size": 2}
+    # 被淘汰的号码重新创建客户端
+    registry.get("b")
+    assert set(registry.clients) == {"a", "b"}
+    assert registry.get_stats()["created"] == 4
+
+
+def test_syncs_login_info_only_when_changed():
+    registry = ClientRegistry(Client)
+    login_info = {"token": "t1"}
+    client = registry.get("a", login_info)
+    assert client.token == "t1"
+    login_info["token"] = "t2"
+    assert registry.get("a", login_info).token == "t2"
+    assert registry.get("a").token == "t2"
@@ -0,0 +1,111 @@
+from datetime import datetime
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from telecom_forecast import _pad, cycle_bounds, fit_rates, forecast_accounts
+
+DAY = 86400
+NOW = datetime(2026, 10, 16)
+CYCLE_START, CYCLE_END = cycle_bounds(NOW)
+
+
+def day(d):
+    return CYCLE_START + d * DAY
+
+
+class FakeHistory:
+    """按账期第几天生成样本的历史数据"""
+
+    def __init__(self, records, flow_items):
+        self.records = records
+        self.flow_items = flow_items
+
+    def query(self, phonenum, start=None):
+        return [row for row in self.records if row["time"] >= start]
+
+    def query_flow_items(self, phonenum, start=None):
+        return {
+            name: [row for row in rows if row["time"] >= start]
+            for name, rows in self.flow_items.items()
+        }
+
+
+def test_pad_fills_missing_columns_with_nan():
+    padded = _pad([[1, 2, 3], [4], []])
+    assert padded.shape == (3, 3)
+    assert padded[0].tolist() == [1, 2, 3]
+    assert padded[1, 0] == 4 and np.isnan(padded[1, 1:]).all()
+    assert np.isnan(padded[2]).all()
+
+
+def test_fit_rates_ignores_padding_and_uses_cycle_start_anchor():
+    t = _pad([[day(1), day(2), day(3)], [day(1), day(2)]])
+    used = _pad([[20, 30, 40], [5, 15]])
+    rate, samples = fit_rates(t, used, np.array([False, False]), CYCLE_START)
+    assert rate.tolist() == pytest.approx([10, 10])
+    assert samples.tolist() == [3, 2]
+    # 以 (账期起点, 0) 为锚点时多一个样本，速度被拉向原点
+    rate, samples = fit_rates(t, used, np.array([True, False]), CYCLE_START)
+    assert rate[0] == pytest.approx(13)
+    assert samples.tolist() == [4, 2]
+
+
+def test_fit_rates_uses_segment_after_last_drop():
+    t = _pad([[day(d) for d in range(1, 7)]])
+    used = np.array([[10, 2, 12, 1, 11, 21]], dtype=float)
+    rate, samples = fit_rates(t, used, np.array([True]), CYCLE_START)
+    # 只用最后一次下降之后的 3 个样本，中途重置过不再锚定账期起点
+    assert rate[0] == pytest.approx(10)
+    assert samples[0] == 3
+
+
+def test_fit_rates_single_sample_has_no_rate():
+    rate, samples = fit_rates(_pad([[day(1)]]), _pad([[5]]), np.array([False]), CYCLE_START)
+    assert np.isnan(rate[0]) and samples[0] == 1
+
+
+def test_forecast_accounts():
+    records = []
+    for d in range(1, 11):
+        # 第 7 天充值，余额上升
+        balance = 5000 - 100 * (d - 1) if d < 7 else 10000 - 100 * (d - 7)
+        records.append(
+            {"time": day(d), "balance": balance, "commonUse": 1000 * d, "commonTotal": 20000,
+             "voiceUsage": 0, "voiceTotal": 0}
+        )
+    flow_items = {
+        # 第 6 天变更套餐，已用量重置
+        "定向流量": [{"time": day(d), "use": 100 * d if d <= 5 else 50 * (d - 5), "total": 600}
+                 for d in range(1, 11)],
+        "闲时流量": [{"time": day(d), "use": 10 * d, "total": 100000} for d in range(1, 11)],
+    }
+    result = forecast_accounts(FakeHistory(records, flow_items), ["13800000001"], now=NOW)
+    forecast = result["13800000001"]
+    # 未订购通话不做预测
+    assert set(forecast) == {"common", "balance", "定向流量", "闲时流量"}
+
+    common = forecast["common"]
+    assert common["rate"] == pytest.approx(1000)
+    assert common["samples"] == 11
+    assert common["remaining"] == 10000
+    # 从最后一条样本（第 10 天）起外推，而不是从当前时间
+    assert common["exhaust"] == datetime.fromtimestamp(day(20))
+    assert common["daily_allowance"] == pytest.approx(10000 / ((CYCLE_END - NOW.timestamp()) / DAY))
+
+    balance = forecast["balance"]
+    assert balance["rate"] == pytest.approx(100)
+    assert balance["samples"] == 4
+    assert balance["remaining"] == 9700
+    # 余额不随账期重置，跨账期的耗尽日期照常给出
+    assert balance["exhaust"] == datetime.fromtimestamp(day(10 + 97))
+
+    reset = forecast["定向流量"]
+    assert reset["rate"] == pytest.approx(50)
+    assert reset["samples"] == 5
+    assert reset["exhaust"] == datetime.fromtimestamp(day(17))
+
+    # 账期内不会耗尽
+    assert forecast["闲时流量"]["rate"] == pytest.approx(10)
+    assert forecast["闲时流量"]["exhaust"] is None
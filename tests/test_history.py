@@ -0,0 +1,105 @@
+import os
+from datetime import datetime
+
+import telecom_history
+from telecom_class import SUMMARY_FIELDS
+from telecom_history import HistoryStore, decode_block, encode_block, _read_varint
+
+
+def summary(ts, balance, used, items=()):
+    return {
+        "phonenum": "13800000001",
+        "balance": balance,
+        "commonUse": used,
+        "createTime": datetime.fromtimestamp(ts).strftime("%Y-%m-%d %H:%M:%S"),
+        "flowItems": [{"name": name, "use": use, "balance": 0, "total": 1024} for name, use in items],
+    }
+
+
+def test_block_codec_round_trip():
+    records = [(1700000000, (100, -5, 0)), (1700000060, (90, -5, 2**40)), (1700003600, (0, 7, 1))]
+    block = encode_block(records, 3)
+    pos = 0
+    header = []
+    for _ in range(5):
+        value, pos = _read_varint(block, pos)
+        header.append(value)
+    assert header[:4] == [1700000000, 1700003600, 3, 3]
+    assert decode_block(block[pos:], 3, 3) == records
+
+
+def test_store_round_trip_across_blocks_and_reopen(tmp_path):
+    store = HistoryStore(str(tmp_path), block_size=3)
+    start = 1700000000
+    for i in range(8):
+        assert store.append_summary(summary(start + i * 60, 1000 - i, i * 10, [("国内通用", i)]))
+    assert not store.append_summary(summary(start, 1, 1))  # 不早于最后一条时忽略
+
+    reopened = HistoryStore(str(tmp_path), block_size=3)
+    rows = reopened.query("13800000001")
+    assert [row["time"] for row in rows] == [start + i * 60 for i in range(8)]
+    assert [row["balance"] for row in rows] == [1000 - i for i in range(8)]
+    assert set(rows[0]) == {"time", *SUMMARY_FIELDS}
+    assert [row["use"] for row in reopened.query_flow_items("13800000001")["国内通用"]] == list(range(8))
+    assert len(reopened.query("13800000001", start + 120, start + 240)) == 3
+    assert not [name for name in os.listdir(tmp_path) if name.endswith(".tmp")]
+
+
+def test_failed_write_keeps_existing_history(tmp_path, monkeypatch):
+    store = HistoryStore(str(tmp_path))
+    store.append_summary(summary(1700000000, 100, 1))
+
+    def broken_replace(src, dst):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(telecom_history.os, "replace", broken_replace)
+    try:
+        store.append_summary(summary(1700000060, 90, 2))
+    except OSError:
+        pass
+    monkeypatch.undo()
+    assert [row["balance"] for row in store.query("13800000001")] == [100]
+    assert [row["balance"] for row in HistoryStore(str(tmp_path)).query("13800000001")] == [100]
+    assert not [name for name in os.listdir(tmp_path) if name.endswith(".tmp")]
+
+
+def test_append_only_writes_the_tail_block(tmp_path, monkeypatch):
+    store = HistoryStore(str(tmp_path), block_size=4)
+    for i in range(40):
+        store.append_summary(summary(1700000000 + i * 60, 1000 - i, i))
+    written = []
+    atomic_write = store._atomic_write
+    monkeypatch.setattr(store, "_atomic_write", lambda path, data: written.append(len(data)) or atomic_write(path, data))
+    store.append_summary(summary(1700009000, 1, 1))
+    assert written and max(written) < os.path.getsize(tmp_path / "13800000001.hist") / 4
+    assert len(HistoryStore(str(tmp_path)).query("13800000001")) == 41
+
+
+def test_interrupted_tail_write_is_replayed(tmp_path, monkeypatch):
+    store = HistoryStore(str(tmp_path), block_size=3)
+    for i in range(4):
+        store.append_summary(summary(1700000000 + i * 60, 100 - i, i))
+
+    def crash(path):
+        raise OSError("killed")
+
+    # 日志已落盘、写入序列文件前中断
+    monkeypatch.setattr(telecom_history, "_apply_journal", crash)
+    try:
+        store.append_summary(summary(1700000300, 50, 9))
+    except OSError:
+        pass
+    monkeypatch.undo()
+    rows = HistoryStore(str(tmp_path), block_size=3).query("13800000001")
+    assert [row["balance"] for row in rows] == [100, 99, 98, 97, 50]
+    assert not [name for name in os.listdir(tmp_path) if name.endswith(".journal")]
+
+
+def test_same_name_flow_items_are_merged(tmp_path):
+    store = HistoryStore(str(tmp_path))
+    store.append_summary(summary(1700000000, 100, 1, [("国内通用", 10), ("国内通用", 5), ("定向", 1)]))
+    items = store.query_flow_items("13800000001")
+    assert [(name, [row["use"] for row in rows]) for name, rows in items.items()] == [
+        ("国内通用", [15]),
+        ("定向", [1]),
+    ]
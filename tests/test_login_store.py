@@ -0,0 +1,61 @@
+import json
+import os
+
+from login_store import LoginStore
+
+
+def write_external(path, data, mtime_ns):
+    """模拟其他进程写入：写临时文件后 rename，并设置不同的 mtime"""
+    tmp_path = f"{path}.ext"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+    os.utime(tmp_path, ns=(mtime_ns, mtime_ns))
+    os.replace(tmp_path, path)
+
+
+def test_reloads_after_external_atomic_replace(tmp_path):
+    path = str(tmp_path / "login_info.json")
+    write_external(path, {"a": {"token": "t1"}}, 1_000_000_000)
+    store = LoginStore(path, debounce=0, check_interval=0)
+    assert store.get("a") == {"token": "t1"}
+    write_external(path, {"a": {"token": "t2"}, "b": {}}, 2_000_000_000)
+    assert store.get("a") == {"token": "t2"}
+    assert store.get("b") == {}
+    # 文件未变化时不重复加载
+    store.get("a")
+    assert store.get_stats()["reloads"] == 2
+
+
+def test_check_interval_limits_stat_calls(tmp_path):
+    path = str(tmp_path / "login_info.json")
+    write_external(path, {"a": {"token": "t1"}}, 1_000_000_000)
+    store = LoginStore(path, debounce=0, check_interval=3600)
+    write_external(path, {"a": {"token": "t2"}}, 2_000_000_000)
+    assert store.get("a") == {"token": "t1"}
+    store.checked_at -= 3600
+    assert store.get("a") == {"token": "t2"}
+
+
+def test_debounced_writes_survive_external_reload(tmp_path):
+    path = str(tmp_path / "login_info.json")
+    write_external(path, {"a": {"token": "t1"}}, 1_000_000_000)
+    store = LoginStore(path, debounce=3600, check_interval=0)
+    store.set("b", {"token": "new"})
+    store.set("c", {"token": "new"})
+    # debounce 期间尚未落盘
+    with open(path, encoding="utf-8") as f:
+        assert json.load(f) == {"a": {"token": "t1"}}
+    assert store.get_stats()["pending"] == 2
+    # 外部修改重新加载时，未落盘的修改以内存为准
+    write_external(path, {"a": {"token": "t2"}, "b": {"token": "old"}}, 2_000_000_000)
+    assert store.get("a") == {"token": "t2"}
+    assert store.get("b") == {"token": "new"}
+    store.flush()
+    with open(path, encoding="utf-8") as f:
+        assert json.load(f) == {"a": {"token": "t2"}, "b": {"token": "new"}, "c": {"token": "new"}}
+    assert store.get_stats()["writes"] == 1
+    # 自身写入不触发重新加载，目录中不残留临时文件
+    reloads = store.get_stats()["reloads"]
+    store.get("a")
+    assert store.get_stats()["reloads"] == reloads
+    assert os.listdir(tmp_path) == ["login_info.json"]
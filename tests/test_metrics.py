@@ -0,0 +1,91 @@
+import pytest
+
+from metrics import ApiMetrics, Counter, Gauge, Histogram, upstream_code
+
+
+def test_text_format():
+    counter = Counter("requests_total", "请求数", ("path", "status"))
+    counter.inc(("/summary", "200"))
+    counter.inc(("/summary", "200"), 2)
+    counter.inc(('a"b\\c\nd', "500"))
+    assert counter.render() == [
+        "# HELP requests_total 请求数",
+        "# TYPE requests_total counter",
+        'requests_total{path="/summary",status="200"} 3',
+        'requests_total{path="a\\"b\\\\c\\nd",status="500"} 1',
+    ]
+    gauge = Gauge("in_flight", "进行中")
+    gauge.inc()
+    gauge.inc()
+    gauge.dec(amount=0.5)
+    assert gauge.render()[-1] == "in_flight 1.5"
+
+
+def test_histogram_buckets_are_cumulative():
+    histogram = Histogram("latency_seconds", "耗时", ("endpoint",), buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 3.0):
+        histogram.observe(("qry",), value)
+    assert histogram.render()[2:] == [
+        'latency_seconds_bucket{endpoint="qry",le="0.1"} 2',
+        'latency_seconds_bucket{endpoint="qry",le="1"} 3',
+        'latency_seconds_bucket{endpoint="qry",le="+Inf"} 4',
+        'latency_seconds_sum{endpoint="qry"} 3.65',
+        'latency_seconds_count{endpoint="qry"} 4',
+    ]
+
+
+def test_upstream_code():
+    assert upstream_code({"headerInfos": {"code": "X201"}}) == "X201"
+    assert upstream_code({"headerInfos": {"code": "0000"}, "responseData": {"resultCode": "0000"}}) == "0000"
+    assert upstream_code(None) == "invalid"
+
+
+def account_lines(metrics):
+    return [line for line in metrics.render().splitlines() if line.startswith("telecom_account_balance_yuan{")]
+
+
+def test_account_metrics_off_by_default():
+    metrics = ApiMetrics()
+    metrics.observe_summary({"phonenum": "13800000001", "balance": 1234})
+    assert account_lines(metrics) == []
+
+
+@pytest.mark.parametrize(
+    "mode, label",
+    [("masked", "138****0001"), ("hashed", "b1c4769e3ad1"), ("full", "13800000001"), ("bogus", None)],
+)
+def test_account_label_modes(mode, label):
+    metrics = ApiMetrics(account_labels=mode)
+    metrics.observe_summary({"phonenum": "13800000001", "balance": 1234})
+    if label is None:
+        assert account_lines(metrics) == []
+    else:
+        assert account_lines(metrics) == [f'telecom_account_balance_yuan{{account="{label}"}} 12.34']
+
+
+def test_account_eviction():
+    metrics = ApiMetrics(account_labels="full", max_accounts=2)
+    for phonenum in ("13800000001", "13800000002", "13800000003"):
+        metrics.observe_summary({"phonenum": phonenum, "balance": 100})
+    assert [line.split('"')[1] for line in account_lines(metrics)] == ["13800000002", "13800000003"]
+
+
+def test_metrics_endpoint_token(monkeypatch):
+    import api_server
+
+    client = api_server.app.test_client()
+    assert client.get("/metrics").status_code == 200
+    monkeypatch.setattr(api_server, "METRICS_TOKEN", "secret")
+    assert client.get("/metrics").status_code == 401
+    assert client.get("/metrics", headers={"Authorization": "Bearer wrong"}).status_code == 401
+    response = client.get("/metrics", headers={"Authorization": "Bearer secret"})
+    assert response.status_code == 200
+    assert "telecom_http_requests_total" in response.get_data(as_text=True)
+
+
+def test_bad_max_accounts_env(monkeypatch, capsys):
+    import api_server
+
+    monkeypatch.setenv("METRICS_MAX_ACCOUNTS", "many")
+    assert api_server.env_int("METRICS_MAX_ACCOUNTS", 100) == 100
+    assert "METRICS_MAX_ACCOUNTS" in capsys.readouterr().out
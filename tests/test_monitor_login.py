@@ -0,0 +1,41 @@
+import pytest
+
+import telecom_monitor
+
+
+class FakeTelecom:
+    calls = []
+
+    def set_login_info(self, login_info):
+        self.calls.append(("set_login_info", login_info["token"]))
+
+    def do_login(self, phonenum, password):
+        self.calls.append(("do_login", phonenum))
+        return {"responseData": {"resultCode": "9999"}}
+
+
+@pytest.fixture
+def monitor(monkeypatch):
+    FakeTelecom.calls = []
+    monkeypatch.setattr(telecom_monitor, "Telecom", FakeTelecom)
+    monkeypatch.setattr(telecom_monitor, "update_config", lambda: None)
+    monkeypatch.setattr(telecom_monitor, "CONFIG_DATA", {})
+    return telecom_monitor
+
+
+@pytest.mark.parametrize("code", ["X201", "X999"])
+def test_saved_token_without_response_data_falls_back_to_login(monitor, monkeypatch, code):
+    def qry_important_data(self):
+        self.calls.append(("qry_important_data",))
+        return {"headerInfos": {"code": code}, "responseData": None}
+
+    monkeypatch.setattr(FakeTelecom, "qry_important_data", qry_important_data, raising=False)
+    monitor.CONFIG_DATA["login_info_13800000001"] = {"token": "old", "password": "123456"}
+    notifys = []
+    assert monitor.process_account("13800000001", "123456", notifys) is False
+    assert FakeTelecom.calls == [
+        ("set_login_info", "old"),
+        ("qry_important_data",),
+        ("do_login", "13800000001"),
+    ]
+    assert notifys == ["登录失败：13800000001，已连续失败1次"]
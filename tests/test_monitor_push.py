@@ -0,0 +1,149 @@
+import pytest
+
+import notify
+import telecom_monitor
+from telecom_monitor import push_reasons
+
+
+def summary(balance=10000, common_use=0, items=(), create_time="2026-10-10 12:00:00"):
+    return {
+        "phonenum": "13800000001",
+        "balance": balance,
+        "commonUse": common_use,
+        "commonTotal": 100 * 1024 * 1024,
+        "createTime": create_time,
+        "flowItems": [{"name": name, "use": use} for name, use in items],
+    }
+
+
+@pytest.fixture(autouse=True)
+def thresholds(monkeypatch):
+    monkeypatch.setattr(telecom_monitor, "TELECOM_PUSH_BALANCE_DELTA", 1.0)
+    monkeypatch.setattr(telecom_monitor, "TELECOM_PUSH_FLOW_DELTA", 1024.0)
+
+
+def test_first_query_is_pushed():
+    assert push_reasons(summary(), None) == ["首次查询"]
+
+
+def test_small_changes_are_suppressed():
+    assert push_reasons(summary(balance=9950, common_use=500 * 1024), summary()) == []
+
+
+def test_changes_over_thresholds():
+    reasons = push_reasons(
+        summary(balance=9800, common_use=2048 * 1024, items=[("定向", 2048 * 1024), ("新包", 0)]),
+        summary(items=[("定向", 0), ("旧包", 0)]),
+    )
+    assert reasons == [
+        "余额↓2.00元",
+        "通用流量+2048MB",
+        "新增流量包：新包",
+        "流量包失效：旧包",
+        "定向用量+2048MB",
+    ]
+
+
+def test_status_icon_change_is_pushed():
+    reasons = push_reasons(summary(common_use=49 * 1024 * 1024), summary(common_use=48 * 1024 * 1024))
+    assert reasons == ["通用流量+1024MB", "状态🟡→🟠"]
+
+
+@pytest.fixture
+def baselines(monkeypatch):
+    monkeypatch.setattr(
+        telecom_monitor,
+        "CONFIG_DATA",
+        {"pushSummary_13800000001": {"balance": 1}, "pushSummary_13800000002": {"balance": 1}},
+    )
+    monkeypatch.setattr(
+        telecom_monitor,
+        "PUSH_BASELINES",
+        {"13800000001": {"balance": 2}, "13800000002": {"balance": 2}},
+    )
+    monkeypatch.setattr(telecom_monitor, "PUSH_RESULTS", {})
+    monkeypatch.setattr(telecom_monitor, "TELECOM_BATCH_SIZE", 0)
+    monkeypatch.setitem(notify.CHANNEL_LIMITS, "bark", ("chars", 40))
+    monkeypatch.setattr(notify, "outbox", None)
+    return telecom_monitor.CONFIG_DATA
+
+
+def push(monkeypatch, channels):
+    monkeypatch.setattr(notify, "active_channels", lambda: channels)
+    parts = ["账号格式错误：x", "13800000001 报告" + "a" * 5, "13800000002 报告" + "b" * 5, "🔕 摘要"]
+    owners = [None, "13800000001", "13800000002"]
+    telecom_monitor.send_notify_many("T", parts, owners)
+    notify.flush()
+    telecom_monitor.update_push_baselines(telecom_monitor.delivered_phonenums())
+
+
+def test_only_delivered_accounts_advance(baselines, monkeypatch):
+    def bark(title, content):
+        return "13800000002" not in content  # 携带第二个账号的消息推送失败
+
+    push(monkeypatch, [bark])
+    assert baselines["pushSummary_13800000001"] == {"balance": 2}
+    assert baselines["pushSummary_13800000002"] == {"balance": 1}
+
+
+def test_any_channel_delivering_an_account_advances_it(baselines, monkeypatch):
+    def bark(title, content):
+        return "13800000002" not in content
+
+    def telegram_bot(title, content):
+        raise OSError("timeout")
+
+    def ntfy(title, content):
+        return None
+
+    push(monkeypatch, [bark, telegram_bot, ntfy])
+    assert baselines["pushSummary_13800000001"] == {"balance": 2}
+    assert baselines["pushSummary_13800000002"] == {"balance": 2}
+
+
+def test_console_does_not_count_as_delivery(baselines, monkeypatch):
+    def console(title, content):
+        return None
+
+    def bark(title, content):
+        return False
+
+    push(monkeypatch, [console, bark])
+    assert baselines["pushSummary_13800000001"] == {"balance": 1}
+    monkeypatch.setattr(telecom_monitor, "PUSH_RESULTS", {})
+    push(monkeypatch, [console])  # 只有控制台时照常更新
+    assert baselines["pushSummary_13800000001"] == {"balance": 2}
+
+
+def test_outbox_queued_counts_as_delivered(baselines, monkeypatch, tmp_path):
+    from notify_outbox import Outbox
+
+    def bark(title, content):
+        return False
+
+    monkeypatch.setattr(notify, "outbox", Outbox(str(tmp_path / "outbox.db")))
+    push(monkeypatch, [bark])
+    # 失败的消息留在发件箱中由下次运行补发，不再因基准未更新而重复推送
+    assert baselines["pushSummary_13800000002"] == {"balance": 2}
+    assert notify.outbox.get_stats()["pending"] >= 2
+    notify.outbox.close()
+
+
+@pytest.mark.parametrize("value, expected", [("2.5", 2.5), ("0", 0.0), ("", 1.0), ("1元", 1.0), ("-1", 1.0), ("nan", 1.0)])
+def test_env_threshold(monkeypatch, value, expected):
+    monkeypatch.setenv("TELECOM_PUSH_BALANCE_DELTA", value)
+    assert telecom_monitor.env_threshold("TELECOM_PUSH_BALANCE_DELTA", 1.0) == expected
+
+
+@pytest.mark.parametrize(
+    "argv, config, profile",
+    [
+        ([], "telecom_config.json", None),
+        (["--profile", "spans.jsonl"], "telecom_config.json", "spans.jsonl"),
+        (["--profile=spans.jsonl", "my.json"], "my.json", "spans.jsonl"),
+        (["my.json", "--profile"], "my.json", ""),
+    ],
+)
+def test_profile_path_is_not_taken_as_config(argv, config, profile):
+    args = telecom_monitor.parse_args(argv)
+    assert (args.config, args.profile) == (config, profile)
@@ -0,0 +1,119 @@
+import asyncio
+
+import pytest
+
+import notify
+from notify_outbox import DEAD, PENDING, SENT, Outbox
+
+
+@pytest.fixture
+def outbox(tmp_path):
+    box = Outbox(str(tmp_path / "outbox.db"), base_delay=10, max_delay=100, max_attempts=3)
+    yield box
+    box.close()
+
+
+def test_enqueue_dedups_only_within_message_id(outbox):
+    key, new = outbox.enqueue("m1", "bark", "T", "C")
+    assert new
+    assert outbox.enqueue("m1", "bark", "T", "C") == (key, False)
+    outbox.ack(key)
+    # 同一次发送重复入队不再发送，另一次发送的相同内容仍会入队
+    assert outbox.enqueue("m1", "bark", "T", "C") == (key, False)
+    other, new = outbox.enqueue("m2", "bark", "T", "C")
+    assert new and other != key
+
+
+def test_claim_leases_due_entries(outbox):
+    key, _ = outbox.enqueue("m1", "bark", "T", "C", now=1000)
+    # 入队时已被当前进程租用，租期内不会被再次取出
+    assert outbox.claim(now=1000) == []
+    rows = outbox.claim(now=1000 + outbox.lease)
+    assert [row[0] for row in rows] == [key]
+    assert outbox.claim(now=1000 + outbox.lease) == []
+
+
+def test_fail_backs_off_with_jitter_then_gives_up(outbox):
+    key, _ = outbox.enqueue("m1", "bark", "T", "C", now=1000)
+    first = outbox.fail(key, "boom", now=1000)
+    assert 1000 + 5 <= first <= 1000 + 10
+    second = outbox.fail(key, "boom", now=2000)
+    assert 2000 + 10 <= second <= 2000 + 20
+    assert outbox.claim(now=second - 1) == []
+    assert [row[0] for row in outbox.claim(now=second)] == [key]
+    assert outbox.fail(key, "boom", now=3000) is None
+    assert outbox.get_stats() == {PENDING: 0, SENT: 0, DEAD: 1}
+
+
+def test_backoff_is_capped(outbox):
+    for attempts in range(1, 20):
+        assert 0 < outbox.backoff(attempts) <= outbox.max_delay
+
+
+def test_purge_removes_old_sent_entries(outbox):
+    key, _ = outbox.enqueue("m1", "bark", "T", "C", now=1000)
+    outbox.ack(key, now=1000)
+    assert outbox.purge(now=1000 + outbox.keep_sent + 1) == 1
+    assert outbox.get_stats()[SENT] == 0
+
+
+@pytest.fixture
+def notify_outbox(tmp_path, monkeypatch):
+    monkeypatch.setattr(notify, "outbox", None)
+    box = notify.open_outbox(str(tmp_path / "notify.db"))
+    yield box
+    notify.open_outbox("")
+
+
+def test_failed_send_is_retried_by_drain(notify_outbox, monkeypatch):
+    calls = []
+
+    def bark(title, content):
+        calls.append(content)
+        return len(calls) > 1  # 第一次失败
+
+    monkeypatch.setattr(notify, "active_channels", lambda: [bark])
+    monkeypatch.setattr(notify, "NOTIFY_CHANNELS", ((bark, ()),))
+    notify.send("T", "C")
+    assert notify_outbox.get_stats()[PENDING] == 1
+    # 到期后补发
+    notify_outbox.conn.execute("UPDATE outbox SET next_attempt = 0")
+    notify_outbox.conn.commit()
+    assert len(notify.drain_outbox()) == 1
+    assert notify_outbox.get_stats() == {PENDING: 0, SENT: 1, DEAD: 0}
+    # 相同内容的另一次发送照常送达
+    notify.send("T", "C")
+    assert calls == ["C", "C", "C"]
+    assert notify_outbox.get_stats()[SENT] == 2
+
+
+def test_asend_records_outbox(notify_outbox, monkeypatch):
+    # 非 HTTP 渠道在线程中执行同步实现
+    def go_cqhttp(title, content):
+        return False
+
+    monkeypatch.setattr(notify, "active_channels", lambda: [go_cqhttp])
+    assert asyncio.run(notify.asend("T", "C")) == [None]
+    assert notify_outbox.get_stats()[PENDING] == 1
+
+
+def test_enqueue_failure_falls_back_to_direct_send(notify_outbox, monkeypatch, capsys):
+    calls = []
+
+    # 非 HTTP 渠道，asend 时同样调用该函数
+    def go_cqhttp(title, content):
+        calls.append(content)
+
+    def broken(*args, **kwargs):
+        raise RuntimeError("database is locked")
+
+    monkeypatch.setattr(notify, "active_channels", lambda: [go_cqhttp])
+    monkeypatch.setattr(notify, "_outbox_error_logged", False)
+    monkeypatch.setattr(notify_outbox, "enqueue", broken)
+    notify.send("T", "C")
+    assert asyncio.run(notify.asend("T", "D")) == [None]
+    future, queued = notify._submit(go_cqhttp, "T", "E", "m1")
+    future.result()
+    assert not queued
+    assert calls == ["C", "D", "E"]
+    assert capsys.readouterr().out.count("发件箱写入失败") == 1
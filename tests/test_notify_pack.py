@@ -0,0 +1,59 @@
+import notify
+from notify import measure, pack_messages
+
+
+def test_keeps_input_order_across_messages():
+    parts = [f"账号{i}:" + "x" * size for i, size in enumerate((60, 10, 70, 20, 50, 5))]
+    messages = pack_messages(parts, limit=100, unit="chars")
+    assert "\n".join(messages) == "\n".join(parts)
+    assert all(measure(message, "chars") <= 100 for message in messages)
+
+
+def test_greedy_fills_contiguous_groups():
+    parts = ["a" * 40, "b" * 40, "c" * 40, "d" * 40]
+    # 每条最多容纳两段（40 + 1 + 40 <= 90）
+    assert pack_messages(parts, limit=90) == ["a" * 40 + "\n" + "b" * 40, "c" * 40 + "\n" + "d" * 40]
+
+
+def test_max_count_and_no_limit():
+    parts = ["1", "2", "3", "4", "5"]
+    assert pack_messages(parts) == ["1\n2\n3\n4\n5"]
+    assert pack_messages(parts, max_count=2) == ["1\n2", "3\n4", "5"]
+
+
+def test_oversized_part_is_split_by_line_in_order():
+    part = "\n".join(f"line{i:02d}" for i in range(30))
+    messages = pack_messages(["head", part, "tail"], limit=50)
+    assert all(len(message) <= 50 for message in messages)
+    assert "\n".join(messages) == "\n".join(["head", part, "tail"])
+
+
+def test_overhead_and_byte_units():
+    parts = ["中文" * 10, "中文" * 10]
+    messages = pack_messages(parts, limit=70, unit="bytes", overhead=10)
+    assert messages == parts
+    assert all(measure(message, "bytes") <= 60 for message in messages)
+
+
+def test_send_many_submits_parts_in_order(monkeypatch):
+    sent = []
+
+    def bark(title, content):
+        sent.append((title, content))
+
+    monkeypatch.setattr(notify, "active_channels", lambda: [bark])
+    monkeypatch.setitem(notify.CHANNEL_LIMITS, "bark", ("chars", 60))
+    monkeypatch.setattr(notify, "outbox", None)
+    parts = [f"report-{i}-" + "x" * 15 for i in range(6)]
+    notify.send_many("T", parts)
+    assert [title for title, _ in sent] == [f"T第{i}/{len(sent)}批" for i in range(1, len(sent) + 1)]
+    assert "\n".join(content for _, content in sent) == "\n".join(parts)
+
+
+def test_env_settings_fall_back_on_invalid_values(monkeypatch):
+    for value, expected in (("", 15.0), ("7.5", 7.5), ("abc", 15.0), ("0", 15.0), ("nan", 15.0)):
+        monkeypatch.setenv("NOTIFY_TIMEOUT", value)
+        assert notify._env_positive("NOTIFY_TIMEOUT", 15.0) == expected
+    for value, expected in (("8", 8), ("2.5", 4), ("-1", 4)):
+        monkeypatch.setenv("NOTIFY_WORKERS", value)
+        assert notify._env_positive("NOTIFY_WORKERS", 4, int) == expected
@@ -0,0 +1,58 @@
+import pytest
+
+import telecom_class
+from telecom_class import RateLimiter, TokenBucket, parse_rate_limit
+
+
+class Clock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_token_bucket_burst_then_queue(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(telecom_class.time, "monotonic", clock)
+    bucket = TokenBucket(rate=2, burst=3)
+    assert [bucket.reserve() for _ in range(3)] == [0.0, 0.0, 0.0]
+    assert bucket.reserve() == pytest.approx(0.5)
+    assert bucket.reserve() == pytest.approx(1.0)
+    clock.now += 10  # 空闲后最多恢复到 burst 个令牌
+    assert [bucket.reserve() for _ in range(3)] == [0.0, 0.0, 0.0]
+    assert bucket.reserve() == pytest.approx(0.5)
+    assert bucket.stats["waited"] == 3
+
+
+@pytest.mark.parametrize(
+    "value, expected",
+    [("2:4", (2.0, 4.0)), ("5", (5.0, 5.0)), ("0", (0.0, 0.0)), (" 1.5:3 ", (1.5, 3.0))],
+)
+def test_parse_rate_limit(value, expected):
+    assert parse_rate_limit(value) == expected
+
+
+@pytest.mark.parametrize("value", ["fast", "1:x", "-1:2", "nan", "inf:3"])
+def test_bad_rate_env_falls_back_to_default(monkeypatch, capsys, value):
+    monkeypatch.setenv("TELECOM_RATE_QUERY", value)
+    limiter = RateLimiter({"QUERY": "8:16"})
+    assert limiter.buckets["QUERY"].rate == 8 and limiter.buckets["QUERY"].burst == 16
+    assert "TELECOM_RATE_QUERY" in capsys.readouterr().out
+
+
+def test_rate_limiter_waits_for_slower_bucket(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(telecom_class.time, "monotonic", clock)
+    limiter = RateLimiter({"LOGIN_HOST": "2:1", "LOGIN": "1:1", "QUERY_HOST": "0", "QUERY": "0"})
+    url = "https://appgologin.189.cn:9031/login/client/userLoginNormal"
+    assert limiter.reserve(url) == 0.0
+    assert limiter.reserve(url) == pytest.approx(1.0)
+    assert limiter.reserve("https://appfuwu.189.cn:9021/query/qryImportantData") == 0.0
+    assert set(limiter.buckets) == {"LOGIN_HOST", "LOGIN"}
+
+
+@pytest.mark.parametrize("value, expected", [("", 10), ("32", 32), ("abc", 10), ("0", 10), ("-4", 10)])
+def test_pool_size_env_falls_back_on_invalid_values(monkeypatch, value, expected):
+    monkeypatch.setenv("TELECOM_POOL_MAXSIZE", value)
+    assert telecom_class._env_pool_size("TELECOM_POOL_MAXSIZE") == expected
@@ -0,0 +1,25 @@
+import pytest
+
+import telecom_class
+from telecom_class import DECODE_TABLE, Telecom
+
+
+def test_login_body_does_not_keep_password():
+    client = Telecom()
+    body = client.build_login_body("13800000001", "123456")
+    field_data = body["content"]["fieldData"]
+    assert field_data["authentication"].translate(DECODE_TABLE) == "123456"
+    assert field_data["phoneNum"].translate(DECODE_TABLE) == "13800000001"
+    # 模板只按号码缓存，进程内不会长期保留明文密码
+    assert all("123456" not in repr(key) for key in client._templates)
+    assert "123456" not in repr(client._templates)
+    # 登录密文每次重新加密（PKCS#1 v1.5 随机填充），不会复用缓存结果
+    again = client.build_login_body("13800000001", "123456")["content"]["fieldData"]
+    assert again["loginAuthCipherAsymmertric"] != field_data["loginAuthCipherAsymmertric"]
+
+
+def test_async_client_does_not_create_requests_session():
+    pytest.importorskip("aiohttp")
+    client = telecom_class.AsyncTelecom()
+    assert client.session is None
+    assert client.headers == Telecom().headers
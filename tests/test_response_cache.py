@@ -0,0 +1,123 @@
+import response_cache as response_cache_module
+from response_cache import ResponseCache
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_cache(monkeypatch, **kwargs):
+    clock = Clock()
+    monkeypatch.setattr(response_cache_module.time, "monotonic", clock)
+    return ResponseCache(**kwargs), clock
+
+
+def test_fresh_stale_stale_if_error_expired(monkeypatch):
+    cache, clock = make_cache(monkeypatch, ttl=60, stale_ttl=300, stale_if_error=3600)
+    cache.set("k", {"v": 1})
+
+    value, age = cache.get("k")
+    assert value == {"v": 1} and cache.is_fresh(age)
+
+    clock.now += 100
+    value, age = cache.get("k")
+    assert not cache.is_fresh(age) and cache.is_revalidatable(age)
+
+    clock.now += 1000
+    value, age = cache.get("k")
+    assert value == {"v": 1}
+    assert not cache.is_revalidatable(age)  # 只能在上游失败时兜底
+
+    clock.now += 3600
+    assert cache.get("k") == (None, None)
+    assert cache.get_stats()["size"] == 0
+
+
+def test_stale_if_error_is_at_least_revalidation_window(monkeypatch):
+    cache, _ = make_cache(monkeypatch, ttl=60, stale_ttl=300, stale_if_error=10)
+    assert cache.stale_if_error == 360
+
+
+def test_lru_eviction(monkeypatch):
+    cache, _ = make_cache(monkeypatch, max_size=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")  # a 变为最近使用
+    cache.set("c", 3)
+    assert cache.get("b") == (None, None)
+    assert cache.get("a")[0] == 1 and cache.get("c")[0] == 3
+    assert cache.get_stats()["evictions"] == 1
+
+
+def test_only_one_background_refresh_per_key(monkeypatch):
+    cache, _ = make_cache(monkeypatch)
+    assert cache.begin_refresh("k")
+    assert not cache.begin_refresh("k")
+    cache.end_refresh("k")
+    assert cache.begin_refresh("k")
+
+
+def test_hit_ratio(monkeypatch):
+    cache, _ = make_cache(monkeypatch)
+    for stat in ("hits", "stale_hits", "misses", "misses"):
+        cache.record(stat)
+    assert cache.get_stats()["hit_ratio"] == 0.5
+
+
+def test_background_refresh_uses_each_numbers_own_token(monkeypatch):
+    import threading
+
+    import api_server
+    from client_registry import ClientRegistry
+
+    barrier = threading.Barrier(2)
+    seen = []
+
+    class FakeClient:
+        token = None
+        login_info = None
+
+        def set_login_info(self, login_info):
+            self.login_info = login_info
+            self.token = login_info["token"]
+
+        def qry_important_data(self):
+            token = self.token
+            barrier.wait(timeout=5)  # 两个号码的刷新同时进行
+            seen.append((self.login_info["phonenum"], token))
+            return {"responseData": {"token": token}}
+
+    monkeypatch.setattr(api_server, "clients", ClientRegistry(FakeClient))
+    for phonenum in ("13800000001", "13800000002"):
+        api_server.login_store.data[phonenum] = {
+            "phonenum": phonenum,
+            "password": "123456",
+            "token": f"token-{phonenum}",
+        }
+
+    threads = []
+    for phonenum in ("13800000001", "13800000002"):
+        key = (phonenum, "digest", "qryImportantData")
+        assert api_server.response_cache.begin_refresh(key)
+        threads.append(
+            threading.Thread(
+                target=api_server.refresh_cache,
+                args=(key, phonenum, "123456", "qry_important_data"),
+            )
+        )
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sorted(seen) == [
+        ("13800000001", "token-13800000001"),
+        ("13800000002", "token-13800000002"),
+    ]
+    for phonenum in ("13800000001", "13800000002"):
+        value, _ = api_server.response_cache.get((phonenum, "digest", "qryImportantData"))
+        assert value == {"responseData": {"token": f"token-{phonenum}"}}
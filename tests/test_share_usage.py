@@ -0,0 +1,44 @@
+import telecom_class
+from telecom_class import ENCODE_TABLE, Telecom
+
+
+def share_response(amount):
+    return {
+        "responseData": {
+            "data": {
+                "sharePhoneBeans": [{"sharePhoneNum": "13800000001".translate(ENCODE_TABLE)}],
+                "shareTypeBeans": [
+                    {
+                        "shareTypeName": "流量",
+                        "shareUsageInfos": [
+                            {
+                                "title": "共享流量",
+                                "totalAmount": "100",
+                                "shareUsageAmounts": [
+                                    {"phoneNum": "13800000001".translate(ENCODE_TABLE), **amount}
+                                ],
+                            }
+                        ],
+                    }
+                ],
+            }
+        }
+    }
+
+
+def test_flatten_share_usage():
+    data = Telecom().decode_share_usage(share_response({"usageAmount": "10"}), flatten=True)
+    assert data["shareUsageTable"] == [
+        {"member": "13800000001", "shareType": "流量", "title": "共享流量", "used": "10", "total": "100"}
+    ]
+
+
+def test_unknown_share_fields_fall_back_to_nested(monkeypatch, capsys):
+    monkeypatch.setattr(telecom_class, "_share_keys_warned", False)
+    client = Telecom()
+    for _ in range(2):
+        data = client.decode_share_usage(share_response({"useNum": "10"}), flatten=True)
+        assert "shareUsageTable" not in data
+        amount = data["responseData"]["data"]["shareTypeBeans"][0]["shareUsageInfos"][0]["shareUsageAmounts"][0]
+        assert amount["phoneNum"] == "13800000001"
+    assert capsys.readouterr().out.count("useNum") == 1
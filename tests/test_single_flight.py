@@ -0,0 +1,72 @@
+import threading
+import time
+
+import pytest
+
+from single_flight import SingleFlight
+
+
+def run_concurrently(flight, key, func, count):
+    results, errors = [], []
+
+    def worker():
+        try:
+            results.append(flight.do(key, func))
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=worker) for _ in range(count)]
+    for thread in threads:
+        thread.start()
+    return threads, results, errors
+
+
+def test_concurrent_calls_share_one_execution():
+    flight = SingleFlight()
+    started, release = threading.Event(), threading.Event()
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        started.set()
+        release.wait(timeout=5)
+        return {"ok": True}
+
+    threads, results, errors = run_concurrently(flight, "k", fetch, 5)
+    started.wait(timeout=5)
+    while flight.get_stats()["shared"] < 4:
+        time.sleep(0.001)
+    release.set()
+    for thread in threads:
+        thread.join()
+    assert calls == [1] and not errors
+    assert results == [{"ok": True}] * 5
+    assert flight.get_stats() == {"executed": 1, "shared": 4, "in_flight": 0}
+
+
+def test_error_is_shared_and_key_is_released():
+    flight = SingleFlight()
+    release = threading.Event()
+
+    def fail():
+        release.wait(timeout=5)
+        raise RuntimeError("upstream")
+
+    threads, results, errors = run_concurrently(flight, "k", fail, 3)
+    while flight.get_stats()["shared"] < 2:
+        time.sleep(0.001)
+    release.set()
+    for thread in threads:
+        thread.join()
+    assert not results and [str(e) for e in errors] == ["upstream"] * 3
+    # 失败后不缓存结果，下一次调用重新执行
+    assert flight.do("k", lambda: 42) == 42
+
+
+def test_different_keys_run_independently():
+    flight = SingleFlight()
+    assert flight.do("a", lambda: 1) == 1
+    assert flight.do("b", lambda: 2) == 2
+    with pytest.raises(ValueError):
+        flight.do("c", lambda: int("x"))
+    assert flight.get_stats()["executed"] == 3
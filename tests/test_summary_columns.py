@@ -0,0 +1,30 @@
+from telecom_class import SUMMARY_FIELDS, Summary, SummaryColumns
+
+
+def summary(phonenum, base, items):
+    return {
+        "phonenum": phonenum,
+        **{field: base + i for i, field in enumerate(SUMMARY_FIELDS)},
+        "createTime": "2026-10-10 12:00:00",
+        "flowItems": [
+            {"name": name, "use": use, "balance": 100 - use, "total": 100} for name, use in items
+        ],
+    }
+
+
+def test_round_trip_against_summary():
+    dicts = [
+        summary("13800000001", 10, [("国内通用", 30), ("国内通用", 5), ("定向", 1)]),
+        summary("13800000002", 2**40, []),
+        summary("13800000003", -5, [("闲时", 99)]),
+    ]
+    columns = SummaryColumns.from_summaries(
+        [dicts[0], Summary.from_dict(dicts[1]), dicts[2]]
+    )
+    assert len(columns) == 3
+    assert list(columns.flowOffsets) == [0, 3, 3, 4]
+    assert columns.to_dicts() == dicts
+    for i, data in enumerate(dicts):
+        assert columns.row(i) == Summary.from_dict(data)
+        assert columns.flow_items(i) == data["flowItems"]
+    assert list(columns["balance"]) == [10, 2**40, -5]
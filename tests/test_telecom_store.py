@@ -0,0 +1,43 @@
+import json
+import sqlite3
+
+import telecom_store
+from telecom_store import SqliteConfigStore, open_store
+
+
+def test_sqlite_store_round_trip_closes_connections(tmp_path, monkeypatch):
+    opened = []
+    connect = sqlite3.connect
+
+    class TrackedConnection(sqlite3.Connection):
+        closed = False
+
+        def close(self):
+            self.closed = True
+            super().close()
+
+    def tracked_connect(*args, **kwargs):
+        conn = connect(*args, factory=TrackedConnection, **kwargs)
+        opened.append(conn)
+        return conn
+
+    monkeypatch.setattr(telecom_store.sqlite3, "connect", tracked_connect)
+    store = SqliteConfigStore(str(tmp_path / "config.db"))
+    assert not store.exists()
+    data = {"login_info_13800000001": {"token": "a"}, "pushMode": "change"}
+    assert store.save(data) == 2
+    assert store.save(data) == 0
+    assert SqliteConfigStore(store.path).load() == data
+    assert store.exists()
+    assert opened and all(conn.closed for conn in opened)
+
+
+def test_open_store_migrates_json_once(tmp_path):
+    config_path = tmp_path / "telecom_config.json"
+    config_path.write_text(json.dumps({"summary_13800000001": {"balance": 100}}), encoding="utf-8")
+    store = open_store(str(config_path), backend="sqlite")
+    assert store.load() == {"summary_13800000001": {"balance": 100}}
+    config_path.write_text(json.dumps({}), encoding="utf-8")
+    assert open_store(str(config_path), backend="sqlite").load() == {
+        "summary_13800000001": {"balance": 100}
+    }
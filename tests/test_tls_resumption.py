@@ -0,0 +1,72 @@
+import shutil
+import socket
+import ssl
+import subprocess
+import threading
+
+import pytest
+
+import telecom_class
+
+pytestmark = pytest.mark.skipif(shutil.which("openssl") is None, reason="需要 openssl 生成测试证书")
+
+
+@pytest.fixture(scope="module")
+def tls_server(tmp_path_factory):
+    directory = tmp_path_factory.mktemp("tls")
+    cert, key = directory / "cert.pem", directory / "key.pem"
+    subprocess.run(
+        ["openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-days", "1",
+         "-keyout", str(key), "-out", str(cert), "-subj", "/CN=localhost",
+         "-addext", "subjectAltName=DNS:localhost"],
+        check=True,
+        capture_output=True,
+    )
+    server_context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+    server_context.load_cert_chain(cert, key)
+    listener = socket.create_server(("127.0.0.1", 0))
+
+    def handle(conn):
+        try:
+            with server_context.wrap_socket(conn, server_side=True) as tls:
+                while tls.recv(16):
+                    tls.sendall(b"pong")
+        except OSError:
+            pass
+
+    def serve():
+        while True:
+            try:
+                conn, _ = listener.accept()
+            except OSError:
+                return
+            threading.Thread(target=handle, args=(conn,), daemon=True).start()
+
+    threading.Thread(target=serve, daemon=True).start()
+    yield listener.getsockname()[1], str(cert)
+    listener.close()
+
+
+@pytest.mark.parametrize("version", [ssl.TLSVersion.TLSv1_2, ssl.TLSVersion.TLSv1_3])
+def test_new_connections_resume_session(tls_server, version):
+    port, cert = tls_server
+    context = telecom_class._ResumingSSLContext(ssl.PROTOCOL_TLS_CLIENT)
+    context.load_verify_locations(cert)
+    context.maximum_version = version
+    sockets, reused = [], []
+    for _ in range(3):
+        tls = context.wrap_socket(socket.create_connection(("127.0.0.1", port)), server_hostname="localhost")
+        tls.sendall(b"ping")
+        assert tls.recv(16) == b"pong"
+        sockets.append(tls)
+        reused.append(tls.session_reused)
+    for tls in sockets:
+        tls.close()
+    assert reused == [False, True, True]
+
+
+def test_shared_context_is_a_real_ssl_context():
+    context = telecom_class.get_ssl_context()
+    assert type(context) is telecom_class._ResumingSSLContext
+    assert context.verify_mode == ssl.CERT_REQUIRED and context.check_hostname
+    assert context.minimum_version == ssl.TLSVersion.TLSv1_2
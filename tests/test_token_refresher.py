@@ -0,0 +1,64 @@
+import time
+from datetime import datetime, timedelta
+
+from token_refresher import TokenRefresher
+
+
+def login_info(age):
+    created = datetime.now() - timedelta(seconds=age)
+    return {"createTime": created.strftime("%Y-%m-%d %H:%M:%S"), "password": "123456"}
+
+
+def make_refresher(**kwargs):
+    return TokenRefresher(dict, lambda phonenum, password: {}, jitter=0, **kwargs)
+
+
+def test_early_expiry_is_ignored():
+    refresher = make_refresher()
+    for age in (7200, 7300, 7100):
+        refresher.observe_expiry(login_info(age))
+    # 在其他设备登录导致 token 几秒后就失效，不应把有效期拉低
+    refresher.observe_expiry(login_info(5))
+    assert refresher.lifetime() >= 7100
+    assert refresher.get_stats()["expired_outliers"] == 1
+
+
+def test_lifetime_uses_low_quantile_not_minimum():
+    refresher = make_refresher()
+    for age in (1000, 7000, 7100, 7200, 7300, 7400, 7500, 7600):
+        refresher.observe_expiry(login_info(age))
+    assert 7000 <= refresher.lifetime() <= 7200
+
+
+def test_fresh_token_is_never_due():
+    refresher = make_refresher(lifetime=60, min_lifetime=0)
+    assert not refresher.is_due("13800000001", login_info(30))
+    assert refresher.is_due("13800000001", login_info(400))
+
+
+def test_no_lifetime_means_no_refresh():
+    refresher = make_refresher()
+    assert not refresher.is_due("13800000001", login_info(10**6))
+
+
+def test_only_recently_queried_numbers_are_refreshed():
+    logins = []
+    store = {"13800000001": login_info(7000), "13800000002": login_info(7000)}
+    refresher = TokenRefresher(
+        lambda: store,
+        lambda phonenum, password: logins.append(phonenum) or {"responseData": {"resultCode": "0000"}},
+        lifetime=7200,
+        jitter=0,
+    )
+    refresher.run_once()
+    assert logins == []  # 重启后尚无查询，不为任何已保存的账号登录
+
+    refresher.touch("13800000001")
+    refresher.run_once()
+    assert logins == ["13800000001"]
+
+    # 超过一个有效期未再查询的号码移出续期集合
+    refresher.touch("13800000001", now=time.monotonic() - 7300)
+    refresher.run_once()
+    assert logins == ["13800000001"]
+    assert refresher.get_stats()["active"] == 0 and refresher.get_stats()["idle_dropped"] == 1